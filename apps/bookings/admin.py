@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Availability, Booking
+from .models import Availability, Booking, ExternalBlock, OutboxEvent
 
 
 @admin.register(Availability)
@@ -14,6 +14,13 @@ class AvailabilityAdmin(admin.ModelAdmin):
     end_date_display.short_description = 'End Date'
 
 
+@admin.register(ExternalBlock)
+class ExternalBlockAdmin(admin.ModelAdmin):
+    list_display = ['id', 'listing', 'start_date', 'end_date']
+    list_filter = ['listing']
+    readonly_fields = ['listing', 'start_date', 'end_date']
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['id', 'guest', 'listing', 'check_in', 'check_out',
@@ -35,7 +42,20 @@ class BookingAdmin(admin.ModelAdmin):
     confirm_selected.short_description = "Confirm selected bookings"
 
     def cancel_selected(self, request, queryset):
-        queryset.update(status='cancelled')
-        self.message_user(request, f'{queryset.count()} bookings cancelled.')
+        # Через Booking.cancel(), чтобы вернуть даты и записать событие в outbox
+        updated = 0
+        for booking in queryset.filter(status__in=['pending', 'confirmed']):
+            success, _ = booking.cancel()
+            if success:
+                updated += 1
+        self.message_user(request, f'{updated} bookings cancelled.')
 
     cancel_selected.short_description = "Cancel selected bookings"
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'key', 'status', 'attempts', 'available_at', 'processed_at']
+    list_filter = ['status', 'topic']
+    search_fields = ['key']
+    readonly_fields = ['created_at', 'processed_at', 'last_error']
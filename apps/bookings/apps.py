@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BookingsConfig(AppConfig):
     name = 'apps.bookings'
+
+    def ready(self):
+        from . import handlers  # noqa: F401 - регистрация обработчиков outbox
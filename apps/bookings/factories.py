@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import factory
+from django.utils import timezone
+from factory.django import DjangoModelFactory
+
+from apps.properties.factories import RealEstateListingFactory
+from apps.users.factories import UserFactory
+from .models import Availability, Booking, OutboxEvent
+
+
+class AvailabilityFactory(DjangoModelFactory):
+    """Период доступности на ближайшие 90 дней"""
+    class Meta:
+        model = Availability
+
+    listing = factory.SubFactory(RealEstateListingFactory)
+    start_date = factory.LazyFunction(lambda: timezone.now().date() + timedelta(days=1))
+    end_date = factory.LazyAttribute(lambda o: o.start_date + timedelta(days=90))
+
+
+class BookingFactory(DjangoModelFactory):
+    """Цена, итог и дедлайн отмены считаются в Booking.save()"""
+    class Meta:
+        model = Booking
+
+    class Params:
+        nights = 3
+
+    listing = factory.SubFactory(RealEstateListingFactory)
+    guest = factory.SubFactory(UserFactory)
+    check_in = factory.LazyFunction(lambda: timezone.now().date() + timedelta(days=14))
+    check_out = factory.LazyAttribute(lambda o: o.check_in + timedelta(days=o.nights))
+    status = 'pending'
+
+
+class OutboxEventFactory(DjangoModelFactory):
+    class Meta:
+        model = OutboxEvent
+
+    topic = 'booking.confirmed'
+    key = factory.Sequence(lambda n: f'booking.confirmed:{n}')
+    payload = factory.LazyAttribute(lambda o: {'booking_id': 0, 'listing_id': 0, 'status': 'confirmed'})
@@ -0,0 +1,104 @@
+"""
+Гибкий поиск по датам: ± N дней, любые выходные, любая неделя месяца.
+
+Вместо проверки доступности для каждой возможной даты заезда
+(один запрос на дату) периоды Availability всех объявлений читаются
+одним запросом, отсортированными по (listing_id, start_date),
+и обходятся за один проход на объявление.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import groupby
+
+
+FLEX_AROUND = 'around'      # check_in ± flex_days
+FLEX_WEEKEND = 'weekend'    # заезд в пятницу в пределах месяца
+FLEX_MONTH = 'month'        # любой заезд в пределах месяца
+
+FLEX_MODES = [
+    (FLEX_AROUND, 'Around a date'),
+    (FLEX_WEEKEND, 'Any weekend'),
+    (FLEX_MONTH, 'Any time in a month'),
+]
+
+FRIDAY = 4
+
+
+@dataclass(frozen=True)
+class FlexibleQuery:
+    """Параметры гибкого поиска (диапазон допустимых дат заезда)"""
+    first_check_in: date
+    last_check_in: date
+    nights: int
+    weekdays: frozenset = frozenset()   # пусто = любой день недели
+    anchor: date | None = None          # для сортировки по близости к дате
+    limit: int = 3
+
+    @property
+    def last_check_out(self):
+        return self.last_check_in + timedelta(days=self.nights)
+
+    def accepts(self, check_in):
+        return not self.weekdays or check_in.weekday() in self.weekdays
+
+    def sort_key(self, check_in):
+        if self.anchor is None:
+            return (check_in - self.first_check_in).days
+        return abs((check_in - self.anchor).days), check_in
+
+
+def month_bounds(year, month):
+    """Первый и последний день месяца"""
+    first = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return first, next_month - timedelta(days=1)
+
+
+def windows_in_runs(runs, query, earliest_check_in):
+    """
+    Лучшие окна (check_in, check_out) внутри периодов доступности.
+
+    runs - периоды (start_date, end_date) одного объявления.
+    Окно подходит, если один период покрывает [check_in, check_out] -
+    то же правило, что и в Booking.check_availability.
+    """
+    nights = timedelta(days=query.nights)
+    first = max(query.first_check_in, earliest_check_in)
+    candidates = []
+
+    for start_date, end_date in runs:
+        # Скользящее окно длиной nights: допустимые даты заезда внутри
+        # периода образуют непрерывный отрезок [lo, hi]
+        lo = max(start_date, first)
+        hi = min(end_date - nights, query.last_check_in)
+        found = 0
+        day = lo
+        while day <= hi:
+            if query.accepts(day):
+                candidates.append(day)
+                found += 1
+                # Без опорной даты лучшие окна - самые ранние в периоде
+                if query.anchor is None and found == query.limit:
+                    break
+            day += timedelta(days=1)
+
+    candidates = sorted(set(candidates), key=query.sort_key)[:query.limit]
+    return [(check_in, check_in + nights) for check_in in candidates]
+
+
+def scan_availability(rows, query, earliest_check_in):
+    """
+    Один проход по строкам (listing_id, start_date, end_date),
+    отсортированным по listing_id. Возвращает {listing_id: [окна]}
+    только для объявлений, у которых нашлось хотя бы одно окно.
+    """
+    result = {}
+    for listing_id, group in groupby(rows, key=lambda row: row[0]):
+        windows = windows_in_runs(
+            ((start_date, end_date) for _, start_date, end_date in group),
+            query,
+            earliest_check_in
+        )
+        if windows:
+            result[listing_id] = windows
+    return result
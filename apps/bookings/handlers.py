@@ -0,0 +1,30 @@
+"""
+Обработчики событий брони (см. outbox.py).
+Подключаются в BookingsConfig.ready().
+"""
+import logging
+
+from apps.properties.models import RealEstateListing
+from apps.users.host_cards import refresh_hosts
+from .outbox import handler
+
+
+logger = logging.getLogger(__name__)
+
+
+@handler('booking.confirmed')
+@handler('booking.cancelled')
+@handler('booking.completed')
+def log_status_change(payload, event):
+    logger.info('Booking %s is %s', payload['booking_id'], payload['status'])
+
+
+@handler('booking.confirmed')
+@handler('booking.cancelled')
+@handler('booking.completed')
+def refresh_host_summary(payload, event):
+    # Доля ответов и подтверждений в карточке хоста; пересчёт идемпотентен
+    refresh_hosts(
+        RealEstateListing.objects.filter(id=payload['listing_id'])
+        .values_list('real_estate_object__host_id', flat=True)
+    )
@@ -0,0 +1,214 @@
+"""
+iCal (RFC 5545) экспорт и импорт доступности объявления.
+
+Экспорт: подтверждённые брони (SUMMARY:Reserved) и периоды Availability
+(SUMMARY:Available, TRANSP:TRANSPARENT). Импорт: события внешнего календаря
+считаются занятыми датами и вычитаются из базовой доступности хоста
+(Availability + снятые прошлым импортом ExternalBlock).
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+
+UID_DOMAIN = 'rent-api'
+PRODID = '-//final-project-advanced-python//Availability//EN'
+
+ONE_DAY = timedelta(days=1)
+
+
+def _escape(text):
+    return (
+        str(text)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\n', '\\n')
+    )
+
+
+def _format_date(value):
+    return value.strftime('%Y%m%d')
+
+
+def _format_stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(uid, start, end, summary, stamp, transparent=False):
+    """end - исключительная граница (как DTEND для событий на весь день)"""
+    return (
+        'BEGIN:VEVENT\r\n'
+        f'UID:{uid}@{UID_DOMAIN}\r\n'
+        f'DTSTAMP:{_format_stamp(stamp)}\r\n'
+        f'DTSTART;VALUE=DATE:{_format_date(start)}\r\n'
+        f'DTEND;VALUE=DATE:{_format_date(end)}\r\n'
+        f'SUMMARY:{summary}\r\n'
+        f'TRANSP:{"TRANSPARENT" if transparent else "OPAQUE"}\r\n'
+        'END:VEVENT\r\n'
+    )
+
+
+def render_calendar(listing, availabilities, bookings):
+    """
+    Генератор строк календаря для StreamingHttpResponse.
+    availabilities и bookings - итераторы (queryset.iterator()),
+    поэтому память не зависит от количества периодов.
+    """
+    yield (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        f'PRODID:{PRODID}\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        f'X-WR-CALNAME:{_escape(listing.real_estate_object.title)}\r\n'
+    )
+
+    for booking in bookings:
+        yield _event(
+            f'booking-{booking.id}',
+            booking.check_in,
+            booking.check_out,
+            'Reserved',
+            booking.updated_at
+        )
+
+    for availability in availabilities:
+        yield _event(
+            f'availability-{availability.id}',
+            availability.start_date,
+            availability.end_date + ONE_DAY,
+            'Available',
+            availability.updated_at,
+            transparent=True
+        )
+
+    yield 'END:VCALENDAR\r\n'
+
+
+def _unfold(lines):
+    """Склеивает перенесённые строки (продолжение начинается с пробела/таба)"""
+    current = None
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _parse_date(value):
+    value = value.strip()[:8]
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def parse_blocked_ranges(lines):
+    """
+    Занятые периоды [start, end) из внешнего календаря.
+    Пропускает отменённые и прозрачные события, а также события,
+    экспортированные этим же сервисом (UID ...@rent-api).
+    """
+    ranges = []
+    event = None
+
+    for line in _unfold(lines):
+        if line == 'BEGIN:VEVENT':
+            event = {}
+            continue
+        if line == 'END:VEVENT':
+            if event and 'DTSTART' in event:
+                own = event.get('UID', '').endswith(f'@{UID_DOMAIN}')
+                skipped = (
+                    event.get('STATUS') == 'CANCELLED' or
+                    event.get('TRANSP') == 'TRANSPARENT'
+                )
+                if not own and not skipped:
+                    start = _parse_date(event['DTSTART'])
+                    end = _parse_date(event['DTEND']) if 'DTEND' in event else start + ONE_DAY
+                    ranges.append((start, max(end, start + ONE_DAY)))
+            event = None
+            continue
+        if event is None or ':' not in line:
+            continue
+
+        name, value = line.split(':', 1)
+        event[name.split(';', 1)[0].upper()] = value.strip()
+
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges):
+    """Объединяет пересекающиеся и соседние периоды [start, end)"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_blocked(intervals, blocked):
+    """
+    Вычитает занятые периоды [start, end) из периодов доступности
+    (start_date, end_date включительно). blocked - результат merge_ranges.
+    """
+    result = []
+    for start_date, end_date in intervals:
+        cursor = start_date
+        for blocked_start, blocked_end in blocked:
+            if blocked_end <= cursor or blocked_start > end_date:
+                continue
+            if blocked_start > cursor:
+                result.append((cursor, blocked_start - ONE_DAY))
+            cursor = max(cursor, blocked_end)
+            if cursor > end_date:
+                break
+        if cursor <= end_date:
+            result.append((cursor, end_date))
+    return result
+
+
+def intersect_blocked(intervals, blocked):
+    """
+    Части периодов (start_date, end_date включительно), попадающие
+    в занятые периоды [start, end). blocked - результат merge_ranges.
+    """
+    result = []
+    for start_date, end_date in intervals:
+        for blocked_start, blocked_end in blocked:
+            start = max(start_date, blocked_start)
+            end = min(end_date, blocked_end - ONE_DAY)
+            if start <= end:
+                result.append((start, end))
+    return result
+
+
+def merge_periods(periods):
+    """Объединяет пересекающиеся и соседние периоды (start_date, end_date включительно)"""
+    return [
+        (start, end - ONE_DAY)
+        for start, end in merge_ranges((start, end + ONE_DAY) for start, end in periods)
+    ]
+
+
+def diff_periods(rows, desired):
+    """
+    Минимальные изменения строк (id, start_date, end_date) до набора desired:
+    (id к удалению, периоды к созданию). Дубликаты периодов удаляются.
+    """
+    kept = set()
+    to_delete = []
+    for pk, start, end in rows:
+        if (start, end) in desired and (start, end) not in kept:
+            kept.add((start, end))
+        else:
+            to_delete.append(pk)
+    return to_delete, sorted(set(desired) - kept)
+
+
+def last_modified_of(*values):
+    """Самая поздняя из дат изменений (None игнорируются)"""
+    values = [value for value in values if value is not None]
+    return max(values) if values else datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
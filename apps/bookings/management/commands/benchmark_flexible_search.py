@@ -0,0 +1,118 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases
+from django.utils import timezone
+
+from apps.bookings.flexible_search import FlexibleQuery, month_bounds, scan_availability
+from apps.bookings.models import Availability
+from apps.properties.models import RealEstateListing
+from apps.shared import dataset
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк гибкого поиска на синтетическом каталоге в отдельной тестовой БД.
+
+    Каталог строится apps/shared/dataset.py, периоды доступности каждого
+    объявления заменяются на --periods случайных периодов вокруг месяца.
+    Сравнивает однопроходный scan_availability (запрос как в
+    PublicListingViewSet.flexible_list) с наивным подходом "запрос на
+    каждую дату заезда"; число SQL - реально выполненные запросы.
+
+    python manage.py benchmark_flexible_search --listings 100000
+    python manage.py benchmark_flexible_search --listings 10000 --month 2027-02 --keepdb
+    """
+    help = 'Benchmark flexible-date search against a synthetic catalog in a test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100_000)
+        parser.add_argument('--periods', type=int, default=6, help='Availability periods per listing')
+        parser.add_argument('--nights', type=int, default=5)
+        parser.add_argument('--month', help='YYYY-MM (default: next month)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the benchmark database (and its catalog) between runs')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        if options['month']:
+            year, month = map(int, options['month'].split('-'))
+        else:
+            next_month = timezone.now().date().replace(day=28) + timedelta(days=4)
+            year, month = next_month.year, next_month.month
+        first_day, last_day = month_bounds(year, month)
+        query = FlexibleQuery(
+            first_check_in=first_day,
+            last_check_in=last_day,
+            nights=options['nights']
+        )
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            listings = dataset.grow(options['listings'], options['seed'])
+            rows = self.build_catalog(rnd, options['periods'], first_day)
+            self.stdout.write(f'Catalog: {listings} listings, {rows} availability rows')
+
+            reset_queries()  # при DEBUG журнал мог заполниться при построении каталога
+            scan_time, scan_matches, scan_queries = self.timed(self.single_pass, query, first_day)
+            naive_time, naive_matches, naive_queries = self.timed(self.naive_search, query)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+
+        self.stdout.write(
+            f"single pass: {scan_time * 1000:.1f} ms, {scan_matches} listings matched, "
+            f"{scan_queries} queries"
+        )
+        self.stdout.write(
+            f"per-date:    {naive_time * 1000:.1f} ms, {naive_matches} listings matched, "
+            f"{naive_queries} queries"
+        )
+
+    def build_catalog(self, rnd, periods, around):
+        """Заменяет доступность всех объявлений на случайные периоды; возвращает число строк"""
+        Availability.objects.all().delete()
+        rows = []
+        for listing_id in RealEstateListing.objects.order_by('id').values_list('id', flat=True).iterator():
+            day = around - timedelta(days=rnd.randint(0, 30))
+            for _ in range(rnd.randint(1, periods)):
+                day += timedelta(days=rnd.randint(1, 10))     # занятые дни между периодами
+                length = rnd.randint(1, 14)
+                rows.append(Availability(listing_id=listing_id, start_date=day, end_date=day + timedelta(days=length)))
+                day += timedelta(days=length + 1)
+        Availability.objects.bulk_create(rows, batch_size=dataset.BATCH_SIZE)
+        return len(rows)
+
+    def timed(self, search, *args):
+        """(секунды, найдено объявлений, выполнено SQL)"""
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            matches = search(*args)
+            elapsed = time.perf_counter() - started
+        return elapsed, matches, len(captured)
+
+    def single_pass(self, query, earliest_check_in):
+        """Один запрос за периодами, отсортированными по (listing_id, start_date)"""
+        rows = Availability.objects.filter(
+            start_date__lte=query.last_check_in,
+            end_date__gte=query.first_check_in
+        ).order_by('listing_id', 'start_date').values_list('listing_id', 'start_date', 'end_date')
+        return len(scan_availability(rows.iterator(), query, earliest_check_in))
+
+    def naive_search(self, query):
+        """Проверка каждой даты заезда отдельным запросом"""
+        matched = set()
+        day = query.first_check_in
+        while day <= query.last_check_in:
+            matched.update(
+                Availability.objects.filter(
+                    start_date__lte=day,
+                    end_date__gte=day + timedelta(days=query.nights)
+                ).values_list('listing_id', flat=True)
+            )
+            day += timedelta(days=1)
+        return len(matched)
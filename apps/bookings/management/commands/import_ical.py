@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.bookings.ical import (
+    diff_periods,
+    intersect_blocked,
+    merge_periods,
+    parse_blocked_ranges,
+    subtract_blocked
+)
+from apps.bookings.models import Availability, ExternalBlock
+from apps.properties.models import RealEstateListing
+
+
+class Command(BaseCommand):
+    """
+    Импорт внешнего iCal-календаря (занятые даты с других площадок).
+
+    Базовая доступность хоста - периоды Availability вместе с датами,
+    снятыми прошлым импортом (ExternalBlock). Занятые периоды календаря
+    вычитаются из базовой доступности заново при каждом импорте, поэтому
+    даты удалённых внешних событий возвращаются в Availability.
+    Изменяются только отличающиеся строки: лишние удаляются одним
+    DELETE, новые создаются одним bulk_create. Повторный импорт того же
+    файла ничего не меняет (соседние периоды хранятся объединёнными).
+
+    python manage.py import_ical <listing_id> calendar.ics [--dry-run]
+    """
+    help = 'Import blocked dates from a local .ics file into listing availability'
+
+    def add_arguments(self, parser):
+        parser.add_argument('listing_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            listing = RealEstateListing.objects.get(pk=options['listing_id'])
+        except RealEstateListing.DoesNotExist:
+            raise CommandError(f"Listing {options['listing_id']} does not exist")
+
+        try:
+            with open(options['path'], encoding='utf-8') as feed:
+                blocked = parse_blocked_ranges(feed)
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+
+        with transaction.atomic():
+            # Блокируем периоды, чтобы не конфликтовать с Booking.confirm
+            current = list(
+                Availability.objects.filter(listing=listing)
+                .select_for_update()
+                .values_list('id', 'start_date', 'end_date')
+            )
+            held = list(
+                ExternalBlock.objects.filter(listing=listing)
+                .select_for_update()
+                .values_list('id', 'start_date', 'end_date')
+            )
+            base = merge_periods([(start, end) for _, start, end in current + held])
+
+            to_delete, to_create = diff_periods(current, subtract_blocked(base, blocked))
+            held_to_delete, held_to_create = diff_periods(held, intersect_blocked(base, blocked))
+
+            self.stdout.write(
+                f"Blocked ranges: {len(blocked)}, "
+                f"periods to delete: {len(to_delete)}, to create: {len(to_create)}, "
+                f"blocks to delete: {len(held_to_delete)}, to create: {len(held_to_create)}"
+            )
+            if options['dry_run']:
+                transaction.set_rollback(True)
+                return
+
+            if to_delete:
+                Availability.objects.filter(id__in=to_delete).delete()
+            if to_create:
+                Availability.objects.bulk_create([
+                    Availability(listing=listing, start_date=start, end_date=end)
+                    for start, end in to_create
+                ])
+            if held_to_delete:
+                ExternalBlock.objects.filter(id__in=held_to_delete).delete()
+            if held_to_create:
+                ExternalBlock.objects.bulk_create([
+                    ExternalBlock(listing=listing, start_date=start, end_date=end)
+                    for start, end in held_to_create
+                ])
+
+        self.stdout.write(self.style.SUCCESS('Availability synchronized'))
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.bookings.outbox import MAX_ATTEMPTS, claim_batch, process_event
+
+
+class Command(BaseCommand):
+    """
+    Воркер outbox: забирает пачки событий и обрабатывает их в пуле потоков.
+
+    python manage.py process_outbox --workers 8 --batch 100
+    python manage.py process_outbox --once      # одна пачка (cron)
+    """
+    help = 'Drain the booking outbox with a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **options):
+        max_attempts = options['max_attempts']
+
+        def run(event):
+            try:
+                return process_event(event, max_attempts=max_attempts)
+            finally:
+                # У каждого потока своё соединение с БД; закрывается по CONN_MAX_AGE или после ошибки
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                close_old_connections()
+                events = claim_batch(options['batch'])
+                if events:
+                    results = list(pool.map(run, events))
+                    self.stdout.write(
+                        f"Processed {results.count(True)}/{len(events)} events"
+                    )
+                if options['once']:
+                    break
+                if len(events) < options['batch']:
+                    time.sleep(options['poll_interval'])
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_outboxevent'),
+        ('properties', '0007_moderation_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExternalBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Start Date')),
+                ('end_date', models.DateField(help_text='Last blocked date', verbose_name='End Date')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='external_blocks', to='properties.realestatelisting', verbose_name='Listing')),
+            ],
+            options={
+                'verbose_name': 'External Block',
+                'verbose_name_plural': 'External Blocks',
+                'ordering': ['start_date'],
+                'indexes': [models.Index(fields=['listing', 'start_date'], name='bookings_ex_listing_651c2e_idx')],
+            },
+        ),
+    ]
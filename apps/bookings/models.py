@@ -3,7 +3,12 @@ from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from django.utils import timezone
-from apps.shared.constants import BOOKING_STATUS_CHOICES, CURRENCY_CHOICES, INFINITE_DATE
+from apps.shared.constants import (
+    BOOKING_STATUS_CHOICES,
+    CURRENCY_CHOICES,
+    INFINITE_DATE,
+    OUTBOX_STATUS_CHOICES
+)
 
 
 class Availability(models.Model):
@@ -82,6 +87,41 @@ class Availability(models.Model):
                 end_date <= self.end_date)
 
 
+class ExternalBlock(models.Model):
+    """
+    Даты, снятые с доступности последним импортом iCal (import_ical).
+    Базовая доступность хоста = Availability + ExternalBlock: при следующем
+    импорте она пересчитывается, и даты удалённых внешних событий
+    возвращаются в Availability.
+    """
+    listing = models.ForeignKey(
+        'properties.RealEstateListing',
+        on_delete=models.CASCADE,
+        related_name='external_blocks',
+        verbose_name=_('Listing')
+    )
+
+    start_date = models.DateField(
+        verbose_name=_('Start Date')
+    )
+
+    end_date = models.DateField(
+        verbose_name=_('End Date'),
+        help_text=_('Last blocked date')
+    )
+
+    class Meta:
+        verbose_name = _('External Block')
+        verbose_name_plural = _('External Blocks')
+        ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['listing', 'start_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.start_date} - {self.end_date} blocked for {self.listing}"
+
+
 class Booking(models.Model):
     """
     Бронирование (создание, отмена, подтверждение бронирования).
@@ -296,17 +336,33 @@ class Booking(models.Model):
                     Availability.objects.bulk_create(periods_to_create)
 
                 # Отклоняем пересекающиеся pending брони
-                Booking.objects.filter(
-                    listing=self.listing,
-                    status='pending',
-                    check_in__lt=self.check_out,
-                    check_out__gt=self.check_in
-                ).exclude(id=self.id).update(status='cancelled')
+                rejected_ids = list(
+                    Booking.objects.filter(
+                        listing=self.listing,
+                        status='pending',
+                        check_in__lt=self.check_out,
+                        check_out__gt=self.check_in
+                    ).exclude(id=self.id).values_list('id', flat=True)
+                )
+                if rejected_ids:
+                    Booking.objects.filter(id__in=rejected_ids).update(
+                        status='cancelled',
+                        updated_at=timezone.now()
+                    )
 
                 # Подтверждаем текущую бронь
                 self.status = 'confirmed'
                 super().save(update_fields=['status', 'updated_at'])
 
+                # Побочные эффекты - через outbox в той же транзакции
+                OutboxEvent.enqueue_many(
+                    [self.status_event()] +
+                    [
+                        self.status_event(booking_id=booking_id, status='cancelled')
+                        for booking_id in rejected_ids
+                    ]
+                )
+
                 return True, "Booking confirmed successfully"
 
         except Exception as e:
@@ -319,24 +375,116 @@ class Booking(models.Model):
             return False, "Cannot cancel booking in current status"
 
         old_status = self.status
-        self.status = 'cancelled'
-        self.save()
+        with transaction.atomic():
+            self.status = 'cancelled'
+            self.save()
 
-        # Возвращаем даты в доступность только если бронь была confirmed
-        if old_status == 'confirmed':
-            with transaction.atomic():
+            # Возвращаем даты в доступность только если бронь была confirmed
+            if old_status == 'confirmed':
                 Availability.objects.create(
                     listing=self.listing,
                     start_date=self.check_in,
                     end_date=self.check_out - timezone.timedelta(days=1)
                 )
 
+            OutboxEvent.enqueue_many([self.status_event()])
+
         return True, "Booking cancelled"
 
     def complete(self):
         """Завершить бронирование (после выезда)"""
         if self.status == 'confirmed' and self.check_out < timezone.now().date():
-            self.status = 'completed'
-            self.save()
+            with transaction.atomic():
+                self.status = 'completed'
+                self.save()
+                OutboxEvent.enqueue_many([self.status_event()])
             return True, "Booking completed"
-        return False, "Cannot complete booking"
\ No newline at end of file
+        return False, "Cannot complete booking"
+
+    def status_event(self, booking_id=None, status=None):
+        """Событие outbox о смене статуса (ключ идемпотентности - бронь + статус)"""
+        booking_id = booking_id or self.id
+        status = status or self.status
+        return OutboxEvent(
+            topic=f'booking.{status}',
+            key=f'booking.{status}:{booking_id}',
+            payload={
+                'booking_id': booking_id,
+                'listing_id': self.listing_id,
+                'status': status,
+            }
+        )
+
+
+class OutboxEvent(models.Model):
+    """
+    Transactional outbox: событие пишется в той же транзакции,
+    что и изменение статуса брони, и обрабатывается воркером
+    (manage.py process_outbox) вне запроса.
+    """
+    topic = models.CharField(
+        verbose_name=_('Topic'),
+        max_length=50
+    )
+
+    key = models.CharField(
+        verbose_name=_('Idempotency Key'),
+        max_length=100,
+        unique=True,
+        help_text=_('Repeated events with the same key are ignored')
+    )
+
+    payload = models.JSONField(
+        verbose_name=_('Payload'),
+        default=dict
+    )
+
+    status = models.CharField(
+        verbose_name=_('Status'),
+        max_length=20,
+        choices=OUTBOX_STATUS_CHOICES,
+        default='pending'
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_('Attempts'),
+        default=0
+    )
+
+    available_at = models.DateTimeField(
+        verbose_name=_('Available At'),
+        default=timezone.now,
+        help_text=_('Event is not processed before this time (retry backoff / worker lease)')
+    )
+
+    last_error = models.TextField(
+        verbose_name=_('Last Error'),
+        blank=True
+    )
+
+    created_at = models.DateTimeField(
+        verbose_name=_('Created At'),
+        auto_now_add=True
+    )
+
+    processed_at = models.DateTimeField(
+        verbose_name=_('Processed At'),
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = _('Outbox Event')
+        verbose_name_plural = _('Outbox Events')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id} ({self.status})"
+
+    @classmethod
+    def enqueue_many(cls, events):
+        """Один INSERT на все события; дубликаты по key игнорируются"""
+        cls.objects.bulk_create(events, ignore_conflicts=True)
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Обработка событий outbox.
+
+Обработчики регистрируются декоратором @handler('booking.confirmed').
+Доставка "как минимум один раз": событие может быть обработано повторно
+(падение воркера, ошибка в соседнем обработчике), поэтому обработчики
+должны быть идемпотентными - пересчитывать состояние, а не прибавлять.
+"""
+import logging
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+_handlers = defaultdict(list)
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 60 * 60
+LEASE_SECONDS = 5 * 60      # после этого "зависшее" событие снова доступно
+
+
+def handler(topic):
+    """Регистрирует обработчик события: fn(payload, event)"""
+    def decorator(fn):
+        _handlers[topic].append(fn)
+        return fn
+    return decorator
+
+
+def handlers_for(topic):
+    return list(_handlers.get(topic, []))
+
+
+def backoff_delay(attempts):
+    """Экспоненциальная задержка с джиттером"""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(size):
+    """
+    Забирает пачку готовых событий и продлевает им аренду (lease).
+    На MySQL/PostgreSQL - SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    несколько воркеров не берут одни и те же события.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = OutboxEvent.objects.filter(
+            Q(status='pending') | Q(status='processing'),
+            available_at__lte=now
+        ).order_by('available_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+
+        events = list(queryset[:size])
+        if events:
+            lease_until = now + timedelta(seconds=LEASE_SECONDS)
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+                status='processing',
+                attempts=F('attempts') + 1,
+                available_at=lease_until
+            )
+            for event in events:
+                event.status = 'processing'
+                event.attempts += 1
+                event.available_at = lease_until
+    return events
+
+
+def finish(event, **fields):
+    """
+    Фиксирует результат, только если аренда всё ещё наша: номер попытки
+    (растёт при каждом claim) и срок аренды не изменились. Воркер с
+    истёкшей арендой не перезапишет событие, которое забрал другой.
+    """
+    updated = OutboxEvent.objects.filter(
+        id=event.id,
+        status='processing',
+        attempts=event.attempts,
+        available_at=event.available_at
+    ).update(**fields)
+    if not updated:
+        logger.warning('Outbox event %s (%s): lease lost, result dropped', event.id, event.topic)
+    return bool(updated)
+
+
+def process_event(event, max_attempts=MAX_ATTEMPTS):
+    """Выполняет все обработчики события и фиксирует результат"""
+    try:
+        for fn in handlers_for(event.topic):
+            fn(event.payload, event)
+    except Exception as e:
+        logger.exception('Outbox event %s (%s) failed', event.id, event.topic)
+        failed = event.attempts >= max_attempts
+        finish(
+            event,
+            status='failed' if failed else 'pending',
+            available_at=timezone.now() + backoff_delay(event.attempts),
+            last_error=f'{type(e).__name__}: {e}'[:2000]
+        )
+        return False
+
+    return finish(
+        event,
+        status='done',
+        processed_at=timezone.now(),
+        last_error=''
+    )
@@ -1,3 +1,180 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.properties.factories import RealEstateListingFactory
+from . import outbox
+from .factories import AvailabilityFactory, BookingFactory, OutboxEventFactory
+from .models import Availability, ExternalBlock, OutboxEvent
+
+
+def ics(*events):
+    """Календарь с событиями (start, end) на весь день, end - исключительная граница"""
+    lines = ['BEGIN:VCALENDAR']
+    for number, (start, end) in enumerate(events):
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:event-{number}@other-platform',
+            f'DTSTART;VALUE=DATE:{start:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{end:%Y%m%d}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+class ImportIcalTests(TestCase):
+    def setUp(self):
+        self.listing = RealEstateListingFactory()
+        self.start = date.today() + timedelta(days=10)
+        AvailabilityFactory(listing=self.listing, start_date=self.start, end_date=self.start + timedelta(days=29))
+
+    def day(self, offset):
+        return self.start + timedelta(days=offset)
+
+    def import_calendar(self, *events):
+        descriptor, path = tempfile.mkstemp(suffix='.ics')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as feed:
+            feed.write(ics(*events))
+        self.addCleanup(os.remove, path)
+        call_command('import_ical', self.listing.id, path, stdout=StringIO())
+
+    def periods(self, model=Availability):
+        return list(model.objects.filter(listing=self.listing).order_by('start_date').values_list('start_date', 'end_date'))
+
+    def test_blocked_dates_are_removed_and_kept_aside(self):
+        self.import_calendar((self.day(5), self.day(8)))
+
+        self.assertEqual(self.periods(), [(self.day(0), self.day(4)), (self.day(8), self.day(29))])
+        self.assertEqual(self.periods(ExternalBlock), [(self.day(5), self.day(7))])
+
+    def test_reimport_of_same_calendar_changes_nothing(self):
+        self.import_calendar((self.day(5), self.day(8)))
+        ids = set(Availability.objects.values_list('id', flat=True))
+
+        self.import_calendar((self.day(5), self.day(8)))
+
+        self.assertEqual(set(Availability.objects.values_list('id', flat=True)), ids)
+
+    def test_removed_external_event_restores_dates(self):
+        self.import_calendar((self.day(5), self.day(8)), (self.day(20), self.day(22)))
+        self.import_calendar((self.day(20), self.day(22)))
+
+        self.assertEqual(self.periods(), [(self.day(0), self.day(19)), (self.day(22), self.day(29))])
+        self.assertEqual(self.periods(ExternalBlock), [(self.day(20), self.day(21))])
+
+        self.import_calendar()
+        self.assertEqual(self.periods(), [(self.day(0), self.day(29))])
+        self.assertEqual(self.periods(ExternalBlock), [])
+
+    def test_duplicate_periods_are_deleted(self):
+        AvailabilityFactory(listing=self.listing, start_date=self.start, end_date=self.day(29))
+
+        self.import_calendar()
+
+        self.assertEqual(self.periods(), [(self.day(0), self.day(29))])
+
+
+class IcalFeedTests(TestCase):
+    def test_unknown_listing_is_json_404(self):
+        for url in ('/api/v1/listing/999999/ical/', '/api/v1/listing/abc/ical/'):
+            with self.subTest(url=url):
+                response = APIClient().get(url)
+
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('detail', response.json())
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        patcher = mock.patch.dict(outbox._handlers, {'test.ok': [self.ok], 'test.fail': [self.fail_handler]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ok(self, payload, event):
+        self.calls.append(event.id)
+
+    def fail_handler(self, payload, event):
+        raise ValueError('boom')
+
+    def refresh(self, event):
+        return OutboxEvent.objects.get(pk=event.pk)
+
+    def test_claimed_events_are_leased_and_not_claimed_again(self):
+        events = OutboxEventFactory.create_batch(3, topic='test.ok')
+
+        first = outbox.claim_batch(2)
+        second = outbox.claim_batch(10)
+
+        self.assertEqual([event.id for event in first], [events[0].id, events[1].id])
+        self.assertEqual([event.id for event in second], [events[2].id])
+        self.assertEqual(outbox.claim_batch(10), [])
+        leased = self.refresh(events[0])
+        self.assertEqual((leased.status, leased.attempts), ('processing', 1))
+        self.assertGreater(leased.available_at, timezone.now())
+
+    def test_expired_lease_is_claimed_again(self):
+        event = OutboxEventFactory(topic='test.ok')
+        outbox.claim_batch(1)
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now() - timedelta(seconds=1))
+
+        [reclaimed] = outbox.claim_batch(1)
+
+        self.assertEqual((reclaimed.id, reclaimed.attempts), (event.id, 2))
+
+    def test_processed_event_is_done_once(self):
+        event = OutboxEventFactory(topic='test.ok')
+        [claimed] = outbox.claim_batch(1)
+
+        self.assertTrue(outbox.process_event(claimed))
+
+        self.assertEqual(self.calls, [event.id])
+        self.assertEqual(self.refresh(event).status, 'done')
+        self.assertEqual(outbox.claim_batch(1), [])
+
+    def test_failed_event_is_retried_with_backoff_then_marked_failed(self):
+        event = OutboxEventFactory(topic='test.fail')
+        [claimed] = outbox.claim_batch(1)
+
+        with self.assertLogs('apps.bookings.outbox', 'ERROR'):
+            self.assertFalse(outbox.process_event(claimed, max_attempts=2))
+        retry = self.refresh(event)
+        self.assertEqual(retry.status, 'pending')
+        self.assertIn('ValueError: boom', retry.last_error)
+        self.assertGreater(retry.available_at, timezone.now())
+        self.assertEqual(outbox.claim_batch(1), [])     # ещё не время
+
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        [claimed] = outbox.claim_batch(1)
+        with self.assertLogs('apps.bookings.outbox', 'ERROR'):
+            self.assertFalse(outbox.process_event(claimed, max_attempts=2))
+        self.assertEqual(self.refresh(event).status, 'failed')
+
+    def test_worker_with_lost_lease_does_not_overwrite_result(self):
+        event = OutboxEventFactory(topic='test.ok')
+        [stale] = outbox.claim_batch(1)
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now() - timedelta(seconds=1))
+        [current] = outbox.claim_batch(1)
+
+        with self.assertLogs('apps.bookings.outbox', 'WARNING'):
+            self.assertFalse(outbox.process_event(stale))
+        self.assertEqual(self.refresh(event).status, 'processing')
+
+        self.assertTrue(outbox.process_event(current))
+        self.assertEqual(self.refresh(event).status, 'done')
+
+    def test_status_event_is_enqueued_once_per_key(self):
+        booking = BookingFactory()
+        OutboxEvent.enqueue_many([booking.status_event()])
+        OutboxEvent.enqueue_many([booking.status_event()])
 
-# Create your tests here.
+        self.assertEqual(OutboxEvent.objects.filter(key=f'booking.pending:{booking.id}').count(), 1)
@@ -0,0 +1,126 @@
+"""
+Асинхронный (ASGI) путь чтения публичных объявлений.
+
+GET /api/v1/async/listings/       - как PublicListingViewSet.list
+GET /api/v1/async/listing/{id}/   - как ListingDetailViewSet.retrieve
+
+Фильтры, аутентификация и сериализаторы те же, что у синхронного API,
+но пока MySQL отвечает, поток воркера свободен для других запросов.
+Объявления читаются асинхронным ORM. Независимые части детальной
+страницы (удобства, последние отзывы, карточка хоста) загружаются
+одновременно через asyncio.gather, каждая в своём потоке со своим
+подключением: асинхронный ORM Django выполняет запросы одного
+HTTP-запроса по очереди в одном потоке.
+
+Под WSGI представления тоже работают (выигрыша нет). Гибкий поиск
+(?flex=) отдаётся синхронным представлением.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework import exceptions, filters
+from rest_framework.renderers import JSONRenderer
+
+from apps.reviews.models import RECENT_REVIEWS_LIMIT, PropertyReview
+from apps.search.buffer import search_buffer
+from apps.search.tracking import view_tracker
+from apps.shared.replicas import apply_user_pin, read_from_replica
+from apps.users.host_cards import get_host_card
+from .models import Amenity
+from .serializers import AsyncListingReadSerializer, ListingListSerializer
+from .views import ListingDetailViewSet, PublicListingViewSet
+
+
+sync_listing_list = PublicListingViewSet.as_view({'get': 'list'})
+
+
+def in_own_thread(func):
+    """
+    Синхронная функция в отдельном потоке (параллельно с другими).
+    Подключение потока закрывается, как после обычного запроса (CONN_MAX_AGE).
+    """
+    def run(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def start_view(view_class, request, action, **kwargs):
+    """ViewSet без диспетчеризации DRF: запрос DRF и пользователь (аутентификация - в потоке)"""
+    view = view_class(action_map={'get': action}, args=(), kwargs=kwargs, format_kwarg=None)
+    view.request = view.initialize_request(request, **kwargs)
+    user = await sync_to_async(authenticate)(view.request)
+    return view, user
+
+
+def authenticate(drf_request):
+    user = drf_request.user
+    apply_user_pin(user)
+    return user
+
+
+def error_response(exc):
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    return json_response(detail, status=exc.status_code)
+
+
+@read_from_replica
+async def listing_list(request):
+    if 'flex' in request.GET:
+        return await sync_to_async(sync_listing_list)(request)
+    try:
+        view, user = await start_view(PublicListingViewSet, request, 'list')
+        queryset = view.filter_queryset(view.get_queryset())
+    except exceptions.APIException as exc:
+        return error_response(exc)
+
+    query = request.GET.get(filters.SearchFilter.search_param)
+    if query:
+        await sync_to_async(search_buffer.record)(query, user)
+
+    listings = [listing async for listing in queryset]
+    serializer = ListingListSerializer(listings, many=True, context={'request': view.request})
+    return json_response(serializer.data)
+
+
+def load_amenities(real_estate_object_id):
+    return list(Amenity.objects.filter(properties=real_estate_object_id))
+
+
+def load_recent_reviews(listing_id):
+    return list(
+        PropertyReview.objects.approved().filter(listing_id=listing_id)
+        .select_related('guest').order_by('-created_at')[:RECENT_REVIEWS_LIMIT]
+    )
+
+
+@read_from_replica
+async def listing_detail(request, pk):
+    try:
+        view, user = await start_view(ListingDetailViewSet, request, 'retrieve', pk=pk)
+    except exceptions.APIException as exc:
+        return error_response(exc)
+
+    # Основной запрос без prefetch: его части ниже загружаются параллельно
+    try:
+        listing = await view.get_queryset().prefetch_related(None).aget(pk=pk)
+    except ObjectDoesNotExist:
+        return error_response(exceptions.NotFound())
+
+    listing.loaded_amenities, listing.recent_approved_reviews, listing.host_card = await asyncio.gather(
+        in_own_thread(load_amenities)(listing.real_estate_object_id),
+        in_own_thread(load_recent_reviews)(listing.id),
+        in_own_thread(get_host_card)(listing.real_estate_object.host_id),
+    )
+    await sync_to_async(view_tracker.record)(listing, user)
+    serializer = AsyncListingReadSerializer(listing, context={'request': view.request})
+    return json_response(serializer.data)
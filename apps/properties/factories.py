@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import factory
+from factory import fuzzy
+from factory.django import DjangoModelFactory
+
+from apps.shared.constants import AMENITY_CATEGORIES, PROPERTY_TYPES
+from apps.users.factories import HostFactory
+from .models import Address, Amenity, PropertyStats, RealEstateListing, RealEstateObject
+
+
+class AddressFactory(DjangoModelFactory):
+    class Meta:
+        model = Address
+
+    city = factory.Faker('city', locale='de_DE')
+    street = factory.Faker('street_name', locale='de_DE')
+    house_number = factory.Faker('building_number', locale='de_DE')
+    postal_code = factory.Faker('postcode', locale='de_DE')
+    latitude = fuzzy.FuzzyFloat(47.3, 55.0)
+    longitude = fuzzy.FuzzyFloat(5.9, 15.0)
+    is_normalized = True
+
+
+class AmenityFactory(DjangoModelFactory):
+    class Meta:
+        model = Amenity
+        django_get_or_create = ['name']
+
+    name = factory.Sequence(lambda n: f'Amenity {n}')
+    category = fuzzy.FuzzyChoice([value for value, _ in AMENITY_CATEGORIES])
+
+
+class PropertyStatsFactory(DjangoModelFactory):
+    class Meta:
+        model = PropertyStats
+
+    rooms = fuzzy.FuzzyInteger(1, 6)
+    bathrooms = fuzzy.FuzzyInteger(1, 3)
+    max_guests = factory.LazyAttribute(lambda o: o.rooms * 2)
+    area_sqm = fuzzy.FuzzyInteger(20, 250)
+
+
+class RealEstateObjectFactory(DjangoModelFactory):
+    class Meta:
+        model = RealEstateObject
+        skip_postgeneration_save = True
+
+    host = factory.SubFactory(HostFactory)
+    title = factory.Faker('sentence', nb_words=4)
+    description = factory.Faker('paragraph')
+    property_type = fuzzy.FuzzyChoice([value for value, _ in PROPERTY_TYPES])
+    address = factory.SubFactory(AddressFactory)
+    stats = factory.SubFactory(PropertyStatsFactory)
+
+    @factory.post_generation
+    def amenities(self, create, extracted, **kwargs):
+        if create and extracted:
+            self.amenities.set(extracted)
+
+
+class RealEstateListingFactory(DjangoModelFactory):
+    """Опубликованное объявление (активно и одобрено)"""
+    class Meta:
+        model = RealEstateListing
+
+    real_estate_object = factory.SubFactory(RealEstateObjectFactory)
+    promo_title = factory.Faker('catch_phrase')
+    price_per_night = fuzzy.FuzzyDecimal(30, 400)
+    is_active = True
+    is_approved = True
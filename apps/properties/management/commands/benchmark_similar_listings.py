@@ -0,0 +1,61 @@
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.properties.similarity import DIMENSIONS, SimilarityIndex, write_index
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк поиска похожих объявлений на синтетическом индексе (без БД).
+
+    python manage.py benchmark_similar_listings --listings 500000 --regions 50
+    """
+    help = 'Benchmark nearest-neighbour lookups over a synthetic similarity index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=500_000)
+        parser.add_argument('--regions', type=int, default=50)
+        parser.add_argument('--lookups', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        count = options['listings']
+        # Размеры регионов неравномерные (как у городов): Zipf-подобное распределение
+        weights = 1.0 / np.arange(1, options['regions'] + 1)
+        regions = rng.choice(options['regions'], size=count, p=weights / weights.sum()).astype(np.int32)
+        vectors = rng.normal(size=(count, DIMENSIONS)).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            write_index(
+                directory,
+                np.arange(1, count + 1, dtype=np.int64),
+                vectors,
+                regions,
+                np.ones(count, dtype=bool),
+                [str(code) for code in range(options['regions'])],
+                timezone.now()
+            )
+            index = SimilarityIndex.load(directory)
+            index.nearest(1)        # прогрев страниц memmap
+
+            timings = []
+            for listing_id in rng.integers(1, count + 1, size=options['lookups']):
+                started = time.perf_counter()
+                index.nearest(int(listing_id))
+                timings.append((time.perf_counter() - started) * 1000)
+
+        timings = np.array(timings)
+        largest = np.bincount(regions).max()
+        self.stdout.write(
+            f'{count} listings, largest region {largest}: '
+            f'p50 {np.percentile(timings, 50):.2f} ms, '
+            f'p95 {np.percentile(timings, 95):.2f} ms, '
+            f'max {timings.max():.2f} ms'
+        )
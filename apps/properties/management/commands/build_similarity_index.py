@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.properties.similarity import build_full, refresh
+
+
+class Command(BaseCommand):
+    """
+    Строит / обновляет индекс похожих объявлений (memmap-файлы NumPy).
+    По умолчанию перекодируются только изменившиеся объявления.
+
+    python manage.py build_similarity_index
+    python manage.py build_similarity_index --full
+    """
+    help = 'Build or refresh the similar-listings vector index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild from scratch')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            count = build_full()
+            self.stdout.write(self.style.SUCCESS(f'Listings indexed: {count}'))
+            return
+        changed, added = refresh()
+        self.stdout.write(self.style.SUCCESS(f'Listings updated: {changed}, added: {added}'))
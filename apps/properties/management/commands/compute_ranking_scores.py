@@ -0,0 +1,37 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.properties.models import RealEstateListing
+from apps.properties.ranking import load_and_score
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает RealEstateListing.ranking_score для всех объявлений.
+    Записываются только изменившиеся значения (bulk_update пачками).
+
+    python manage.py compute_ranking_scores --chunk 1000
+    """
+    help = 'Recompute listing ranking scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ids, current, scores = load_and_score()
+        changed = np.flatnonzero(~np.isclose(current, scores, rtol=0, atol=1e-4))
+
+        chunk = options['chunk']
+        for start in range(0, len(changed), chunk):
+            positions = changed[start:start + chunk]
+            RealEstateListing.objects.bulk_update(
+                [
+                    RealEstateListing(id=int(ids[i]), ranking_score=float(scores[i]))
+                    for i in positions
+                ],
+                ['ranking_score']
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Listings scored: {len(ids)}, updated: {len(changed)}'
+        ))
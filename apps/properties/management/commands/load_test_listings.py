@@ -0,0 +1,140 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.properties.models import RealEstateListing
+
+
+PATHS = {
+    'sync': ('/api/v1/listing/{id}/', '/api/v1/listings/'),
+    'async': ('/api/v1/async/listing/{id}/', '/api/v1/async/listings/'),
+}
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест чтения объявлений: синхронный путь (DRF) против
+    асинхронного (apps/properties/async_views.py) при росте конкурентности.
+
+    Клиент - asyncio без сторонних библиотек, одно соединение на запрос.
+    Смесь запросов: --list-share списков по городу, остальное - детальные
+    страницы случайных объявлений (id из БД, которую использует сервер).
+
+    Один процесс сервера в обоих случаях:
+        gunicorn core.wsgi:application -w 1 --threads 4 -b 127.0.0.1:8000
+        uvicorn core.asgi:application --workers 1 --port 8001
+
+    python manage.py load_test_listings --base-url http://127.0.0.1:8000 --path sync
+    python manage.py load_test_listings --base-url http://127.0.0.1:8001 --path async --concurrency 1,16,64
+    """
+    help = 'Load test the sync and async listing read paths at several concurrency levels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--path', choices=sorted(PATHS), action='append',
+                            help='Read path to test (default: both)')
+        parser.add_argument('--concurrency', default='1,8,32,64',
+                            help='Comma-separated numbers of requests in flight')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per concurrency level')
+        parser.add_argument('--list-share', type=float, default=0.2,
+                            help='Share of city list requests (the rest are detail pages)')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write JSON results to this file')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('--base-url must be an http:// URL')
+        self.host, self.port = url.hostname, url.port or 80
+        self.timeout = options['timeout']
+
+        listings = list(
+            RealEstateListing.objects.filter(is_active=True, is_approved=True)
+            .values_list('id', 'real_estate_object__address__city')[:10_000]
+        )
+        if not listings:
+            raise CommandError('No published listings (python manage.py seed_data)')
+
+        rnd = random.Random(options['seed'])
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        results = []
+        for path in options['path'] or sorted(PATHS):
+            for concurrency in levels:
+                targets = self.targets(rnd, PATHS[path], listings, options['requests'], options['list_share'])
+                result = asyncio.run(self.run_level(targets, concurrency))
+                results.append({'path': path, 'concurrency': concurrency, **result})
+                self.stdout.write(
+                    f"{path:6} c={concurrency:<4} {result['rps']:8.1f} req/s  "
+                    f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                    f"p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'base_url': options['base_url'], 'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def targets(self, rnd, paths, listings, count, list_share):
+        detail_path, list_path = paths
+        targets = []
+        for _ in range(count):
+            listing_id, city = rnd.choice(listings)
+            if rnd.random() < list_share:
+                targets.append(f"{list_path}?{urlencode({'real_estate_object__address__city': city})}")
+            else:
+                targets.append(detail_path.format(id=listing_id))
+        return targets
+
+    async def run_level(self, targets, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(target):
+            async with semaphore:
+                return await self.fetch(target)
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(limited(target) for target in targets))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(ms for ok, ms in outcomes if ok)
+        if not timings:
+            timings = [0.0]
+
+        def percentile(share):
+            return round(timings[min(int(len(timings) * share), len(timings) - 1)], 2)
+
+        return {
+            'requests': len(targets),
+            'errors': sum(1 for ok, _ in outcomes if not ok),
+            'seconds': round(elapsed, 3),
+            'rps': round(len(targets) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+        }
+
+    async def fetch(self, target):
+        """(успех, мс) для GET target; успех - ответ 200"""
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+            writer.write(
+                f'GET {target} HTTP/1.1\r\nHost: {self.host}\r\n'
+                f'Accept: application/json\r\nConnection: close\r\n\r\n'.encode()
+            )
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+            await asyncio.wait_for(reader.read(), self.timeout)
+            writer.close()
+        except (OSError, asyncio.TimeoutError):
+            return False, (time.perf_counter() - started) * 1000
+        ok = status_line.split(b' ', 2)[1:2] == [b'200']
+        return ok, (time.perf_counter() - started) * 1000
@@ -0,0 +1,212 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.db.models import Max, Min
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bookings.models import Booking
+from apps.properties.models import RealEstateListing
+from apps.search.models import ViewHistory
+from apps.shared import dataset
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарки горячих путей на синтетическом каталоге разного размера.
+
+    Каталог строится в отдельной тестовой БД (apps/shared/dataset.py) и
+    растёт от меньшего размера к большему; с --keepdb он сохраняется
+    между запусками. Для каждого размера измеряются:
+        listings_list    GET /api/v1/listings/?city (~200 объявлений в городе)
+        listing_detail   GET /api/v1/listing/{id}/
+        host_listings    GET /api/v1/host-listings/ (хост с 20 объявлениями)
+        booking_confirm  Booking.confirm()
+        booking_cancel   Booking.cancel() подтверждённой брони
+        view_save        ViewHistory.save()
+    Результат (p50/p95/среднее в мс и число SQL на операцию) - JSON
+    для сравнения между релизами.
+
+    python manage.py run_benchmarks --sizes 1000,100000,1000000 --output bench.json --keepdb
+    python manage.py run_benchmarks --sizes 1000 --iterations 20 --case listing_detail
+    """
+    help = 'Benchmark listing, booking and view hot paths at several catalog sizes'
+
+    CASES = ['listings_list', 'listing_detail', 'host_listings', 'booking_confirm', 'booking_cancel', 'view_save']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000',
+                            help='Comma-separated catalog sizes (published listings)')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--case', choices=self.CASES, action='append',
+                            help='Limit to a case (default: all)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write JSON results to this file')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the benchmark database (and its catalog) between runs')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        cases = options['case'] or self.CASES
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            results = []
+            for size in sizes:
+                started = time.perf_counter()
+                actual = dataset.grow(size, options['seed'], self.progress)
+                self.stdout.write(f'Catalog: {actual} listings ({time.perf_counter() - started:.0f} s to build)')
+                rnd = random.Random(options['seed'])
+                self.listing_ids = RealEstateListing.objects.aggregate(low=Min('id'), high=Max('id'))
+                self.guest_ids = list(
+                    User.objects.filter(real_estate_objects__isnull=True).order_by('id').values_list('id', flat=True)
+                )
+                for name in cases:
+                    result = self.measure(name, rnd, options['iterations'], options['warmup'])
+                    results.append({'case': name, 'size': size, 'listings': actual, **result})
+                    self.stdout.write(
+                        f"{name:16} {size:>9}  p50 {result['p50_ms']:8.2f} ms  "
+                        f"p95 {result['p95_ms']:8.2f} ms  {result['queries']:3} queries"
+                    )
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+
+        report = {'meta': self.meta(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def progress(self, listings):
+        if listings % 100_000 == 0:
+            self.stdout.write(f'  ... {listings} listings')
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, cwd=settings.BASE_DIR
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'platform': platform.platform(),
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'argv': sys.argv[1:],
+        }
+
+    def measure(self, name, rnd, iterations, warmup):
+        """Время каждой операции (подготовка не входит) и SQL одной операции"""
+        setup = getattr(self, f'setup_{name}')
+        # Первый прогон (он же прогрев) - с подсчётом SQL
+        operation = setup(rnd)
+        reset_queries()  # при DEBUG журнал мог заполниться при построении каталога
+        with CaptureQueriesContext(connection) as captured:
+            operation()
+        for _ in range(warmup):
+            setup(rnd)()
+
+        timings = []
+        for _ in range(iterations):
+            operation = setup(rnd)
+            started = time.perf_counter()
+            operation()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            'iterations': len(timings),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'min_ms': round(timings[0], 3),
+            'queries': len(captured),
+        }
+
+    # ---------- Операции: setup_<case>(rnd) возвращает функцию без аргументов ----------
+    def random_listing_id(self, rnd):
+        return rnd.randint(self.listing_ids['low'], self.listing_ids['high'])
+
+    def random_guest_id(self, rnd):
+        return rnd.choice(self.guest_ids)
+
+    def setup_listings_list(self, rnd):
+        cities = max(dataset.published_listings() // dataset.LISTINGS_PER_CITY, 1)
+        city = f'City {rnd.randint(1, cities)}'
+        client = APIClient()
+        return lambda: self.expect_ok(client.get('/api/v1/listings/', {'real_estate_object__address__city': city}))
+
+    def setup_listing_detail(self, rnd):
+        client = APIClient()
+        listing_id = self.random_listing_id(rnd)
+        return lambda: self.expect_ok(client.get(f'/api/v1/listing/{listing_id}/'))
+
+    def setup_host_listings(self, rnd):
+        listing = RealEstateListing.objects.select_related('real_estate_object__host').get(
+            id=self.random_listing_id(rnd)
+        )
+        client = APIClient()
+        client.force_authenticate(listing.real_estate_object.host)
+        return lambda: self.expect_ok(client.get('/api/v1/host-listings/'))
+
+    def new_pending_booking(self, rnd):
+        """Бронь на свободные даты объявления, которого бенчмарк ещё не трогал"""
+        today = timezone.now().date()
+        while True:
+            listing = RealEstateListing.objects.get(id=self.random_listing_id(rnd))
+            if not listing.bookings.filter(check_out__gt=today).exists():
+                break
+        check_in = today + timedelta(days=rnd.randint(7, 300))
+        booking = Booking(
+            listing=listing,
+            guest_id=self.random_guest_id(rnd),
+            check_in=check_in,
+            check_out=check_in + timedelta(days=rnd.randint(listing.minimum_stay, 14))
+        )
+        booking.save()
+        return booking
+
+    def setup_booking_confirm(self, rnd):
+        booking = self.new_pending_booking(rnd)
+        return lambda: self.check_result(booking.confirm())
+
+    def setup_booking_cancel(self, rnd):
+        booking = self.new_pending_booking(rnd)
+        self.check_result(booking.confirm())
+        return lambda: self.check_result(booking.cancel())
+
+    def setup_view_save(self, rnd):
+        view = ViewHistory(
+            user_id=self.random_guest_id(rnd),
+            listing_id=self.random_listing_id(rnd)
+        )
+        return view.save
+
+    def expect_ok(self, response):
+        if response.status_code != 200:
+            raise RuntimeError(f'Unexpected status {response.status_code}')
+
+    def check_result(self, result):
+        ok, message = result
+        if not ok:
+            raise RuntimeError(message)
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_alter_address_unique_together_address_is_normalized_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realestatelisting',
+            name='ranking_score',
+            field=models.FloatField(default=0.0, help_text='Precomputed "best match" score (manage.py compute_ranking_scores)', verbose_name='Ranking Score'),
+        ),
+        migrations.AddIndex(
+            model_name='realestatelisting',
+            index=models.Index(fields=['ranking_score'], name='properties__ranking_bb03f0_idx'),
+        ),
+    ]
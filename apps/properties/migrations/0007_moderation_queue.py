@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 13:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_approved_as_moderated(apps, schema_editor):
+    # Уже одобренные вручную не должны попасть в очередь
+    RealEstateListing = apps.get_model('properties', 'RealEstateListing')
+    RealEstateListing.objects.filter(is_approved=True).update(moderated_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_realestatelisting_ranking_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realestatelisting',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Claimed At'),
+        ),
+        migrations.AddField(
+            model_name='realestatelisting',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, help_text='Moderator currently reviewing this item', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_listings', to=settings.AUTH_USER_MODEL, verbose_name='Claimed By'),
+        ),
+        migrations.AddField(
+            model_name='realestatelisting',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, help_text='Empty while waiting in the moderation queue', null=True, verbose_name='Moderated At'),
+        ),
+        migrations.AddIndex(
+            model_name='realestatelisting',
+            index=models.Index(fields=['moderated_at', 'claimed_at'], name='properties__moderat_5618e4_idx'),
+        ),
+        migrations.RunPython(mark_approved_as_moderated, migrations.RunPython.noop),
+    ]
@@ -237,12 +237,41 @@ class RealEstateListing(models.Model):
         help_text=_('Notes from moderator (visible only to staff)')
     )
 
+    moderated_at = models.DateTimeField(
+        verbose_name=_('Moderated At'),
+        null=True,
+        blank=True,
+        help_text=_('Empty while waiting in the moderation queue')
+    )
+
+    claimed_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_listings',
+        verbose_name=_('Claimed By'),
+        help_text=_('Moderator currently reviewing this item')
+    )
+
+    claimed_at = models.DateTimeField(
+        verbose_name=_('Claimed At'),
+        null=True,
+        blank=True
+    )
+
     view_count = models.PositiveIntegerField(
         verbose_name=_('View Count'),
         default=0,
         help_text=_('Number of times this listing was viewed')
     )
 
+    ranking_score = models.FloatField(
+        verbose_name=_('Ranking Score'),
+        default=0.0,
+        help_text=_('Precomputed "best match" score (manage.py compute_ranking_scores)')
+    )
+
     created_at = models.DateTimeField(
         verbose_name=_('Created At'),
         auto_now_add=True
@@ -259,6 +288,10 @@ class RealEstateListing(models.Model):
         verbose_name = _('Real Estate Listing')
         verbose_name_plural = _('Real Estate Listings')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['ranking_score']),
+            models.Index(fields=['moderated_at', 'claimed_at']),  # очередь модерации
+        ]
 
 
 
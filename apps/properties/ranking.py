@@ -0,0 +1,157 @@
+"""
+Ранжирование объявлений ("best match").
+
+ranking_score (0-100) - взвешенная сумма четырёх сигналов, каждый в [0, 1]:
+    rating      - байесовски сглаженный средний рейтинг PropertyReview
+    velocity    - просмотры за последние дни (ViewHistory), лог-шкала
+    conversion  - доля подтверждённых броней от просмотров (сглаженная)
+    reliability - reliability хоста из Profile (сглаженная)
+
+Считается пакетно (manage.py compute_ranking_scores) векторно на NumPy,
+поэтому сортировка по релевантности стоит как сортировка по цене.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Count
+from django.utils import timezone
+
+
+WEIGHTS = {
+    'rating': 0.40,
+    'velocity': 0.25,
+    'conversion': 0.20,
+    'reliability': 0.15,
+}
+
+RATING_PRIOR_WEIGHT = 10          # "виртуальных" отзывов со средней оценкой
+CONVERSION_PRIOR_VIEWS = 50       # "виртуальных" просмотров с глобальной конверсией
+RELIABILITY_PRIOR_VOTES = 5       # "виртуальных" оценок по 50 баллов
+VELOCITY_DAYS = 7
+CONVERSION_DAYS = 30
+
+
+def bayesian_average(total, count, prior_mean, prior_weight):
+    return (total + prior_mean * prior_weight) / (count + prior_weight)
+
+
+def compute_scores(review_count, review_sum, views_recent, views_window,
+                   bookings_window, reliability_total, reliability_votes):
+    """Все аргументы - массивы одинаковой длины (по одному элементу на объявление)"""
+    review_count = np.asarray(review_count, dtype=np.float64)
+    review_sum = np.asarray(review_sum, dtype=np.float64)
+
+    # Рейтинг: байесовское среднее к глобальному среднему, шкала 1-5 -> 0-1
+    total_reviews = review_count.sum()
+    global_mean = review_sum.sum() / total_reviews if total_reviews else 3.0
+    rating = bayesian_average(review_sum, review_count, global_mean, RATING_PRIOR_WEIGHT)
+    rating = (rating - 1.0) / 4.0
+
+    # Скорость просмотров: log1p(просмотров в день), нормировка на максимум
+    velocity = np.log1p(np.asarray(views_recent, dtype=np.float64) / VELOCITY_DAYS)
+    if velocity.max(initial=0.0) > 0:
+        velocity /= velocity.max()
+
+    # Конверсия просмотров в брони, сглаженная к глобальной конверсии
+    views_window = np.asarray(views_window, dtype=np.float64)
+    bookings_window = np.asarray(bookings_window, dtype=np.float64)
+    total_views = views_window.sum()
+    global_conversion = bookings_window.sum() / total_views if total_views else 0.0
+    conversion = bayesian_average(
+        bookings_window, views_window, global_conversion, CONVERSION_PRIOR_VIEWS
+    )
+    conversion = np.clip(conversion, 0.0, 1.0)
+    if conversion.max(initial=0.0) > 0:
+        conversion /= conversion.max()
+
+    # Надёжность хоста: средний балл 0-100 -> 0-1
+    reliability = bayesian_average(
+        np.asarray(reliability_total, dtype=np.float64),
+        np.asarray(reliability_votes, dtype=np.float64),
+        50.0,
+        RELIABILITY_PRIOR_VOTES
+    ) / 100.0
+
+    score = (
+        WEIGHTS['rating'] * rating +
+        WEIGHTS['velocity'] * velocity +
+        WEIGHTS['conversion'] * conversion +
+        WEIGHTS['reliability'] * reliability
+    )
+    return np.round(score * 100.0, 4)
+
+
+def _scatter(ids, rows, key, value):
+    """Раскладывает агрегаты {key, value} по позициям отсортированного массива ids"""
+    result = np.zeros(len(ids), dtype=np.float64)
+    if not rows:
+        return result
+    keys = np.fromiter((row[key] for row in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((row[value] for row in rows), dtype=np.float64, count=len(rows))
+    positions = np.searchsorted(ids, keys)
+    found = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == keys)
+    result[positions[found]] = values[found]
+    return result
+
+
+def load_and_score():
+    """
+    Читает агрегаты несколькими GROUP BY-запросами и считает score.
+    Возвращает (ids, current_scores, new_scores).
+    """
+    from apps.bookings.models import Booking
+    from apps.reviews.models import ListingReviewStats
+    from apps.search.models import ViewHistory
+    from apps.users.models import Profile
+    from .models import RealEstateListing, RealEstateObject
+
+    listings = list(
+        RealEstateListing.objects.order_by('id').values_list(
+            'id', 'real_estate_object__host_id', 'ranking_score'
+        )
+    )
+    if not listings:
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty, empty
+
+    ids = np.fromiter((row[0] for row in listings), dtype=np.int64, count=len(listings))
+    host_ids = np.fromiter((row[1] for row in listings), dtype=np.int64, count=len(listings))
+    current = np.fromiter((row[2] for row in listings), dtype=np.float64, count=len(listings))
+
+    now = timezone.now()
+    reviews = list(ListingReviewStats.objects.values('listing_id', 'reviews_count', 'rating_sum'))
+
+    def views_since(days):
+        return list(
+            ViewHistory.objects.filter(viewed_at__gte=now - timedelta(days=days))
+            .values('listing_id').annotate(views=Count('id')).order_by()
+        )
+
+    bookings = list(
+        Booking.objects.filter(
+            created_at__gte=now - timedelta(days=CONVERSION_DAYS),
+            status__in=['confirmed', 'completed']
+        ).values('listing_id').annotate(bookings=Count('id')).order_by()
+    )
+
+    # Надёжность хоста раскладывается по его объявлениям
+    hosts = np.unique(host_ids)
+    profiles = list(
+        Profile.objects.filter(user_id__in=RealEstateObject.objects.values('host_id')).values(
+            'user_id', 'reliability_total_score', 'reliability_votes_count'
+        )
+    )
+    host_total = _scatter(hosts, profiles, 'user_id', 'reliability_total_score')
+    host_votes = _scatter(hosts, profiles, 'user_id', 'reliability_votes_count')
+    host_positions = np.searchsorted(hosts, host_ids)
+
+    scores = compute_scores(
+        review_count=_scatter(ids, reviews, 'listing_id', 'reviews_count'),
+        review_sum=_scatter(ids, reviews, 'listing_id', 'rating_sum'),
+        views_recent=_scatter(ids, views_since(VELOCITY_DAYS), 'listing_id', 'views'),
+        views_window=_scatter(ids, views_since(CONVERSION_DAYS), 'listing_id', 'views'),
+        bookings_window=_scatter(ids, bookings, 'listing_id', 'bookings'),
+        reliability_total=host_total[host_positions],
+        reliability_votes=host_votes[host_positions],
+    )
+    return ids, current, scores
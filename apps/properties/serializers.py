@@ -1,9 +1,16 @@
+from datetime import MAXYEAR, MINYEAR, timedelta
 from rest_framework import serializers
 from .models import (
     RealEstateObject, RealEstateListing,
     Address, PropertyStats, Amenity
 )
+from apps.reviews.models import RECENT_REVIEWS_LIMIT
 from apps.reviews.serializers import ReviewPreviewSerializer
+from apps.users.host_cards import get_host_card
+from apps.bookings.flexible_search import (
+    FLEX_MODES, FLEX_AROUND, FLEX_WEEKEND, FRIDAY,
+    FlexibleQuery, month_bounds
+)
 
 
 # ---------- Вспомогательные сериализаторы ----------
@@ -51,12 +58,8 @@ class RealEstateObjectReadSerializer(serializers.ModelSerializer):
         ]
 
     def get_host_info(self, obj):
-        """Информация о хосте """
-        return {
-            'id': obj.host.id,
-            'username': obj.host.username,
-            'name': f"{obj.host.first_name} {obj.host.last_name}".strip() or None
-        }
+        """Информация о хосте (кэшированная карточка)"""
+        return get_host_card(obj.host_id)
 
 
 class RealEstateObjectWriteSerializer(serializers.ModelSerializer):
@@ -211,10 +214,11 @@ class ListingListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
 
         # Проверяем, является ли пользователь хостом этого объявления
+        # (по host_id: сам хост не загружается, иначе запрос на каждое объявление)
         is_host = (
                 request and
                 request.user.is_authenticated and
-                request.user == instance.real_estate_object.host
+                request.user.pk == instance.real_estate_object.host_id
         )
 
         if not is_host:
@@ -226,6 +230,106 @@ class ListingListSerializer(serializers.ModelSerializer):
         return data
 
 
+class FlexibleListingSerializer(ListingListSerializer):
+    """Объявление с найденными окнами дат (гибкий поиск)"""
+    flexible_windows = serializers.SerializerMethodField()
+
+    class Meta(ListingListSerializer.Meta):
+        fields = ListingListSerializer.Meta.fields + ['flexible_windows']
+
+    def get_flexible_windows(self, obj):
+        windows = self.context.get('flexible_windows', {}).get(obj.id, [])
+        return [
+            {
+                'check_in': check_in,
+                'check_out': check_out,
+                'nights': (check_out - check_in).days,
+                'total_price': str(obj.price_per_night * (check_out - check_in).days)
+            }
+            for check_in, check_out in windows
+        ]
+
+
+class FlexibleSearchParamsSerializer(serializers.Serializer):
+    """
+    Параметры гибкого поиска:
+    ?flex=around&check_in=2026-08-10&flex_days=3&nights=5
+    ?flex=weekend&month=2026-08
+    ?flex=month&month=2026-08&nights=5
+    """
+    flex = serializers.ChoiceField(choices=FLEX_MODES)
+    check_in = serializers.DateField(required=False)
+    flex_days = serializers.IntegerField(min_value=0, max_value=14, default=3)
+    month = serializers.RegexField(r'^\d{4}-(0[1-9]|1[0-2])$', required=False)
+    nights = serializers.IntegerField(min_value=1, max_value=365, required=False)
+    windows = serializers.IntegerField(min_value=1, max_value=10, default=3)
+
+    def validate_month(self, value):
+        # month_bounds() берёт и первое число следующего месяца
+        if not MINYEAR <= int(value[:4]) < MAXYEAR:
+            raise serializers.ValidationError('Year is out of range.')
+        return value
+
+    def validate(self, data):
+        if data['flex'] == FLEX_AROUND:
+            if 'check_in' not in data:
+                raise serializers.ValidationError({'check_in': 'Required for flex=around.'})
+            if 'nights' not in data:
+                raise serializers.ValidationError({'nights': 'Required for flex=around.'})
+            try:
+                data['check_in'] - timedelta(days=data['flex_days'])
+                data['check_in'] + timedelta(days=data['flex_days'] + data['nights'])
+            except OverflowError:
+                raise serializers.ValidationError({'check_in': 'Date is out of range.'})
+        elif 'month' not in data:
+            raise serializers.ValidationError({'month': 'Required for this flex mode.'})
+        return data
+
+    def to_query(self):
+        data = self.validated_data
+        if data['flex'] == FLEX_AROUND:
+            shift = timedelta(days=data['flex_days'])
+            return FlexibleQuery(
+                first_check_in=data['check_in'] - shift,
+                last_check_in=data['check_in'] + shift,
+                nights=data['nights'],
+                anchor=data['check_in'],
+                limit=data['windows']
+            )
+
+        year, month = map(int, data['month'].split('-'))
+        first_day, last_day = month_bounds(year, month)
+        if data['flex'] == FLEX_WEEKEND:
+            return FlexibleQuery(
+                first_check_in=first_day,
+                last_check_in=last_day,
+                nights=data.get('nights', 2),
+                weekdays=frozenset([FRIDAY]),
+                limit=data['windows']
+            )
+        return FlexibleQuery(
+            first_check_in=first_day,
+            last_check_in=last_day,
+            nights=data.get('nights', 7),
+            limit=data['windows']
+        )
+
+
+class ListingModerationSerializer(serializers.ModelSerializer):
+    """Объявление в очереди модерации"""
+    title = serializers.CharField(source='real_estate_object.title')
+    description = serializers.CharField(source='real_estate_object.description')
+    city = serializers.CharField(source='real_estate_object.address.city')
+    host = serializers.CharField(source='real_estate_object.host.username')
+
+    class Meta:
+        model = RealEstateListing
+        fields = [
+            'id', 'title', 'description', 'city', 'host', 'promo_title',
+            'price_per_night', 'currency', 'moderation_notes', 'created_at', 'claimed_at'
+        ]
+
+
 class ListingReadSerializer(serializers.ModelSerializer):
     """Детальный просмотр объявления (публичный для всех)"""
 
@@ -297,7 +401,12 @@ class ListingReadSerializer(serializers.ModelSerializer):
         return 12
 
     def get_recent_reviews(self, obj):
-        reviews = obj.reviews.filter(is_approved=True).order_by('-created_at')[:4]
+        # Заполняется recent_reviews_prefetch() во вьюхах
+        reviews = getattr(obj, 'recent_approved_reviews', None)
+        if reviews is None:
+            reviews = obj.reviews.filter(is_approved=True).select_related(
+                'guest'
+            ).order_by('-created_at')[:RECENT_REVIEWS_LIMIT]
         return ReviewPreviewSerializer(reviews, many=True, context=self.context).data
 
     def get_images(self, obj):
@@ -313,19 +422,19 @@ class ListingReadSerializer(serializers.ModelSerializer):
         }
 
     def get_host(self, obj):
-        host = obj.real_estate_object.host
-        profile = host.profile if hasattr(host, 'profile') else None
+        # Карточка из кэша (apps/users/host_cards.py), хост и профиль не загружаются
+        return get_host_card(obj.real_estate_object.host_id)
 
-        return {
-            'id': host.id,
-            'username': host.username,
-            'member_since': host.date_joined.strftime('%B %Y'),
-            'ratings': {
-                'satisfaction': profile.satisfaction_total_score if profile else 0,
-                'friendliness': profile.friendliness_total_score if profile else 0,
-                'reliability': profile.reliability_total_score if profile else 0,
-            } if profile else None
-        }
+
+class AsyncListingReadSerializer(ListingReadSerializer):
+    """
+    Детальный просмотр для асинхронного пути (async_views.py): удобства,
+    отзывы и карточка хоста загружены заранее и лежат в атрибутах объявления
+    """
+    amenities = AmenitySerializer(source='loaded_amenities', many=True)
+
+    def get_host(self, obj):
+        return obj.host_card
 
 
 class ListingHostDetailSerializer(ListingReadSerializer):
@@ -392,7 +501,7 @@ class ListingWriteSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         real_estate_object = data.get('real_estate_object')
 
-        if real_estate_object and real_estate_object.host != user:
+        if real_estate_object and real_estate_object.host_id != user.pk:
             raise serializers.ValidationError({
                 'real_estate_object': 'You can only create listings for your own properties.'
             })
@@ -0,0 +1,385 @@
+"""
+Похожие объявления ("you may also like").
+
+Каждое объявление кодируется вектором признаков float32 (группа типа,
+комнаты, гости, площадь, цена в EUR, удобства битами, координаты).
+Векторы лежат в memmap-файлах, строки сгруппированы по региону
+(городу), поэтому регион - непрерывный срез. Каждая сборка пишется
+в новый каталог версии SIMILARITY_INDEX_DIR/v<время>-<pid>/, затем
+файл CURRENT (имя каталога версии) атомарно подменяется - читатель
+всегда видит файлы одной сборки:
+
+    ids.npy         int64   [n]      id объявления строки
+    vectors.npy     float32 [n, d]   признаки
+    norms.npy       float32 [n]      квадраты норм векторов
+    active.npy      bool    [n]      опубликовано ли объявление
+    offsets.npy     int64   [r + 1]  строки региона i: offsets[i]:offsets[i + 1]
+    sorted_ids.npy  int64   [n]      id по возрастанию  } поиск строки
+    sorted_rows.npy int64   [n]      их строки          } по id
+    meta.json       built_at, regions
+
+Поиск соседей: |x - q|^2 = |x|^2 - 2 x.q + |q|^2 по срезу региона -
+одно матрично-векторное произведение, без обращений к БД.
+Признаки масштабируются фиксированными весами (а не статистикой
+выборки), поэтому refresh() перекодирует только изменившиеся объявления.
+"""
+import json
+import math
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from apps.shared.constants import PROPERTY_TYPE_GROUPS, EXCHANGE_RATES_TO_EUR
+
+
+GROUPS = sorted(PROPERTY_TYPE_GROUPS)
+TYPE_GROUP = {
+    property_type: GROUPS.index(group)
+    for group, types in PROPERTY_TYPE_GROUPS.items()
+    for property_type in types
+}
+AMENITY_SLOTS = 64          # удобства по id % 64 (коллизии только при > 64 удобствах)
+
+# Колонки вектора
+ROOMS, GUESTS, AREA, PRICE, LAT, LNG = range(len(GROUPS), len(GROUPS) + 6)
+AMENITY_OFFSET = LNG + 1
+DIMENSIONS = AMENITY_OFFSET + AMENITY_SLOTS
+
+# Веса: разница 1.0 по колонке ~ "заметно другое объявление"
+GROUP_WEIGHT = 2.0
+SIZE_WEIGHT = 1.0           # log1p комнат / гостей / площади
+PRICE_WEIGHT = 1.5          # log1p цены в EUR
+DISTANCE_KM = 5.0           # 5 км по координатам ~ 1.0
+AMENITY_WEIGHT = 0.35
+
+# Если не указано: гостей - 2 на комнату, площадь - 25 м² на комнату,
+# координаты - среднее по городу
+GUESTS_PER_ROOM = 2
+SQM_PER_ROOM = 25
+
+KM_PER_DEGREE = 111.32
+
+ARRAYS = ('ids', 'vectors', 'norms', 'active', 'offsets', 'sorted_ids', 'sorted_rows')
+POINTER = 'CURRENT'
+
+
+def encode(rows, amenities):
+    """
+    rows - словари из listing_rows(), amenities - {listing_id: [amenity_id, ...]}.
+    Возвращает (ids, vectors, cities); координаты без значения - NaN
+    (заполняются fill_coordinates).
+    """
+    count = len(rows)
+    ids = np.empty(count, dtype=np.int64)
+    vectors = np.zeros((count, DIMENSIONS), dtype=np.float32)
+    cities = []
+
+    for i, row in enumerate(rows):
+        ids[i] = row['id']
+        vector = vectors[i]
+        group = TYPE_GROUP.get(row['real_estate_object__property_type'])
+        if group is not None:
+            vector[group] = GROUP_WEIGHT
+
+        rooms = row['real_estate_object__stats__rooms'] or 1
+        guests = row['real_estate_object__stats__max_guests'] or rooms * GUESTS_PER_ROOM
+        area = row['real_estate_object__stats__area_sqm'] or rooms * SQM_PER_ROOM
+        vector[ROOMS] = SIZE_WEIGHT * math.log1p(rooms)
+        vector[GUESTS] = SIZE_WEIGHT * math.log1p(guests)
+        vector[AREA] = SIZE_WEIGHT * math.log1p(area)
+
+        rate = EXCHANGE_RATES_TO_EUR.get(row['currency'], 1.0)
+        vector[PRICE] = PRICE_WEIGHT * math.log1p(float(row['price_per_night']) * rate)
+
+        lat = row['real_estate_object__address__latitude']
+        lng = row['real_estate_object__address__longitude']
+        if lat is None or lng is None:
+            vector[LAT] = vector[LNG] = np.nan
+        else:
+            vector[LAT] = lat * KM_PER_DEGREE / DISTANCE_KM
+            vector[LNG] = lng * KM_PER_DEGREE * math.cos(math.radians(lat)) / DISTANCE_KM
+
+        for amenity_id in amenities.get(row['id'], ()):
+            vector[AMENITY_OFFSET + amenity_id % AMENITY_SLOTS] = AMENITY_WEIGHT
+
+        cities.append((row['real_estate_object__address__city'] or '').strip().lower())
+    return ids, vectors, cities
+
+
+def fill_coordinates(vectors, regions, known_centres=None):
+    """Пустые координаты -> центр (среднее) региона; на месте"""
+    missing = np.isnan(vectors[:, LAT])
+    for region in np.unique(regions[missing]):
+        in_region = regions == region
+        known = in_region & ~missing
+        if known.any():
+            centre = vectors[known][:, [LAT, LNG]].mean(axis=0)
+        else:
+            centre = (known_centres or {}).get(int(region), (0.0, 0.0))
+        vectors[in_region & missing, LAT] = centre[0]
+        vectors[in_region & missing, LNG] = centre[1]
+
+
+def listing_rows(listing_ids=None):
+    """Данные для encode() двумя запросами (объявления + удобства)"""
+    from .models import RealEstateListing, RealEstateObject
+
+    queryset = RealEstateListing.objects.order_by('id')
+    if listing_ids is not None:
+        queryset = queryset.filter(id__in=listing_ids)
+    rows = list(queryset.values(
+        'id',
+        'real_estate_object_id',
+        'real_estate_object__property_type',
+        'real_estate_object__stats__rooms',
+        'real_estate_object__stats__max_guests',
+        'real_estate_object__stats__area_sqm',
+        'real_estate_object__address__latitude',
+        'real_estate_object__address__longitude',
+        'real_estate_object__address__city',
+        'price_per_night',
+        'currency',
+    ))
+
+    by_object = {}
+    for row in rows:
+        by_object.setdefault(row['real_estate_object_id'], []).append(row['id'])
+    amenities = {}
+    links = RealEstateObject.amenities.through.objects.filter(
+        realestateobject_id__in=list(by_object)
+    ).values_list('realestateobject_id', 'amenity_id')
+    for object_id, amenity_id in links.iterator(chunk_size=5000):
+        for listing_id in by_object[object_id]:
+            amenities.setdefault(listing_id, []).append(amenity_id)
+    return rows, amenities
+
+
+def published_ids():
+    from .models import RealEstateListing
+
+    return np.fromiter(
+        RealEstateListing.objects.filter(is_active=True, is_approved=True)
+        .order_by('id').values_list('id', flat=True).iterator(chunk_size=10000),
+        dtype=np.int64
+    )
+
+
+def region_codes(cities, region_names):
+    """Коды регионов; новые города дописываются в region_names"""
+    known = {name: code for code, name in enumerate(region_names)}
+    codes = np.empty(len(cities), dtype=np.int32)
+    for i, city in enumerate(cities):
+        if city not in known:
+            known[city] = len(region_names)
+            region_names.append(city)
+        codes[i] = known[city]
+    return codes
+
+
+def current_version(root):
+    """Каталог текущей версии индекса; None, если индекс ещё не построен"""
+    try:
+        return root / (root / POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+class SimilarityIndex:
+    """Открытая (memmap) версия индекса; load() переоткрывает её после пересборки"""
+
+    _cached = None
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(directory / 'meta.json') as fp:
+            self.meta = json.load(fp)
+        for name in ARRAYS:
+            setattr(self, name, np.load(directory / f'{name}.npy', mmap_mode='r'))
+        self.root = directory.parent
+        self.stat_version = None
+
+    @classmethod
+    def open(cls, root):
+        """Текущая версия без кэша процесса; None, если индекс ещё не построен"""
+        directory = current_version(root)
+        return None if directory is None else cls(directory)
+
+    @classmethod
+    def load(cls, root=None):
+        """Индекс процесса; None, если индекс ещё не построен"""
+        root = root or settings.SIMILARITY_INDEX_DIR
+        try:
+            stat = os.stat(root / POINTER)
+        except FileNotFoundError:
+            return None
+        # os.replace даёт указателю новый inode
+        version = (stat.st_ino, stat.st_mtime_ns)
+        cached = cls._cached
+        if cached is None or cached.root != root or cached.stat_version != version:
+            cached = cls.open(root)
+            if cached is None:
+                return None
+            cached.stat_version = version
+            cls._cached = cached
+        return cached
+
+    def rows_of(self, listing_ids):
+        """Строки индекса для id (-1, если id нет)"""
+        listing_ids = np.asarray(listing_ids, dtype=np.int64)
+        if not len(self.sorted_ids):
+            return np.full(len(listing_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.sorted_ids, listing_ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[positions] == listing_ids, self.sorted_rows[positions], -1)
+
+    def region_of(self, rows):
+        return np.searchsorted(self.offsets, rows, side='right') - 1
+
+    def nearest(self, listing_id, limit=6):
+        """id ближайших опубликованных объявлений того же региона"""
+        row = int(self.rows_of([listing_id])[0])
+        if row < 0:
+            return []
+        region = int(self.region_of(row))
+        start, end = int(self.offsets[region]), int(self.offsets[region + 1])
+
+        query = np.asarray(self.vectors[row])
+        distances = self.norms[start:end] - 2.0 * (self.vectors[start:end] @ query)
+        distances[~self.active[start:end]] = np.inf
+        distances[row - start] = np.inf
+
+        limit = min(limit, end - start - 1)
+        if limit <= 0:
+            return []
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        nearest = nearest[np.isfinite(distances[nearest])]
+        return self.ids[start + nearest].tolist()
+
+    def region_centres(self):
+        """{код региона: (lat, lng)} по текущим векторам"""
+        centres = {}
+        for region in range(len(self.offsets) - 1):
+            start, end = int(self.offsets[region]), int(self.offsets[region + 1])
+            if end > start:
+                centres[region] = tuple(self.vectors[start:end, [LAT, LNG]].mean(axis=0))
+        return centres
+
+
+def write_index(root, ids, vectors, regions, active, region_names, built_at):
+    """
+    Упорядочивает строки по (регион, id), пишет новую версию индекса
+    и переключает на неё CURRENT. Остаются текущая и предыдущая версии
+    (предыдущую ещё могут читать процессы, не заметившие переключения).
+    """
+    order = np.lexsort((ids, regions))
+    ids, vectors, regions, active = ids[order], vectors[order], regions[order], active[order]
+    id_order = np.argsort(ids, kind='stable')
+    arrays = {
+        'ids': ids,
+        'vectors': vectors,
+        'norms': np.einsum('ij,ij->i', vectors, vectors).astype(np.float32),
+        'active': active,
+        'offsets': np.searchsorted(regions, np.arange(len(region_names) + 1)).astype(np.int64),
+        'sorted_ids': ids[id_order],
+        'sorted_rows': id_order.astype(np.int64),
+    }
+
+    directory = root / f'v{built_at:%Y%m%d%H%M%S%f}-{os.getpid()}'
+    directory.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(directory / f'{name}.npy', array)
+    write_meta(directory, region_names, built_at)
+
+    previous = current_version(root)
+    pointer = root / f'{POINTER}.{os.getpid()}.tmp'
+    pointer.write_text(directory.name)
+    os.replace(pointer, root / POINTER)
+
+    for path in root.glob('v*'):
+        if path.is_dir() and path not in (directory, previous):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def write_meta(directory, region_names, built_at):
+    meta = {
+        'built_at': built_at.isoformat(),
+        'regions': region_names,
+    }
+    with open(directory / 'meta.tmp.json', 'w') as fp:
+        json.dump(meta, fp)
+    os.replace(directory / 'meta.tmp.json', directory / 'meta.json')
+
+
+def build_full(root=None):
+    root = root or settings.SIMILARITY_INDEX_DIR
+    built_at = timezone.now()
+    ids, vectors, cities = encode(*listing_rows())
+    region_names = []
+    regions = region_codes(cities, region_names)
+    fill_coordinates(vectors, regions)
+    write_index(root, ids, vectors, regions, np.isin(ids, published_ids()), region_names, built_at)
+    return len(ids)
+
+
+def refresh(root=None):
+    """
+    Инкрементальное обновление: перекодируются объявления, изменённые после
+    прошлой сборки (updated_at объявления или объекта), флаги публикации
+    пересчитываются для всех. Результат - новая версия индекса (write_index).
+    Возвращает (изменено, добавлено).
+    """
+    from django.db.models import Q
+    from .models import RealEstateListing
+
+    root = root or settings.SIMILARITY_INDEX_DIR
+    index = SimilarityIndex.open(root)
+    if index is None:
+        return 0, build_full(root)
+
+    built_at = timezone.now()
+    since = datetime.fromisoformat(index.meta['built_at'])
+    published = published_ids()
+    changed_ids = set(
+        RealEstateListing.objects.filter(
+            Q(updated_at__gte=since) | Q(real_estate_object__updated_at__gte=since)
+        ).values_list('id', flat=True)
+    )
+    changed_ids.update(np.setdiff1d(published, index.sorted_ids).tolist())
+    ids, vectors, cities = encode(*listing_rows(sorted(changed_ids)))
+    region_names = list(index.meta['regions'])
+    regions = region_codes(cities, region_names)
+    fill_coordinates(vectors, regions, index.region_centres())
+
+    # Файлы текущей версии открыты (memmap) в других процессах - они не
+    # меняются, изменения всегда уходят в новую версию
+    rows = index.rows_of(ids)
+    existing = rows >= 0
+    all_ids = np.concatenate([np.asarray(index.ids), ids[~existing]])
+    all_vectors = np.concatenate([np.asarray(index.vectors), vectors[~existing]])
+    all_regions = np.concatenate([
+        index.region_of(np.arange(len(index.ids))).astype(np.int32),
+        regions[~existing]
+    ])
+    all_vectors[rows[existing]] = vectors[existing]
+    all_regions[rows[existing]] = regions[existing]
+    write_index(
+        root,
+        all_ids,
+        all_vectors,
+        all_regions,
+        np.isin(all_ids, published),
+        region_names,
+        built_at
+    )
+    return int(existing.sum()), int((~existing).sum())
+
+
+def similar_listing_ids(listing_id, limit=6):
+    index = SimilarityIndex.load()
+    if index is None:
+        return []
+    return index.nearest(listing_id, limit)
@@ -1,3 +1,237 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.bookings.factories import AvailabilityFactory
+from apps.bookings.models import Booking
+from apps.reviews.models import PropertyReview, RECENT_REVIEWS_LIMIT, recent_reviews_prefetch
+from apps.search.buffer import search_buffer
+from apps.search.models import SearchKeyword
+from apps.users.models import User
+from .factories import RealEstateListingFactory
+from .models import Address, PropertyStats, RealEstateObject, RealEstateListing
+from .similarity import POINTER, SimilarityIndex, build_full, current_version, refresh
+
+
+def create_listing(host, title='Flat'):
+    obj = RealEstateObject.objects.create(
+        host=host,
+        title=title,
+        property_type='apartment',
+        address=Address.objects.create(city='Berlin'),
+        stats=PropertyStats.objects.create(rooms=2, bathrooms=1)
+    )
+    return RealEstateListing.objects.create(
+        real_estate_object=obj,
+        price_per_night=100,
+        is_approved=True
+    )
+
+
+def add_reviews(listing, guest, count, is_approved=True):
+    for day in range(1, count + 1):
+        booking = Booking.objects.create(
+            listing=listing,
+            guest=guest,
+            check_in=date(2025, 1, day),
+            check_out=date(2025, 1, day + 1),
+            status='completed'
+        )
+        PropertyReview.objects.create(
+            booking=booking,
+            guest=guest,
+            listing=listing,
+            rating=5,
+            is_approved=is_approved
+        )
+
+
+class RecentReviewsPrefetchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = User.objects.create_user(email='host@example.com', username='host', password='x')
+        cls.guest = User.objects.create_user(email='guest@example.com', username='guest', password='x')
+
+    def test_prefetch_query_count_is_constant(self):
+        for listings_count in (2, 6):
+            RealEstateListing.objects.all().delete()
+            for i in range(listings_count):
+                listing = create_listing(self.host, f'Flat {i}')
+                add_reviews(listing, self.guest, 6)
+                add_reviews(listing, self.guest, 2, is_approved=False)
+
+            with self.assertNumQueries(2):
+                listings = list(
+                    RealEstateListing.objects.prefetch_related(recent_reviews_prefetch())
+                )
+
+            self.assertEqual(len(listings), listings_count)
+            for listing in listings:
+                reviews = listing.recent_approved_reviews
+                self.assertEqual(len(reviews), RECENT_REVIEWS_LIMIT)
+                self.assertTrue(all(review.is_approved for review in reviews))
+                self.assertEqual(
+                    [review.created_at for review in reviews],
+                    sorted((review.created_at for review in reviews), reverse=True)
+                )
+
+    def test_listing_detail_does_not_query_per_review(self):
+        client = APIClient()
+        counts = []
+        for reviews_count in (1, 8):
+            listing = create_listing(self.host)
+            add_reviews(listing, self.guest, reviews_count)
+            cache.clear()   # карточка хоста из кэша не должна влиять на сравнение
+
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(f'/api/v1/listing/{listing.id}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(response.data['recent_reviews']),
+                min(reviews_count, RECENT_REVIEWS_LIMIT)
+            )
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class FlexibleSearchTests(TestCase):
+    def setUp(self):
+        self.check_in = date.today() + timedelta(days=10)
+        self.free = RealEstateListingFactory(minimum_stay=1)
+        AvailabilityFactory(listing=self.free, start_date=self.check_in, end_date=self.check_in + timedelta(days=5))
+        self.short = RealEstateListingFactory(minimum_stay=1)
+        AvailabilityFactory(listing=self.short, start_date=self.check_in, end_date=self.check_in + timedelta(days=1))
+
+    def search(self, **params):
+        return APIClient().get('/api/v1/listings/', params)
+
+    def test_only_listings_with_free_window_are_returned(self):
+        response = self.search(flex='around', check_in=self.check_in, flex_days=0, nights=3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()], [self.free.id])
+
+    def test_out_of_range_dates_are_rejected(self):
+        for params in (
+            {'flex': 'month', 'month': '0000-05'},
+            {'flex': 'weekend', 'month': '9999-12'},
+            {'flex': 'around', 'check_in': '9999-12-30', 'nights': 5},
+        ):
+            with self.subTest(**params):
+                self.assertEqual(self.search(**params).status_code, 400)
+
+
+class SimilarListingsTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        settings_override = override_settings(SIMILARITY_INDEX_DIR=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.host = User.objects.create_user(email='host@example.com', username='host', password='x')
+        self.listings = [create_listing(self.host, f'Flat {number}') for number in range(3)]
+
+    def test_similar_listings_of_same_city(self):
+        build_full()
+
+        response = APIClient().get(f'/api/v1/listing/{self.listings[0].id}/similar/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(card['id'] for card in response.data), [self.listings[1].id, self.listings[2].id])
+
+    def test_unknown_or_unpublished_listing_is_404(self):
+        build_full()
+        RealEstateListing.objects.filter(pk=self.listings[0].pk).update(is_approved=False)
+
+        client = APIClient()
+        self.assertEqual(client.get(f'/api/v1/listing/{self.listings[0].id}/similar/').status_code, 404)
+        self.assertEqual(client.get('/api/v1/listing/999999/similar/').status_code, 404)
+        self.assertEqual(client.get('/api/v1/listing/abc/similar/').status_code, 404)
+
+    def test_rebuild_switches_to_new_version_and_keeps_previous(self):
+        build_full()
+        first = SimilarityIndex.load()
+        build_full()
+        second = SimilarityIndex.load()
+        build_full()
+
+        third = SimilarityIndex.load()
+        self.assertEqual(third.directory, current_version(self.root))
+        self.assertEqual((self.root / POINTER).read_text(), third.directory.name)
+        self.assertEqual(sorted(path.name for path in self.root.glob('v*')), sorted([second.directory.name, third.directory.name]))
+        self.assertFalse(first.directory.exists())
+        # Процесс, не заметивший переключения, читает свою версию целиком
+        self.assertEqual(sorted(second.nearest(self.listings[0].id)), [self.listings[1].id, self.listings[2].id])
+
+    def test_refresh_writes_new_version_and_leaves_open_one_untouched(self):
+        build_full()
+        before = SimilarityIndex.load()
+        vectors = np.array(before.vectors)
+        obj = self.listings[0].real_estate_object
+        obj.address.city = 'Hamburg'
+        obj.address.save()
+        obj.save()
+        listing = RealEstateListing.objects.get(pk=self.listings[1].pk)
+        listing.price_per_night = 900
+        listing.save()
+
+        self.assertEqual(refresh(), (2, 0))
+
+        after = SimilarityIndex.load()
+        self.assertNotEqual(after.directory, before.directory)
+        np.testing.assert_array_equal(before.vectors, vectors)
+        self.assertEqual(after.nearest(self.listings[0].id), [])
+        self.assertEqual(after.nearest(self.listings[1].id), [self.listings[2].id])
+
+
+class AsyncListingViewsTests(TransactionTestCase):
+    """Части детальной страницы грузятся в своих потоках - данные должны быть закоммичены"""
+
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(email='host@example.com', username='host', password='x')
+        self.guest = User.objects.create_user(email='guest@example.com', username='guest', password='x')
+        self.listing = create_listing(self.host)
+        add_reviews(self.listing, self.guest, 3)
+        create_listing(self.host, 'Second flat')
+
+    def test_detail_matches_sync_endpoint(self):
+        client = APIClient()
+
+        sync = client.get(f'/api/v1/listing/{self.listing.id}/')
+        cache.clear()
+        response = client.get(f'/api/v1/async/listing/{self.listing.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), sync.json())
+
+    def test_list_matches_sync_endpoint(self):
+        client = APIClient()
+        params = {'real_estate_object__address__city': 'Berlin', 'search': 'flat'}
+
+        sync = client.get('/api/v1/listings/', params)
+        response = client.get('/api/v1/async/listings/', params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), sync.json())
+        self.assertEqual(len(response.json()), 2)
+        # Оба представления учли поиск
+        search_buffer.flush()
+        self.assertEqual(SearchKeyword.objects.get(keyword='flat').count, 2)
+
+    def test_unknown_or_unpublished_listing_is_404(self):
+        RealEstateListing.objects.filter(pk=self.listing.pk).update(is_approved=False)
+
+        client = APIClient()
+        self.assertEqual(client.get(f'/api/v1/async/listing/{self.listing.id}/').status_code, 404)
+        self.assertEqual(client.get('/api/v1/async/listing/999999/').status_code, 404)
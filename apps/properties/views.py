@@ -1,9 +1,18 @@
-from rest_framework import viewsets, permissions, filters
+import hashlib
+
+from rest_framework import viewsets, permissions, filters, renderers
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
 
 from .models import RealEstateObject, RealEstateListing
+from .similarity import similar_listing_ids
 from .serializers import (
     RealEstateObjectListSerializer,
     RealEstateObjectReadSerializer,
@@ -11,10 +20,41 @@ from .serializers import (
     ListingListSerializer,
     ListingReadSerializer,
     ListingHostDetailSerializer,
-    ListingWriteSerializer
+    ListingWriteSerializer,
+    FlexibleListingSerializer,
+    FlexibleSearchParamsSerializer,
+    ListingModerationSerializer
 )
 from django_filters.rest_framework import DjangoFilterBackend
 from ..shared.permissions import IsHost
+from ..shared.moderation import ModerationQueueViewSet
+from ..shared.replicas import ReplicaReadMixin
+from ..bookings.models import Availability, Booking
+from ..bookings.flexible_search import scan_availability
+from ..bookings.ical import render_calendar, last_modified_of
+from ..reviews.models import recent_reviews_prefetch
+from ..search.buffer import search_buffer
+from ..search.tracking import view_tracker
+from ..search.recent import get_recent_ids
+from ..search.reports import daily_listing_views
+from ..search.models import CoViewedListing
+from ..users.host_cards import refresh_hosts
+from ..search.trending import trending as top_trending
+
+
+class ICalendarRenderer(renderers.BaseRenderer):
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Фид отдаётся StreamingHttpResponse; через рендерер проходят только ошибки (404, 400) - в JSON
+        if isinstance(data, (str, bytes)):
+            return data
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return renderers.JSONRenderer().render(data)
 
 
 class RealEstateObjectViewSet(viewsets.ModelViewSet):
@@ -26,7 +66,13 @@ class RealEstateObjectViewSet(viewsets.ModelViewSet):
     #http_method_names = ['get', 'post', 'put', 'patch', 'delete']
 
     def get_queryset(self):
-        return RealEstateObject.objects.filter(host=self.request.user)
+        queryset = RealEstateObject.objects.filter(host=self.request.user).select_related(
+            'address',
+            'stats'
+        )
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('amenities')
+        return queryset
 
 
     def get_serializer_class(self):
@@ -40,32 +86,120 @@ class RealEstateObjectViewSet(viewsets.ModelViewSet):
         serializer.save(host=self.request.user)
 
 
-class PublicListingViewSet(viewsets.ReadOnlyModelViewSet):
+class PublicListingViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     Публичный API списка объявлений (для гостей и хостов как гостей)
     """
     serializer_class = ListingListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['real_estate_object__address__city', 'price_per_night', 'real_estate_object__property_type']
-    ordering_fields = ['price_per_night', 'created_at']
+    search_fields = ['real_estate_object__title', 'real_estate_object__address__city']  # ?search=berlin
+    ordering_fields = ['price_per_night', 'created_at', 'ranking_score']  # ?ordering=-ranking_score - "best match"
     ordering = ['-created_at']         # новые первыми
 
     def get_queryset(self):
+        # Удобства в карточку списка не входят и не загружаются
         queryset = RealEstateListing.objects.filter(
             is_active=True,
             is_approved=True
         ).select_related(
             'real_estate_object__address',
             'real_estate_object__stats'
-        ).prefetch_related('real_estate_object__amenities')
+        )
 
         # Дополнительные фильтры из параметров запроса
         # (например, по датам availability)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get(filters.SearchFilter.search_param)
+        if query:
+            # SearchKeyword / SearchHistory пишутся отложенно, пачками
+            search_buffer.record(query, request.user)
+
+        if 'flex' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        return self.flexible_list(request)
+
+    @action(detail=False, methods=['get'], url_path='recently-viewed',
+            permission_classes=[permissions.IsAuthenticated])
+    def recently_viewed(self, request):
+        """
+        Недавно просмотренные (новые первыми)
+        GET /api/v1/listings/recently-viewed/
+
+        id берутся из кэша (или RecentlyViewed), карточки - одним запросом.
+        """
+        listing_ids = get_recent_ids(request.user.pk)
+        listings = self.get_queryset().select_related(
+            'real_estate_object__host'
+        ).in_bulk(listing_ids)
+        # Снятые с публикации объявления пропускаются
+        cards = [listings[pk] for pk in listing_ids if pk in listings]
+        return Response(self.get_serializer(cards, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        "Горячие" объявления по затухающим счётчикам просмотров
+        GET /api/v1/listings/trending/?city=Berlin&limit=20
+
+        Топ читается по индексу (city, score), ViewHistory не сканируется.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        top = top_trending(request.query_params.get('city'), limit).select_related(
+            'listing__real_estate_object__address',
+            'listing__real_estate_object__stats',
+            'listing__real_estate_object__host'
+        )
+        return Response(self.get_serializer([item.listing for item in top], many=True).data)
+
+    def flexible_list(self, request):
+        """
+        Гибкий поиск по датам (?flex=around|weekend|month).
+        Число запросов не зависит от количества дат-кандидатов:
+        один запрос за периодами доступности + выборка объявлений.
+        """
+        params = FlexibleSearchParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.to_query()
+
+        # Бронирование возможно только с завтрашнего дня (см. Booking.check_availability)
+        earliest_check_in = timezone.now().date() + timezone.timedelta(days=1)
 
-class ListingDetailViewSet(viewsets.ReadOnlyModelViewSet):
+        overlapping = Availability.objects.filter(
+            start_date__lte=query.last_check_in,
+            end_date__gte=max(query.first_check_in, earliest_check_in)
+        )
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            minimum_stay__lte=query.nights
+        ).filter(
+            Exists(overlapping.filter(listing=OuterRef('pk')))
+        )
+
+        rows = overlapping.filter(
+            listing__in=queryset.order_by().values('pk')
+        ).order_by('listing_id', 'start_date').values_list(
+            'listing_id', 'start_date', 'end_date'
+        )
+        windows = scan_availability(rows.iterator(), query, earliest_check_in)
+
+        listings = queryset.filter(id__in=list(windows))
+        context = {**self.get_serializer_context(), 'flexible_windows': windows}
+
+        page = self.paginate_queryset(listings)
+        if page is not None:
+            serializer = FlexibleListingSerializer(page, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+        serializer = FlexibleListingSerializer(listings, many=True, context=context)
+        return Response(serializer.data)
+
+
+class ListingDetailViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     Детальный просмотр объявления (публичный для всех)
     GET /api/v1/listing/{id}/
@@ -80,11 +214,10 @@ class ListingDetailViewSet(viewsets.ReadOnlyModelViewSet):
             is_approved=True
         ).select_related(
             'real_estate_object__address',
-            'real_estate_object__stats',
-            'real_estate_object__host'
+            'real_estate_object__stats'
         ).prefetch_related(
             'real_estate_object__amenities',
-            'reviews'  # для recent_reviews
+            recent_reviews_prefetch()  # для recent_reviews
         )
 
         # аннотация рейтинга и количества отзывов
@@ -96,6 +229,135 @@ class ListingDetailViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        listing = self.get_object()
+        # Просмотр учитывается в памяти, в БД попадает пачкой (view_tracker)
+        view_tracker.record(listing, request.user)
+        return Response(self.get_serializer(listing).data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Похожие объявления того же города ("you may also like")
+        GET /api/v1/listing/{id}/similar/?limit=6
+
+        Соседи ищутся в индексе векторов (manage.py build_similarity_index),
+        карточки и само объявление (404, если оно не опубликовано) -
+        одним запросом.
+        """
+        if not pk.isdigit():
+            raise Http404
+        try:
+            limit = min(max(int(request.query_params.get('limit', 6)), 1), 24)
+        except ValueError:
+            limit = 6
+        listing_ids = similar_listing_ids(int(pk), limit)
+        listings = RealEstateListing.objects.filter(
+            is_active=True,
+            is_approved=True
+        ).select_related(
+            'real_estate_object__address',
+            'real_estate_object__stats',
+            'real_estate_object__host'
+        ).in_bulk([int(pk), *listing_ids])
+        if int(pk) not in listings:
+            raise Http404
+        cards = [listings[listing_id] for listing_id in listing_ids if listing_id in listings]
+        return Response(ListingListSerializer(cards, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'], url_path='also-viewed')
+    def also_viewed(self, request, pk=None):
+        """
+        "Гости, смотревшие это, смотрели и ..."
+        GET /api/v1/listing/{id}/also-viewed/
+
+        Один запрос по индексу (listing, rank), см. manage.py compute_coviews;
+        пустой ответ - второй: опубликовано ли само объявление (иначе 404).
+        """
+        if not pk.isdigit():
+            raise Http404
+        coviewed = CoViewedListing.objects.filter(
+            listing_id=int(pk),
+            listing__is_active=True,
+            listing__is_approved=True,
+            related__is_active=True,
+            related__is_approved=True
+        ).select_related(
+            'related__real_estate_object__address',
+            'related__real_estate_object__stats',
+            'related__real_estate_object__host'
+        ).order_by('rank')
+        cards = [item.related for item in coviewed]
+        if not cards and not RealEstateListing.objects.filter(pk=int(pk), is_active=True, is_approved=True).exists():
+            raise Http404
+        return Response(ListingListSerializer(cards, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'], renderer_classes=[ICalendarRenderer])
+    def ical(self, request, pk=None):
+        """
+        iCal-фид доступности и подтверждённых броней
+        GET /api/v1/listing/{id}/ical/
+
+        Версия фида (ETag / Last-Modified) считается одним запросом,
+        поэтому неизменившийся фид стоит один запрос и ответ 304.
+        """
+        if not pk.isdigit():
+            raise Http404
+        availabilities = Availability.objects.filter(listing=OuterRef('pk')).order_by()
+        bookings = Booking.objects.filter(listing=OuterRef('pk'), status='confirmed').order_by()
+
+        def aggregate(queryset, expression):
+            return Subquery(
+                queryset.values('listing').annotate(value=expression).values('value')
+            )
+
+        version = get_object_or_404(
+            RealEstateListing.objects.filter(is_active=True, is_approved=True).annotate(
+                availability_changed=aggregate(availabilities, Max('updated_at')),
+                availability_count=aggregate(availabilities, Count('id')),
+                booking_changed=aggregate(bookings, Max('updated_at')),
+                booking_count=aggregate(bookings, Count('id'))
+            ).values(
+                'id', 'updated_at',
+                'availability_changed', 'availability_count',
+                'booking_changed', 'booking_count'
+            ),
+            pk=int(pk)
+        )
+
+        # Количество учитывается, т.к. удаление периода не меняет максимум updated_at
+        etag = '"%s"' % hashlib.md5(
+            '|'.join(str(value) for value in version.values()).encode()
+        ).hexdigest()
+        last_modified = last_modified_of(
+            version['updated_at'],
+            version['availability_changed'],
+            version['booking_changed']
+        )
+        last_modified_timestamp = int(last_modified.timestamp())
+
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified_timestamp
+        )
+        if not_modified is not None:
+            return not_modified
+
+        listing = RealEstateListing.objects.select_related('real_estate_object').get(pk=pk)
+        response = StreamingHttpResponse(
+            render_calendar(
+                listing,
+                listing.availabilities.order_by('start_date').iterator(chunk_size=500),
+                listing.bookings.filter(status='confirmed').order_by('check_in').iterator(chunk_size=500)
+            ),
+            content_type='text/calendar; charset=utf-8'
+        )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified_timestamp)
+        response['Content-Disposition'] = f'inline; filename="listing-{listing.id}.ics"'
+        return response
+
 
 class HostListingViewSet(viewsets.ModelViewSet):
     """Управление объявлениями для хоста"""
@@ -112,23 +374,87 @@ class HostListingViewSet(viewsets.ModelViewSet):
         return ListingWriteSerializer
 
     def get_queryset(self):
-        return RealEstateListing.objects.filter(
+        queryset = RealEstateListing.objects.filter(
             real_estate_object__host=self.request.user
         ).select_related(
             'real_estate_object__address',
             'real_estate_object__stats'
-        ).prefetch_related(
+        )
+        if self.action != 'retrieve':
+            # Удобства и отзывы показывает только детальный сериализатор
+            return queryset
+        return queryset.prefetch_related(
             'real_estate_object__amenities',
-            'reviews'
+            recent_reviews_prefetch()
             # '.images' после добавления
         )
 
     def perform_create(self, serializer):
         serializer.save()  # валидация принадлежности есть в сериализаторе
+        # Сводка хоста появляется с первым объявлением; карточка пересобирается
+        refresh_hosts([self.request.user.pk])
+
+    def perform_update(self, serializer):
+        serializer.save()
+        # Снятие с публикации меняет число объявлений в карточке хоста
+        refresh_hosts([self.request.user.pk])
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        refresh_hosts([self.request.user.pk])
+
+    @action(detail=True, methods=['get'])
+    def views(self, request, pk=None):
+        """
+        Просмотры объявления по дням
+        GET /api/v1/host-listings/{id}/views/?days=30
+
+        Старые дни - из дневных агрегатов, свежие - из ViewHistory.
+        """
+        listing = self.get_object()
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        except ValueError:
+            days = 30
+        end = timezone.localdate()
+        start = end - timezone.timedelta(days=days - 1)
+        views = daily_listing_views([listing.pk], start, end)
+        by_day = sorted((day, count) for (_, day), count in views.items())
+        return Response({
+            'total': sum(views.values()),
+            'days': [{'day': day, 'views': count} for day, count in by_day],
+        })
 
     # @action(detail=True, methods=['post'], permission_classes=[IsHost])
     # def upload_photos(self, request, pk=None):
     #     """Отдельный эндпоинт для загрузки фото"""
     #     listing = self.get_object()
     #     # Обработка загрузки фото
-    #     return Response({'status': 'photos uploaded'})
\ No newline at end of file
+    #     return Response({'status': 'photos uploaded'})
+
+
+class ListingModerationViewSet(ModerationQueueViewSet):
+    """
+    Очередь модерации объявлений
+    /api/v1/moderation/listings/  (claim/, decide/)
+    """
+    queue_model = RealEstateListing
+    serializer_class = ListingModerationSerializer
+
+    def get_queue(self):
+        return RealEstateListing.objects.select_related(
+            'real_estate_object__address',
+            'real_estate_object__host'
+        )
+
+    def get_reject_fields(self, data):
+        # Причина отклонения видна хосту в moderation_notes
+        return {'moderation_notes': data['notes']} if data['notes'] else {}
+
+    def on_resolved(self, approved_ids, rejected_ids):
+        # Одобренные объявления появляются в карточках хостов
+        if approved_ids:
+            refresh_hosts(
+                RealEstateListing.objects.filter(id__in=approved_ids)
+                .values_list('real_estate_object__host_id', flat=True)
+            )
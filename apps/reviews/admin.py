@@ -1,5 +1,12 @@
+from collections import defaultdict
+
 from django.contrib import admin
-from .models import UserRating, PropertyReview
+from django.db import transaction
+
+from apps.properties.models import RealEstateListing
+from apps.users.host_cards import refresh_hosts
+from apps.users.models import Profile
+from .models import UserRating, PropertyReview, ListingReviewStats
 
 @admin.register(UserRating)
 class UserRatingAdmin(admin.ModelAdmin):
@@ -8,6 +15,17 @@ class UserRatingAdmin(admin.ModelAdmin):
     search_fields = ('rating_user__username', 'rated_user__username', 'comment')
     readonly_fields = ('created_at',)
 
+    def delete_queryset(self, request, queryset):
+        # QuerySet.delete() не вызывает UserRating.delete(): счётчики вычитаются здесь
+        ratings = defaultdict(list)
+        with transaction.atomic():
+            rows = queryset.select_for_update().values_list('rated_user_id', 'category', 'rating')
+            for rated_user_id, category, rating in rows:
+                ratings[rated_user_id].append((category, rating))
+            for rated_user_id, pairs in ratings.items():
+                Profile.apply_ratings(rated_user_id, pairs, sign=-1)
+            super().delete_queryset(request, queryset)
+
 @admin.register(PropertyReview)
 class PropertyReviewAdmin(admin.ModelAdmin):
     list_display = ('id', 'guest', 'listing', 'rating', 'is_approved', 'created_at')
@@ -15,3 +33,20 @@ class PropertyReviewAdmin(admin.ModelAdmin):
     search_fields = ('guest__username', 'listing__title', 'comment')
     readonly_fields = ('created_at', 'updated_at')
 
+    def delete_queryset(self, request, queryset):
+        # QuerySet.delete() не вызывает PropertyReview.delete(): гистограммы пересчитываются здесь
+        with transaction.atomic():
+            listing_ids = set(queryset.values_list('listing_id', flat=True))
+            super().delete_queryset(request, queryset)
+            ListingReviewStats.rebuild(listing_ids)
+        refresh_hosts(
+            RealEstateListing.objects.filter(id__in=listing_ids)
+            .values_list('real_estate_object__host_id', flat=True)
+        )
+
+
+@admin.register(ListingReviewStats)
+class ListingReviewStatsAdmin(admin.ModelAdmin):
+    list_display = ('listing', 'reviews_count', 'rating_avg', 'updated_at')
+    readonly_fields = ('updated_at',)
+    raw_id_fields = ('listing',)
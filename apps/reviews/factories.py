@@ -0,0 +1,45 @@
+from datetime import date
+
+import factory
+from factory import fuzzy
+from factory.django import DjangoModelFactory
+
+from apps.bookings.factories import BookingFactory
+from apps.shared.constants import RATING_CATEGORIES, RATING_VALUES
+from .models import ListingReviewStats, PropertyReview, UserRating
+
+
+class CompletedBookingFactory(BookingFactory):
+    check_in = factory.Sequence(lambda n: date.fromordinal(date(2024, 1, 1).toordinal() + n * 7))
+    status = 'completed'
+
+
+class PropertyReviewFactory(DjangoModelFactory):
+    """Гость и объявление берутся из брони (PropertyReview.save)"""
+    class Meta:
+        model = PropertyReview
+
+    booking = factory.SubFactory(CompletedBookingFactory)
+    rating = fuzzy.FuzzyInteger(1, 5)
+    comment = factory.Faker('paragraph')
+    is_approved = True
+
+
+class ListingReviewStatsFactory(DjangoModelFactory):
+    class Meta:
+        model = ListingReviewStats
+        django_get_or_create = ['listing']
+
+    listing = factory.SubFactory('apps.properties.factories.RealEstateListingFactory')
+
+
+class UserRatingFactory(DjangoModelFactory):
+    """Оценка гостя хостом по брони (счётчики профиля обновляет UserRating.save)"""
+    class Meta:
+        model = UserRating
+
+    booking = factory.SubFactory(CompletedBookingFactory)
+    rating_user = factory.LazyAttribute(lambda o: o.booking.listing.real_estate_object.host)
+    rated_user = factory.LazyAttribute(lambda o: o.booking.guest)
+    category = fuzzy.FuzzyChoice([value for value, _ in RATING_CATEGORIES])
+    rating = fuzzy.FuzzyChoice([value for value, _ in RATING_VALUES])
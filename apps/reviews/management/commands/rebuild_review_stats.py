@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.reviews.models import ListingReviewStats
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает гистограммы оценок объявлений одним GROUP BY.
+
+    python manage.py rebuild_review_stats
+    """
+    help = 'Rebuild per-listing review rating histograms'
+
+    def handle(self, *args, **options):
+        count = ListingReviewStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Listings rebuilt: {count}'))
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-19 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_review_stats(apps, schema_editor):
+    PropertyReview = apps.get_model('reviews', 'PropertyReview')
+    ListingReviewStats = apps.get_model('reviews', 'ListingReviewStats')
+
+    stats = {}
+    rows = PropertyReview.objects.filter(is_approved=True).values(
+        'listing_id', 'rating'
+    ).annotate(votes=models.Count('id')).order_by()
+    for row in rows:
+        obj = stats.setdefault(row['listing_id'], ListingReviewStats(listing_id=row['listing_id']))
+        setattr(obj, f"stars_{row['rating']}", row['votes'])
+        obj.reviews_count += row['votes']
+        obj.rating_sum += row['votes'] * row['rating']
+    ListingReviewStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_alter_address_unique_together_address_is_normalized_and_more'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingReviewStats',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stats', serialize=False, to='properties.realestatelisting', verbose_name='Listing')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Reviews Count')),
+                ('rating_sum', models.PositiveIntegerField(default=0, verbose_name='Rating Sum')),
+                ('stars_1', models.PositiveIntegerField(default=0, verbose_name='1 Star')),
+                ('stars_2', models.PositiveIntegerField(default=0, verbose_name='2 Stars')),
+                ('stars_3', models.PositiveIntegerField(default=0, verbose_name='3 Stars')),
+                ('stars_4', models.PositiveIntegerField(default=0, verbose_name='4 Stars')),
+                ('stars_5', models.PositiveIntegerField(default=0, verbose_name='5 Stars')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Listing Review Stats',
+                'verbose_name_plural': 'Listing Review Stats',
+            },
+        ),
+        migrations.RunPython(fill_review_stats, migrations.RunPython.noop),
+    ]
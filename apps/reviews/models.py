@@ -1,7 +1,43 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
-from apps.shared.constants import RATING_CATEGORIES, RATING_VALUES
+from apps.shared.constants import RATING_CATEGORIES, RATING_VALUES, RATING_SCORES
+from apps.shared.db import bulk_upsert
+
+
+RECENT_REVIEWS_LIMIT = 4
+
+
+class PropertyReviewQuerySet(models.QuerySet):
+    def approved(self):
+        return self.filter(is_approved=True)
+
+    def top_per_listing(self, limit):
+        """
+        Не более limit самых свежих отзывов на каждое объявление -
+        ROW_NUMBER() OVER (PARTITION BY listing_id ORDER BY created_at DESC)
+        """
+        return self.annotate(
+            listing_row=Window(
+                RowNumber(),
+                partition_by=F('listing_id'),
+                order_by=[F('created_at').desc(), F('id').desc()]
+            )
+        ).filter(listing_row__lte=limit).order_by('listing_id', '-created_at', '-id')
+
+
+def recent_reviews_prefetch(limit=RECENT_REVIEWS_LIMIT):
+    """
+    Prefetch последних одобренных отзывов: один запрос на любое
+    количество объявлений, результат в listing.recent_approved_reviews
+    """
+    return Prefetch(
+        'reviews',
+        queryset=PropertyReview.objects.approved().top_per_listing(limit).select_related('guest'),
+        to_attr='recent_approved_reviews'
+    )
 
 
 class PropertyReview(models.Model):
@@ -51,6 +87,29 @@ class PropertyReview(models.Model):
         help_text=_('Review is hidden until moderator approves')
     )
 
+    moderated_at = models.DateTimeField(
+        verbose_name=_('Moderated At'),
+        null=True,
+        blank=True,
+        help_text=_('Empty while waiting in the moderation queue')
+    )
+
+    claimed_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_reviews',
+        verbose_name=_('Claimed By'),
+        help_text=_('Moderator currently reviewing this item')
+    )
+
+    claimed_at = models.DateTimeField(
+        verbose_name=_('Claimed At'),
+        null=True,
+        blank=True
+    )
+
 
     created_at = models.DateTimeField(
         verbose_name=_('Created At'),
@@ -62,12 +121,15 @@ class PropertyReview(models.Model):
         auto_now=True
     )
 
+    objects = PropertyReviewQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Property Review')
         verbose_name_plural = _('Property Reviews')
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['listing', 'created_at']),
+            models.Index(fields=['moderated_at', 'claimed_at']),  # очередь модерации
         ]
         constraints = [
             models.UniqueConstraint(
@@ -79,19 +141,179 @@ class PropertyReview(models.Model):
     def __str__(self):
         return f"Review #{self.id}: {self.rating} for {self.listing}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем, как отзыв учтён в гистограмме (для инкрементального обновления)
+        if 'is_approved' in field_names and 'rating' in field_names:
+            instance._counted_rating = instance.rating if instance.is_approved else None
+        return instance
+
+    def counted_rating(self):
+        """Оценка, учтённая сейчас в ListingReviewStats (None - не учтена)"""
+        if self._state.adding:
+            return None
+        if hasattr(self, '_counted_rating'):
+            return self._counted_rating
+        return PropertyReview.objects.filter(
+            pk=self.pk,
+            is_approved=True
+        ).values_list('rating', flat=True).first()
+
     def save(self, *args, **kwargs):
         """Автоматически устанавливаем guest и listing из booking"""
-        if self.booking and not self.guest:
+        if self.booking and not self.guest_id:
             self.guest = self.booking.guest
-        if self.booking and not self.listing:
+        if self.booking and not self.listing_id:
             self.listing = self.booking.listing
-        super().save(*args, **kwargs)
+
+        old_rating = self.counted_rating()
+        new_rating = self.rating if self.is_approved else None
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_rating != new_rating:
+                if old_rating is not None:
+                    ListingReviewStats.apply(self.listing_id, old_rating, -1)
+                if new_rating is not None:
+                    ListingReviewStats.apply(self.listing_id, new_rating, 1)
+        self._counted_rating = new_rating
+
+    def delete(self, *args, **kwargs):
+        old_rating = self.counted_rating()
+        with transaction.atomic():
+            if old_rating is not None:
+                ListingReviewStats.apply(self.listing_id, old_rating, -1)
+            return super().delete(*args, **kwargs)
+
+
+class ListingReviewStats(models.Model):
+    """
+    Гистограмма оценок одобренных отзывов (1-5 звёзд) по объявлению.
+    Обновляется инкрементально при сохранении/удалении PropertyReview,
+    пересчёт с нуля - manage.py rebuild_review_stats.
+    """
+    listing = models.OneToOneField(
+        'properties.RealEstateListing',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='review_stats',
+        verbose_name=_('Listing')
+    )
+
+    reviews_count = models.PositiveIntegerField(_('Reviews Count'), default=0)
+    rating_sum = models.PositiveIntegerField(_('Rating Sum'), default=0)
+
+    stars_1 = models.PositiveIntegerField(_('1 Star'), default=0)
+    stars_2 = models.PositiveIntegerField(_('2 Stars'), default=0)
+    stars_3 = models.PositiveIntegerField(_('3 Stars'), default=0)
+    stars_4 = models.PositiveIntegerField(_('4 Stars'), default=0)
+    stars_5 = models.PositiveIntegerField(_('5 Stars'), default=0)
+
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Listing Review Stats')
+        verbose_name_plural = _('Listing Review Stats')
+
+    def __str__(self):
+        return f"Review stats for listing #{self.listing_id}"
+
+    @property
+    def rating_avg(self):
+        if not self.reviews_count:
+            return None
+        return round(self.rating_sum / self.reviews_count, 2)
+
+    @property
+    def histogram(self):
+        return {stars: getattr(self, f'stars_{stars}') for stars in range(1, 6)}
+
+    @classmethod
+    def apply(cls, listing_id, rating, sign):
+        """Один UPDATE с F()-выражениями; строка создаётся при первом отзыве"""
+        updates = {
+            'reviews_count': F('reviews_count') + sign,
+            'rating_sum': F('rating_sum') + sign * rating,
+            f'stars_{rating}': F(f'stars_{rating}') + sign,
+        }
+        if not cls.objects.filter(listing_id=listing_id).update(**updates):
+            cls.objects.get_or_create(listing_id=listing_id)
+            cls.objects.filter(listing_id=listing_id).update(**updates)
+
+    @classmethod
+    def rebuild(cls, listing_ids=None):
+        """
+        Пересчёт гистограмм одним GROUP BY (listing, rating).
+        listing_ids=None - по всем объявлениям с отзывами.
+        """
+        reviews = PropertyReview.objects.approved()
+        if listing_ids is not None:
+            reviews = reviews.filter(listing_id__in=listing_ids)
+
+        stats = {}
+        rows = reviews.values('listing_id', 'rating').annotate(
+            votes=models.Count('id')
+        ).order_by()
+        for row in rows:
+            obj = stats.setdefault(row['listing_id'], cls(listing_id=row['listing_id']))
+            setattr(obj, f"stars_{row['rating']}", row['votes'])
+            obj.reviews_count += row['votes']
+            obj.rating_sum += row['votes'] * row['rating']
+
+        if listing_ids is not None:
+            for listing_id in listing_ids:
+                stats.setdefault(listing_id, cls(listing_id=listing_id))
+
+        bulk_upsert(
+            cls,
+            stats.values(),
+            unique_fields=['listing'],
+            update_fields=[
+                'reviews_count', 'rating_sum',
+                'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+                'updated_at',
+            ]
+        )
+        return len(stats)
+
+
+class UserRatingManager(models.Manager):
+    def submit(self, booking, rating_user, rated_user, ratings, comments=None):
+        """
+        Сохраняет оценки сразу по нескольким категориям:
+        ratings = {'satisfaction': 'TOP', 'friendliness': 'OK', ...}
+        Один INSERT для оценок и один UPDATE счётчиков профиля.
+        """
+        comments = comments or {}
+        objs = [
+            self.model(
+                booking=booking,
+                rating_user=rating_user,
+                rated_user=rated_user,
+                category=category,
+                rating=rating,
+                comment=comments.get(category, '')
+            )
+            for category, rating in ratings.items()
+        ]
+        from apps.users.models import Profile
+
+        with transaction.atomic():
+            created = self.bulk_create(objs)
+            Profile.apply_ratings(
+                rated_user.pk,
+                [(obj.category, obj.rating) for obj in created]
+            )
+        return created
 
 
 class UserRating(models.Model):
     """
     Рейтинг пользователя по категориям (TOP/OK/POOR).
     Используется для satisfaction, friendliness, reliability.
+    Счётчики Profile обновляются при создании, изменении и удалении оценки
+    (массовое удаление в админке - UserRatingAdmin.delete_queryset).
     """
 
     booking = models.ForeignKey(
@@ -157,11 +379,37 @@ class UserRating(models.Model):
             ),
         ]
 
+    objects = UserRatingManager()
+
     def __str__(self):
         return f"{self.rating_user} -> {self.rated_user}: {self.category} - {self.rating}"
 
+    def save(self, *args, **kwargs):
+        from apps.users.models import Profile
+
+        with transaction.atomic():
+            old = None
+            if self.pk is not None:
+                old = UserRating.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'rated_user_id', 'category', 'rating'
+                ).first()
+            super().save(*args, **kwargs)
+
+            # При изменении (например, в админке) старая оценка вычитается, новая прибавляется
+            if old != (self.rated_user_id, self.category, self.rating):
+                if old is not None:
+                    rated_user_id, category, rating = old
+                    Profile.apply_ratings(rated_user_id, [(category, rating)], sign=-1)
+                Profile.apply_ratings(self.rated_user_id, [(self.category, self.rating)])
+
+    def delete(self, *args, **kwargs):
+        from apps.users.models import Profile
+
+        with transaction.atomic():
+            Profile.apply_ratings(self.rated_user_id, [(self.category, self.rating)], sign=-1)
+            return super().delete(*args, **kwargs)
+
     @property
     def score_value(self):
         """Преобразует TOP/OK/POOR в числовое значение"""
-        scores = {'TOP': 100, 'OK': 50, 'POOR': 0}
-        return scores.get(self.rating, 0)
\ No newline at end of file
+        return RATING_SCORES.get(self.rating, 0)
\ No newline at end of file
@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from .models import PropertyReview
+
+
+class ReviewPreviewSerializer(serializers.ModelSerializer):
+    """Короткий отзыв для карточки объявления"""
+    guest_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PropertyReview
+        fields = ['id', 'rating', 'comment', 'guest_name', 'created_at']
+
+    def get_guest_name(self, obj):
+        # Только имя, без фамилии и email (публичные данные)
+        return obj.guest.first_name or obj.guest.username
+
+
+class ReviewModerationSerializer(serializers.ModelSerializer):
+    """Отзыв в очереди модерации"""
+    guest = serializers.CharField(source='guest.username')
+
+    class Meta:
+        model = PropertyReview
+        fields = ['id', 'listing', 'guest', 'rating', 'comment', 'created_at', 'claimed_at']
@@ -1,3 +1,134 @@
+from datetime import timedelta
+
+from django.contrib import admin
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.properties.factories import RealEstateListingFactory
+from apps.users.models import Profile
+from .factories import PropertyReviewFactory, UserRatingFactory
+from .models import ListingReviewStats, PropertyReview, UserRating
+
+
+def counters(user, category='satisfaction'):
+    profile = Profile.objects.get(user=user)
+    return {
+        field: getattr(profile, f'{category}_{field}')
+        for field in ('total_score', 'votes_count', 'top_count', 'ok_count', 'poor_count')
+    }
+
+
+def expected(total=0.0, votes=0, top=0, ok=0, poor=0):
+    return {'total_score': total, 'votes_count': votes, 'top_count': top, 'ok_count': ok, 'poor_count': poor}
+
+
+class UserRatingCounterTests(TestCase):
+    def setUp(self):
+        self.rating = UserRatingFactory(category='satisfaction', rating='TOP')
+        self.guest = self.rating.rated_user
+
+    def test_create_adds_counters(self):
+        UserRatingFactory(booking__guest=self.guest, category='satisfaction', rating='OK')
+
+        self.assertEqual(counters(self.guest), expected(total=150, votes=2, top=1, ok=1))
+
+    def test_edit_applies_old_to_new_delta(self):
+        self.rating.rating = 'POOR'
+        self.rating.save()
+        self.assertEqual(counters(self.guest), expected(votes=1, poor=1))
+
+        self.rating.category = 'reliability'
+        self.rating.save()
+        self.assertEqual(counters(self.guest), expected())
+        self.assertEqual(counters(self.guest, 'reliability'), expected(votes=1, poor=1))
+
+    def test_save_without_changes_keeps_counters(self):
+        self.rating.comment = 'Quiet guest'
+        self.rating.save()
+
+        self.assertEqual(counters(self.guest), expected(total=100, votes=1, top=1))
+
+    def test_delete_subtracts_counters(self):
+        self.rating.delete()
+
+        self.assertEqual(counters(self.guest), expected())
+
+    def test_admin_bulk_delete_subtracts_counters(self):
+        UserRatingFactory(booking__guest=self.guest, category='satisfaction', rating='OK')
+        other = UserRatingFactory(category='satisfaction', rating='POOR')
+
+        admin.site._registry[UserRating].delete_queryset(None, UserRating.objects.filter(rated_user=self.guest))
+
+        self.assertEqual(counters(self.guest), expected())
+        self.assertEqual(counters(other.rated_user), expected(votes=1, poor=1))
+
+
+class ListingReviewPaginationTests(TestCase):
+    def setUp(self):
+        self.listing = RealEstateListingFactory()
+        self.url = f'/api/v1/listing/{self.listing.id}/reviews/'
+        now = timezone.now()
+        self.reviews = [
+            PropertyReviewFactory(booking__listing=self.listing, rating=rating)
+            for rating in (5, 4, 4, 3, 5)
+        ]
+        # Два отзыва с одинаковым created_at: порядок внутри - по id
+        for offset, review in zip((3, 2, 2, 1, 0), self.reviews):
+            PropertyReview.objects.filter(pk=review.pk).update(created_at=now - timedelta(hours=offset))
+        PropertyReviewFactory(booking__listing=self.listing, is_approved=False)
+
+    def pages(self, page_size=2):
+        client, url, pages = APIClient(), f'{self.url}?page_size={page_size}', []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([review['id'] for review in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_pages_cover_approved_reviews_newest_first(self):
+        newest_first = [review.id for review in reversed(self.reviews)]
+        newest_first[2:4] = sorted(newest_first[2:4], reverse=True)
+
+        self.assertEqual(self.pages(), [newest_first[0:2], newest_first[2:4], newest_first[4:]])
+
+    def test_review_added_while_paging_does_not_shift_pages(self):
+        response = APIClient().get(f'{self.url}?page_size=2')
+        PropertyReviewFactory(booking__listing=self.listing)
+
+        second = APIClient().get(response.data['next'])
+
+        first_ids = [review['id'] for review in response.data['results']]
+        second_ids = [review['id'] for review in second.data['results']]
+        self.assertFalse(set(first_ids) & set(second_ids))
+        self.assertEqual(len(second_ids), 2)
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(APIClient().get(f'{self.url}?cursor=garbage').status_code, 404)
+
+    def test_histogram_matches_rebuild(self):
+        response = APIClient().get(self.url)
+
+        self.assertEqual(response.data['histogram'], {1: 0, 2: 0, 3: 1, 4: 2, 5: 2})
+        self.assertEqual(response.data['reviews_count'], 5)
+
+        ListingReviewStats.objects.all().delete()
+        ListingReviewStats.rebuild([self.listing.id])
+        self.assertEqual(APIClient().get(self.url).data['histogram'], response.data['histogram'])
+
+
+class ListingReviewStatsTests(TestCase):
+    def test_admin_bulk_delete_rebuilds_histograms(self):
+        listing, other = RealEstateListingFactory.create_batch(2)
+        PropertyReviewFactory(booking__listing=listing, rating=5)
+        PropertyReviewFactory(booking__listing=listing, rating=3)
+        PropertyReviewFactory(booking__listing=other, rating=4)
+
+        admin.site._registry[PropertyReview].delete_queryset(
+            None, PropertyReview.objects.filter(listing=listing, rating=5)
+        )
 
-# Create your tests here.
+        stats = ListingReviewStats.objects.get(listing=listing)
+        self.assertEqual((stats.reviews_count, stats.histogram[5], stats.histogram[3]), (1, 0, 1))
+        self.assertEqual(ListingReviewStats.objects.get(listing=other).reviews_count, 1)
@@ -1,3 +1,72 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework import mixins, permissions, viewsets
 
-# Create your views here.
+from apps.properties.models import RealEstateListing
+from apps.shared.moderation import ModerationQueueViewSet
+from apps.shared.pagination import KeysetPagination
+from apps.users.host_cards import refresh_hosts
+from .models import PropertyReview, ListingReviewStats
+from .serializers import ReviewPreviewSerializer, ReviewModerationSerializer
+
+
+class ListingReviewViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Одобренные отзывы объявления (keyset-пагинация) + гистограмма оценок
+    GET /api/v1/listing/{listing_pk}/reviews/?cursor=...
+    """
+    serializer_class = ReviewPreviewSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+
+    def get_listing(self):
+        return get_object_or_404(
+            RealEstateListing.objects.filter(
+                is_active=True,
+                is_approved=True
+            ).select_related('review_stats').only('id', 'review_stats'),
+            pk=self.kwargs['listing_pk']
+        )
+
+    def get_queryset(self):
+        # Индекс (listing, created_at)
+        return PropertyReview.objects.approved().filter(
+            listing_id=self.kwargs['listing_pk']
+        ).select_related('guest')
+
+    def list(self, request, *args, **kwargs):
+        listing = self.get_listing()
+        stats = getattr(listing, 'review_stats', None) or ListingReviewStats(listing=listing)
+
+        response = super().list(request, *args, **kwargs)
+        response.data = {
+            'rating_avg': stats.rating_avg,
+            'reviews_count': stats.reviews_count,
+            'histogram': stats.histogram,
+            **response.data,
+        }
+        return response
+
+
+class ReviewModerationViewSet(ModerationQueueViewSet):
+    """
+    Очередь модерации отзывов
+    /api/v1/moderation/reviews/  (claim/, decide/)
+    """
+    queue_model = PropertyReview
+    serializer_class = ReviewModerationSerializer
+
+    def get_queue(self):
+        return PropertyReview.objects.select_related('guest')
+
+    def on_resolved(self, approved_ids, rejected_ids):
+        # Гистограммы пересчитываются один раз на объявление, а не на каждый отзыв
+        if approved_ids:
+            listing_ids = set(
+                PropertyReview.objects.filter(id__in=approved_ids)
+                .values_list('listing_id', flat=True)
+            )
+            ListingReviewStats.rebuild(listing_ids)
+            refresh_hosts(
+                RealEstateListing.objects.filter(id__in=listing_ids)
+                .values_list('real_estate_object__host_id', flat=True)
+            )
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import SearchKeyword, SearchHistory, ViewHistory
+from .models import (
+    SearchKeyword, SearchHistory, ViewHistory,
+    DailyListingViews, DailyKeywordSearches, RollupCheckpoint, CoViewedListing
+)
 
 
 @admin.register(SearchKeyword)
@@ -16,6 +19,7 @@ class SearchHistoryAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email', 'query')
     readonly_fields = ('created_at',)
     date_hierarchy = 'created_at'
+    show_full_result_count = False           # без COUNT(*) по всей таблице
 
 
 @admin.register(ViewHistory)
@@ -25,5 +29,32 @@ class ViewHistoryAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'listing__title')
     readonly_fields = ('viewed_at',)
     date_hierarchy = 'viewed_at'
+    show_full_result_count = False
     raw_id_fields = ('user', 'listing')      # быстрый выбор при большом количестве записей
 
+
+
+@admin.register(DailyListingViews)
+class DailyListingViewsAdmin(admin.ModelAdmin):
+    list_display = ('listing', 'day', 'views')
+    list_filter = ('day',)
+    raw_id_fields = ('listing',)
+
+
+@admin.register(DailyKeywordSearches)
+class DailyKeywordSearchesAdmin(admin.ModelAdmin):
+    list_display = ('keyword', 'day', 'searches')
+    list_filter = ('day',)
+    search_fields = ('keyword',)
+
+
+@admin.register(RollupCheckpoint)
+class RollupCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('source', 'cutoff', 'last_id', 'stop_id', 'rolled_up', 'updated_at')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(CoViewedListing)
+class CoViewedListingAdmin(admin.ModelAdmin):
+    list_display = ('listing', 'rank', 'related', 'score')
+    raw_id_fields = ('listing', 'related')
@@ -0,0 +1,90 @@
+"""
+Write-behind запись поисковых запросов.
+
+Вместо UPDATE горячей строки SearchKeyword и INSERT в SearchHistory
+на каждый запрос приращения копятся в памяти процесса и сбрасываются
+пачкой: один аддитивный upsert по ключевым словам и один bulk_create.
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.shared.buffer import WriteBehindBuffer
+from apps.shared.db import bulk_increment
+from .models import SearchKeyword, SearchHistory
+from .suggest import suggestions
+
+
+KEYWORD_MAX_LENGTH = SearchKeyword._meta.get_field('keyword').max_length
+
+
+def normalize_keyword(query):
+    return re.sub(r'\s+', ' ', query).strip().lower()[:KEYWORD_MAX_LENGTH]
+
+
+class SearchBuffer(WriteBehindBuffer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._keywords = Counter()
+        self._history = []
+
+    def record(self, query, user=None):
+        keyword = normalize_keyword(query)
+        if keyword:
+            self.add(keyword, user)
+
+    def _add(self, keyword, user):
+        self._keywords[keyword] += 1
+        if user is None or not user.is_authenticated:
+            return 1
+        self._history.append(
+            SearchHistory(user_id=user.pk, query=keyword, created_at=timezone.now())
+        )
+        return 2
+
+    def _pending(self):
+        # Теряемые при падении приращения: сумма счётчиков + строки истории
+        return sum(self._keywords.values()) + len(self._history)
+
+    def _take(self):
+        batch = (self._keywords, self._history)
+        self._keywords, self._history = Counter(), []
+        return batch
+
+    def _size(self, batch):
+        keywords, history = batch
+        return sum(keywords.values()) + len(history)
+
+    def _write(self, batch):
+        keywords, history = batch
+        with transaction.atomic():
+            bulk_increment(
+                SearchKeyword,
+                ['keyword'],
+                ['count'],
+                {(keyword,): (count,) for keyword, count in keywords.items()}
+            )
+            SearchHistory.objects.bulk_create(history, batch_size=1000)
+        # Подсказки поиска этого процесса видят новые веса сразу
+        suggestions.bump(keywords)
+
+    def _split(self, batch):
+        keywords, history = batch
+        return (
+            [(Counter({keyword: count}), []) for keyword, count in keywords.items()] +
+            [(Counter(), [row]) for row in history]
+        )
+
+    def _merge(self, batch):
+        keywords, history = batch
+        self._keywords.update(keywords)
+        self._history.extend(history)
+
+
+search_buffer = SearchBuffer(
+    max_pending=settings.SEARCH_BUFFER_MAX_PENDING,
+    flush_interval=settings.SEARCH_BUFFER_FLUSH_SECONDS
+)
@@ -0,0 +1,143 @@
+"""
+"Also viewed": совместные просмотры из ViewHistory.
+
+ViewHistory читается потоково (iterator) чанками, повторы пар
+(user, listing) в чанке отбрасываются сразу; из различных пар строится
+разреженная бинарная матрица X пользователи x объявления. В памяти
+остаются все различные пары периода (их и так хранит X), но не сырые
+строки и не Python-объекты на каждую строку.
+Совместные просмотры C = X^T X считаются блоками по BLOCK объявлений,
+поэтому в памяти одновременно только один блок C, а не вся матрица
+объявления x объявления. Близость - косинусная:
+    score(i, j) = C[i, j] / sqrt(viewers(i) * viewers(j))
+"""
+from datetime import timedelta
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CoViewedListing, ViewHistory
+
+
+TOP_K = 10
+BLOCK = 2000
+MIN_COVIEWERS = 2               # меньше - случайное совпадение
+MAX_VIEWS_PER_USER = 500        # больше - бот/краулер, без него матрица в разы плотнее
+
+
+def load_views(since, chunk_size=50_000):
+    """
+    Массивы (user_ids, listing_ids) различных в пределах чанка пар
+    просмотров после since; повторы между чанками убирает build_matrix.
+    """
+    chunks = []
+    buffer = []
+    rows = ViewHistory.objects.filter(viewed_at__gte=since).order_by().values_list(
+        'user_id', 'listing_id'
+    )
+
+    def take_chunk():
+        chunks.append(np.unique(np.array(buffer, dtype=np.int64).reshape(-1, 2), axis=0))
+        buffer.clear()
+
+    for pair in rows.iterator(chunk_size=chunk_size):
+        buffer.append(pair)
+        if len(buffer) >= chunk_size:
+            take_chunk()
+    take_chunk()
+    pairs = np.concatenate(chunks)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def build_matrix(user_ids, listing_ids):
+    """Бинарная CSR-матрица пользователи x объявления и id её колонок"""
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    listings, listing_index = np.unique(listing_ids, return_inverse=True)
+    matrix = sparse.coo_matrix(
+        (np.ones(len(user_index), dtype=np.float32), (user_index, listing_index)),
+        shape=(len(users), len(listings))
+    ).tocsr()
+    matrix.data[:] = 1.0        # повторные просмотры (разные дни) не важны
+
+    # Пользователи со слишком большим числом просмотров отбрасываются
+    per_user = np.diff(matrix.indptr)
+    matrix = matrix[per_user <= MAX_VIEWS_PER_USER]
+    return matrix, listings
+
+
+def top_coviewed(matrix, top_k=TOP_K, block=BLOCK):
+    """
+    Генератор по блокам: [(listing_col, [(related_col, score), ...]), ...].
+    Память - один блок C (block x число объявлений), а не вся C.
+    """
+    by_listing = matrix.T.tocsr()                       # объявления x пользователи
+    viewers = np.asarray(matrix.sum(axis=0)).ravel()
+    norms = np.sqrt(np.maximum(viewers, 1.0))
+
+    for start in range(0, by_listing.shape[0], block):
+        end = min(start + block, by_listing.shape[0])
+        counts = (by_listing[start:end] @ matrix).tocsr()    # block x объявления
+        results = []
+        for offset in range(end - start):
+            column = start + offset
+            row_start, row_end = counts.indptr[offset], counts.indptr[offset + 1]
+            related = counts.indices[row_start:row_end]
+            shared = counts.data[row_start:row_end]
+            keep = (related != column) & (shared >= MIN_COVIEWERS)
+            related, shared = related[keep], shared[keep]
+            if not len(related):
+                results.append((column, []))
+                continue
+            scores = shared / (norms[column] * norms[related])
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+                related, scores = related[best], scores[best]
+            order = np.lexsort((related, -scores))
+            results.append((column, list(zip(related[order].tolist(), scores[order].tolist()))))
+        yield results
+
+
+def store_block(listing_ids, results):
+    """Заменяет рекомендации объявлений блока одной короткой транзакцией"""
+    block_ids = [int(listing_ids[column]) for column, _ in results]
+    rows = [
+        CoViewedListing(
+            listing_id=int(listing_ids[column]),
+            related_id=int(listing_ids[related]),
+            rank=rank,
+            score=round(float(score), 6)
+        )
+        for column, pairs in results
+        for rank, (related, score) in enumerate(pairs, start=1)
+    ]
+    with transaction.atomic():
+        CoViewedListing.objects.filter(listing_id__in=block_ids).delete()
+        CoViewedListing.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def compute_coviews(days=90, top_k=TOP_K, block=BLOCK):
+    """Пересчитывает CoViewedListing. Возвращает (объявлений, строк)."""
+    user_ids, viewed_ids = load_views(timezone.now() - timedelta(days=days))
+    if not len(user_ids):
+        CoViewedListing.objects.all().delete()
+        return 0, 0
+
+    matrix, listing_ids = build_matrix(user_ids, viewed_ids)
+    del user_ids, viewed_ids
+
+    stored = 0
+    for results in top_coviewed(matrix, top_k, block):
+        stored += store_block(listing_ids, results)
+
+    # Объявления без просмотров за период
+    stored_ids = np.fromiter(
+        CoViewedListing.objects.order_by().values_list('listing_id', flat=True).distinct(),
+        dtype=np.int64
+    )
+    stale = np.setdiff1d(stored_ids, listing_ids).tolist()
+    for start in range(0, len(stale), block):
+        CoViewedListing.objects.filter(listing_id__in=stale[start:start + block]).delete()
+    return len(listing_ids), stored
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import factory
+from django.utils import timezone
+from factory import fuzzy
+from factory.django import DjangoModelFactory
+
+from apps.properties.factories import RealEstateListingFactory
+from apps.users.factories import UserFactory
+from .models import (
+    CoViewedListing, DailyKeywordSearches, DailyListingViews, RecentlyViewed,
+    RollupCheckpoint, SearchHistory, SearchKeyword, TrendingClock, TrendingListing,
+    ViewHistory
+)
+
+
+class SearchKeywordFactory(DjangoModelFactory):
+    class Meta:
+        model = SearchKeyword
+        django_get_or_create = ['keyword']
+
+    keyword = factory.Faker('city', locale='de_DE')
+    count = fuzzy.FuzzyInteger(1, 500)
+
+
+class SearchHistoryFactory(DjangoModelFactory):
+    class Meta:
+        model = SearchHistory
+
+    user = factory.SubFactory(UserFactory)
+    query = factory.Faker('city', locale='de_DE')
+
+
+class ViewHistoryFactory(DjangoModelFactory):
+    """ViewHistory.save() пропускает просмотр хоста и повтор за день"""
+    class Meta:
+        model = ViewHistory
+
+    user = factory.SubFactory(UserFactory)
+    listing = factory.SubFactory(RealEstateListingFactory)
+
+
+class RecentlyViewedFactory(DjangoModelFactory):
+    class Meta:
+        model = RecentlyViewed
+
+    user = factory.SubFactory(UserFactory)
+    listing_ids = factory.LazyFunction(list)
+
+
+class CoViewedListingFactory(DjangoModelFactory):
+    class Meta:
+        model = CoViewedListing
+
+    listing = factory.SubFactory(RealEstateListingFactory)
+    related = factory.SubFactory(RealEstateListingFactory)
+    rank = factory.Sequence(lambda n: n % 10 + 1)
+    score = fuzzy.FuzzyFloat(0.05, 1.0)
+
+
+class TrendingClockFactory(DjangoModelFactory):
+    class Meta:
+        model = TrendingClock
+
+
+class TrendingListingFactory(DjangoModelFactory):
+    class Meta:
+        model = TrendingListing
+
+    listing = factory.SubFactory(RealEstateListingFactory)
+    city = factory.LazyAttribute(lambda o: o.listing.real_estate_object.address.city.strip().lower())
+    score = fuzzy.FuzzyFloat(0.1, 100.0)
+
+
+class DailyListingViewsFactory(DjangoModelFactory):
+    class Meta:
+        model = DailyListingViews
+
+    listing = factory.SubFactory(RealEstateListingFactory)
+    day = factory.Sequence(lambda n: timezone.now().date() - timedelta(days=n + 1))
+    views = fuzzy.FuzzyInteger(1, 200)
+
+
+class DailyKeywordSearchesFactory(DjangoModelFactory):
+    class Meta:
+        model = DailyKeywordSearches
+
+    keyword = factory.Faker('city', locale='de_DE')
+    day = factory.Sequence(lambda n: timezone.now().date() - timedelta(days=n + 1))
+    searches = fuzzy.FuzzyInteger(1, 200)
+
+
+class RollupCheckpointFactory(DjangoModelFactory):
+    class Meta:
+        model = RollupCheckpoint
+        django_get_or_create = ['source']
+
+    source = 'views'
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.search.coview import BLOCK, TOP_K, compute_coviews
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает "also viewed" (CoViewedListing) по ViewHistory
+    за последние --days дней.
+
+    python manage.py compute_coviews --days 90 --top 10 --block 2000
+    """
+    help = 'Compute co-viewed listing recommendations from view history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--top', type=int, default=TOP_K)
+        parser.add_argument('--block', type=int, default=BLOCK,
+                            help='Listings per co-occurrence block (memory bound)')
+
+    def handle(self, *args, **options):
+        listings, stored = compute_coviews(options['days'], options['top'], options['block'])
+        self.stdout.write(self.style.SUCCESS(f'Listings: {listings}, recommendations stored: {stored}'))
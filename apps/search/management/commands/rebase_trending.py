@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.search.trending import rebase
+
+
+class Command(BaseCommand):
+    """
+    Сдвигает точку отсчёта счётчиков "горячих" объявлений на текущий
+    момент (иначе веса растут экспоненциально). Запускать по cron,
+    например раз в сутки.
+
+    python manage.py rebase_trending
+    """
+    help = 'Rebase trending listing scores to the current time'
+
+    def handle(self, *args, **options):
+        updated, deleted = rebase()
+        self.stdout.write(self.style.SUCCESS(f'Scores rebased: {updated}, pruned: {deleted}'))
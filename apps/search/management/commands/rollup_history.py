@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.search.rollup import SOURCES, rollup
+
+
+class Command(BaseCommand):
+    """
+    Сворачивает ViewHistory / SearchHistory старше --keep-days дней
+    в дневные агрегаты и удаляет исходные строки диапазонами id.
+    Прерванный запуск продолжается с сохранённой позиции.
+
+    python manage.py rollup_history --keep-days 90 --chunk 5000 --pause 0.1
+    """
+    help = 'Roll up old view/search history into daily aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=90)
+        parser.add_argument('--chunk', type=int, default=5000)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between chunks')
+        parser.add_argument('--source', choices=sorted(SOURCES), action='append',
+                            help='Limit to a source (default: all)')
+
+    def handle(self, *args, **options):
+        for name in options['source'] or sorted(SOURCES):
+            total = 0
+            for last_id, stop_id, deleted in rollup(
+                SOURCES[name],
+                options['keep_days'],
+                options['chunk']
+            ):
+                total += deleted
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{name}: {last_id}/{stop_id}')
+                if options['pause']:
+                    time.sleep(options['pause'])
+            self.stdout.write(self.style.SUCCESS(f'{name}: rolled up {total} rows'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.search.reports import top_keywords
+
+
+class Command(BaseCommand):
+    """
+    Самые частые поисковые запросы за последние --days дней
+    (дневные агрегаты + свежая SearchHistory).
+
+    python manage.py top_keywords --days 7 --limit 50
+    """
+    help = 'Print the most searched keywords for the last N days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        end = timezone.localdate()
+        start = end - timezone.timedelta(days=options['days'] - 1)
+        for keyword, searches in top_keywords(start, end, options['limit']):
+            self.stdout.write(f'{searches:>8}  {keyword}')
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 11:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_searchhistory_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='viewhistory',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
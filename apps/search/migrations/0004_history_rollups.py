@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_moderation_queue'),
+        ('search', '0003_viewhistory_viewed_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True)),
+                ('cutoff', models.DateTimeField(blank=True, null=True)),
+                ('stop_id', models.BigIntegerField(default=0)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('rolled_up', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Checkpoint',
+                'verbose_name_plural': 'Rollup Checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyKeywordSearches',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=255)),
+                ('day', models.DateField()),
+                ('searches', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Keyword Searches',
+                'verbose_name_plural': 'Daily Keyword Searches',
+                'indexes': [models.Index(fields=['day'], name='search_dail_day_59c383_idx')],
+                'constraints': [models.UniqueConstraint(fields=('keyword', 'day'), name='unique_daily_keyword_searches')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyListingViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='properties.realestatelisting')),
+            ],
+            options={
+                'verbose_name': 'Daily Listing Views',
+                'verbose_name_plural': 'Daily Listing Views',
+                'indexes': [models.Index(fields=['day'], name='search_dail_day_2a8743_idx')],
+                'constraints': [models.UniqueConstraint(fields=('listing', 'day'), name='unique_daily_listing_views')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0004_history_rollups'),
+        ('users', '0003_alter_profile_phone_alter_role_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentlyViewed',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recently_viewed', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('listing_ids', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Recently Viewed',
+                'verbose_name_plural': 'Recently Viewed',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_moderation_queue'),
+        ('search', '0005_recentlyviewed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoViewedListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coviewed', to='properties.realestatelisting')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='properties.realestatelisting')),
+            ],
+            options={
+                'verbose_name': 'Co-viewed Listing',
+                'verbose_name_plural': 'Co-viewed Listings',
+                'constraints': [models.UniqueConstraint(fields=('listing', 'rank'), name='unique_coviewed_rank')],
+            },
+        ),
+    ]
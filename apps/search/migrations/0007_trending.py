@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 14:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_moderation_queue'),
+        ('search', '0006_coviewedlisting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingClock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Trending Clock',
+                'verbose_name_plural': 'Trending Clock',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingListing',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='properties.realestatelisting')),
+                ('city', models.CharField(max_length=100)),
+                ('score', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name': 'Trending Listing',
+                'verbose_name_plural': 'Trending Listings',
+                'indexes': [models.Index(fields=['city', '-score'], name='search_tren_city_8bf765_idx'), models.Index(fields=['-score'], name='search_tren_score_a31409_idx')],
+            },
+        ),
+    ]
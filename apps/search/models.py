@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.db.models import F
 from django.utils import timezone
+from datetime import timedelta
 
 
 
@@ -25,7 +26,8 @@ class SearchHistory(models.Model):
         related_name='search_history'
     )
     query = models.CharField(max_length=255)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Не auto_now_add: при отложенной записи (search_buffer) время задаётся в момент поиска
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = _('Search History')
@@ -50,7 +52,8 @@ class ViewHistory(models.Model):
         on_delete=models.CASCADE,
         related_name='view_history'
     )
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    # Не auto_now_add: при отложенной записи (view_tracker) время задаётся в момент просмотра
+    viewed_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-viewed_at']
@@ -62,31 +65,209 @@ class ViewHistory(models.Model):
         verbose_name_plural = _('View Histories')
 
     def save(self, *args, **kwargs):
-        #  Проверка хоста
-        if self.user == self.listing.real_estate_object.host:
+        """
+        Одиночная запись (админка, скрипты). В API используется
+        apps.search.tracking.view_tracker.
+        """
+        #  Проверка хоста (по id, без загрузки объекта и хоста)
+        from apps.properties.models import RealEstateObject
+        if RealEstateObject.objects.filter(
+                listings=self.listing_id,
+                host_id=self.user_id
+        ).exists():
             return
 
-        #  Проверка уникальности
-        today = self.viewed_at.date() if self.viewed_at else timezone.now().date()
+        #  Проверка уникальности: диапазон вместо __date, чтобы работал индекс
+        viewed_at = timezone.localtime(self.viewed_at)
+        day_start = viewed_at.replace(hour=0, minute=0, second=0, microsecond=0)
         if ViewHistory.objects.filter(
-                user=self.user,
-                listing=self.listing,
-                viewed_at__date=today
+                user_id=self.user_id,
+                listing_id=self.listing_id,
+                viewed_at__gte=day_start,
+                viewed_at__lt=day_start + timedelta(days=1)
         ).exists():
             return
 
         super().save(*args, **kwargs)
 
-        #  Увеличить счётчик, если поле существует
-        if hasattr(self.listing, 'view_count'):
-            self.listing.view_count = F('view_count') + 1
-            self.listing.save(update_fields=['view_count'])
+        from apps.properties.models import RealEstateListing
+        RealEstateListing.objects.filter(pk=self.listing_id).update(
+            view_count=F('view_count') + 1
+        )
 
     def __str__(self):
         return f"{self.user} viewed {self.listing}"
 
 
+class RecentlyViewed(models.Model):
+    """
+    Копия кольцевого буфера недавних просмотров (apps/search/recent.py)
+    на случай пустого кэша: одна строка на пользователя.
+    """
+    user = models.OneToOneField(
+        'users.User',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recently_viewed'
+    )
+    listing_ids = models.JSONField(default=list)    # новые первыми
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Recently Viewed')
+        verbose_name_plural = _('Recently Viewed')
+
+    def __str__(self):
+        return f"{self.user_id}: {self.listing_ids}"
 
 
+class CoViewedListing(models.Model):
+    """
+    "Гости, смотревшие это, смотрели и ..." - топ-K объявлений,
+    просмотренных теми же пользователями (manage.py compute_coviews).
+    """
+    listing = models.ForeignKey(
+        'properties.RealEstateListing',
+        on_delete=models.CASCADE,
+        related_name='coviewed'
+    )
+    related = models.ForeignKey(
+        'properties.RealEstateListing',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()     # косинусная близость по зрителям
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'rank'], name='unique_coviewed_rank'),
+        ]
+        verbose_name = _('Co-viewed Listing')
+        verbose_name_plural = _('Co-viewed Listings')
+
+    def __str__(self):
+        return f"{self.listing_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class TrendingClock(models.Model):
+    """
+    Точка отсчёта (epoch) для TrendingListing.score - одна строка.
+    Сдвигается командой rebase_trending вместе с пересчётом score.
+    """
+    epoch = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _('Trending Clock')
+        verbose_name_plural = _('Trending Clock')
+
+    def __str__(self):
+        return f"epoch {self.epoch:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def current(cls, lock=False):
+        """Строка часов; lock - заблокировать до конца транзакции"""
+        queryset = cls.objects.select_for_update() if lock else cls.objects
+        clock = queryset.filter(pk=1).first()
+        if clock is None:
+            clock, _ = cls.objects.get_or_create(pk=1)
+        return clock
+
+
+class TrendingListing(models.Model):
+    """
+    Затухающий счётчик просмотров (forward decay, см. apps/search/trending.py).
+    Порядок по score совпадает с порядком по "горячести" в любой момент,
+    поэтому топ города - чтение по индексу (city, score).
+    """
+    listing = models.OneToOneField(
+        'properties.RealEstateListing',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending'
+    )
+    city = models.CharField(max_length=100)         # в нижнем регистре
+    score = models.FloatField(default=0.0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['city', '-score']),
+            models.Index(fields=['-score']),
+        ]
+        verbose_name = _('Trending Listing')
+        verbose_name_plural = _('Trending Listings')
+
+    def __str__(self):
+        return f"{self.listing_id} ({self.city}): {self.score:.3f}"
+
+
+class DailyListingViews(models.Model):
+    """
+    Дневные агрегаты просмотров (rollup_history сворачивает сюда
+    старые строки ViewHistory).
+    """
+    listing = models.ForeignKey(
+        'properties.RealEstateListing',
+        on_delete=models.CASCADE,
+        related_name='daily_views'
+    )
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'day'], name='unique_daily_listing_views'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+        verbose_name = _('Daily Listing Views')
+        verbose_name_plural = _('Daily Listing Views')
+
+    def __str__(self):
+        return f"{self.listing_id} {self.day}: {self.views}"
+
+
+class DailyKeywordSearches(models.Model):
+    """Дневные агрегаты поисковых запросов (из SearchHistory)"""
+    keyword = models.CharField(max_length=255)
+    day = models.DateField()
+    searches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['keyword', 'day'], name='unique_daily_keyword_searches'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+        verbose_name = _('Daily Keyword Searches')
+        verbose_name_plural = _('Daily Keyword Searches')
+
+    def __str__(self):
+        return f"{self.keyword} {self.day}: {self.searches}"
+
+
+class RollupCheckpoint(models.Model):
+    """
+    Прогресс rollup_history по источнику: текущий запуск обрабатывает
+    строки с id в (last_id, stop_id] старше cutoff. Прерванный запуск
+    продолжается с last_id.
+    """
+    source = models.CharField(max_length=50, unique=True)
+    cutoff = models.DateTimeField(null=True, blank=True)
+    stop_id = models.BigIntegerField(default=0)
+    last_id = models.BigIntegerField(default=0)
+    rolled_up = models.PositiveBigIntegerField(default=0)   # всего строк за всё время
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Rollup Checkpoint')
+        verbose_name_plural = _('Rollup Checkpoints')
+
+    @property
+    def in_progress(self):
+        return self.cutoff is not None and self.last_id < self.stop_id
+
+    def __str__(self):
+        return f"{self.source}: {self.last_id}/{self.stop_id}"
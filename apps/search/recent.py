@@ -0,0 +1,64 @@
+"""
+Недавно просмотренные объявления.
+
+Кольцевой буфер последних RECENTLY_VIEWED_LIMIT id на пользователя
+хранится в кэше и обновляется при каждом просмотре. Компактная копия
+(одна строка RecentlyViewed на пользователя) сохраняется при сбросе
+view_tracker и используется, если кэш пуст.
+
+Лента - best effort. Кэш должен быть общим для воркеров (CACHE_URL),
+иначе у каждого процесса своя лента. touch() - чтение и запись без
+блокировки: при одновременных просмотрах одного пользователя в разных
+воркерах один id может потеряться. persist() пишет то, что сейчас в
+кэше, поэтому сброс другого процесса не откатывает копию к старому списку.
+"""
+from django.core.cache import cache
+
+from apps.shared.db import bulk_upsert
+from .models import RecentlyViewed
+
+
+RECENTLY_VIEWED_LIMIT = 20
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def cache_key(user_id):
+    return f'recently_viewed:{user_id}'
+
+
+def push(listing_ids, listing_id, limit=RECENTLY_VIEWED_LIMIT):
+    """Новый id в начало, без повторов, не больше limit"""
+    return [listing_id] + [pk for pk in listing_ids if pk != listing_id][:limit - 1]
+
+
+def get_recent_ids(user_id):
+    listing_ids = cache.get(cache_key(user_id))
+    if listing_ids is None:
+        stored = RecentlyViewed.objects.filter(user_id=user_id).values_list('listing_ids', flat=True).first()
+        listing_ids = stored or []
+        cache.set(cache_key(user_id), listing_ids, CACHE_TIMEOUT)
+    return listing_ids
+
+
+def touch(user_id, listing_id):
+    """Отмечает просмотр. Возвращает новое содержимое буфера или None, если оно не изменилось"""
+    listing_ids = get_recent_ids(user_id)
+    if listing_ids[:1] == [listing_id]:
+        return None
+    listing_ids = push(listing_ids, listing_id)
+    cache.set(cache_key(user_id), listing_ids, CACHE_TIMEOUT)
+    return listing_ids
+
+
+def persist(recent):
+    """{user_id: listing_ids} -> RecentlyViewed одним upsert (актуальный список берётся из кэша)"""
+    cached = cache.get_many([cache_key(user_id) for user_id in recent])
+    bulk_upsert(
+        RecentlyViewed,
+        [
+            RecentlyViewed(user_id=user_id, listing_ids=cached.get(cache_key(user_id), listing_ids))
+            for user_id, listing_ids in sorted(recent.items())
+        ],
+        unique_fields=['user'],
+        update_fields=['listing_ids', 'updated_at']
+    )
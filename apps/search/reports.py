@@ -0,0 +1,66 @@
+"""
+Отчёты по просмотрам и поиску.
+
+Старые дни читаются из дневных агрегатов (DailyListingViews,
+DailyKeywordSearches), свежие - из сырых таблиц. Строка истории
+находится либо в агрегате, либо в сырой таблице (rollup_history
+переносит её одной транзакцией), поэтому суммы не задваиваются.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import SearchHistory, ViewHistory, DailyListingViews, DailyKeywordSearches
+
+
+def _day_range(start, end):
+    """[start, end] в днях -> границы для DateTimeField"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    )
+
+
+def daily_listing_views(listing_ids, start, end):
+    """{(listing_id, day): views} за дни [start, end]"""
+    since, until = _day_range(start, end)
+    result = Counter()
+    rolled = DailyListingViews.objects.filter(
+        listing_id__in=listing_ids, day__range=(start, end)
+    ).values_list('listing_id', 'day', 'views')
+    for listing_id, day, views in rolled:
+        result[listing_id, day] += views
+
+    raw = (
+        ViewHistory.objects.filter(
+            listing_id__in=listing_ids, viewed_at__gte=since, viewed_at__lt=until
+        )
+        .order_by()
+        .annotate(day=TruncDate('viewed_at'))
+        .values_list('listing_id', 'day')
+        .annotate(views=Count('id'))
+    )
+    for listing_id, day, views in raw:
+        result[listing_id, day] += views
+    return dict(result)
+
+
+def top_keywords(start, end, limit=20):
+    """[(keyword, searches)] за дни [start, end], по убыванию"""
+    since, until = _day_range(start, end)
+    totals = Counter(dict(
+        DailyKeywordSearches.objects.filter(day__range=(start, end))
+        .values_list('keyword')
+        .annotate(total=Sum('searches'))
+        .order_by()
+    ))
+    totals.update(dict(
+        SearchHistory.objects.filter(created_at__gte=since, created_at__lt=until)
+        .values_list('query')
+        .annotate(total=Count('id'))
+        .order_by()
+    ))
+    return totals.most_common(limit)
@@ -0,0 +1,103 @@
+"""
+Свёртка старой истории в дневные агрегаты.
+
+Строки старше cutoff обрабатываются диапазонами первичного ключа
+(id в (last_id, last_id + chunk]): в одной короткой транзакции
+агрегаты прибавляются (bulk_increment), строки диапазона удаляются
+и сдвигается RollupCheckpoint. Поэтому прерванный запуск можно
+продолжить без двойного счёта, а блокировки держатся недолго.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.shared.db import bulk_increment
+from .models import (
+    SearchHistory, ViewHistory,
+    DailyListingViews, DailyKeywordSearches, RollupCheckpoint
+)
+
+
+@dataclass(frozen=True)
+class RollupSource:
+    name: str
+    model: type
+    time_field: str
+    key_field: str          # поле источника -> ключ агрегата
+    rollup_model: type
+    rollup_key: str
+    rollup_count: str
+
+
+SOURCES = {
+    'views': RollupSource(
+        'views', ViewHistory, 'viewed_at', 'listing_id',
+        DailyListingViews, 'listing', 'views'
+    ),
+    'searches': RollupSource(
+        'searches', SearchHistory, 'created_at', 'query',
+        DailyKeywordSearches, 'keyword', 'searches'
+    ),
+}
+
+
+def day_cutoff(keep_days, now=None):
+    """Начало дня keep_days дней назад: в агрегаты попадают только целые дни"""
+    day = timezone.localdate(now) - timedelta(days=keep_days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def start_run(source, cutoff):
+    """Новый запуск: от самой старой строки до последней строки старше cutoff"""
+    older = source.model.objects.filter(**{f'{source.time_field}__lt': cutoff})
+    bounds = older.aggregate(first=Min('id'), last=Max('id'))
+    checkpoint, _ = RollupCheckpoint.objects.get_or_create(source=source.name)
+    checkpoint.cutoff = cutoff
+    checkpoint.last_id = (bounds['first'] or 1) - 1
+    checkpoint.stop_id = bounds['last'] or 0
+    checkpoint.save()
+    return checkpoint
+
+
+def roll_chunk(source, checkpoint, chunk_size):
+    """Сворачивает один диапазон id. Возвращает число удалённых строк."""
+    high = min(checkpoint.last_id + chunk_size, checkpoint.stop_id)
+    with transaction.atomic():
+        rows = source.model.objects.filter(
+            id__gt=checkpoint.last_id,
+            id__lte=high,
+            **{f'{source.time_field}__lt': checkpoint.cutoff}
+        )
+        counts = (
+            rows.order_by()
+            .annotate(day=TruncDate(source.time_field))
+            .values_list(source.key_field, 'day')
+            .annotate(count=Count('id'))
+        )
+        bulk_increment(
+            source.rollup_model,
+            [source.rollup_key, 'day'],
+            [source.rollup_count],
+            {(key, day): (count,) for key, day, count in counts}
+        )
+        deleted, _ = rows.delete()
+
+        checkpoint.last_id = high
+        checkpoint.rolled_up += deleted
+        checkpoint.save(update_fields=['last_id', 'rolled_up', 'updated_at'])
+    return deleted
+
+
+def rollup(source, keep_days, chunk_size=5000, now=None):
+    """Генератор: (last_id, stop_id, deleted) после каждого диапазона"""
+    checkpoint = RollupCheckpoint.objects.filter(source=source.name).first()
+    if checkpoint is None or not checkpoint.in_progress:
+        checkpoint = start_run(source, day_cutoff(keep_days, now))
+
+    while checkpoint.in_progress:
+        deleted = roll_chunk(source, checkpoint, chunk_size)
+        yield checkpoint.last_id, checkpoint.stop_id, deleted
@@ -0,0 +1,189 @@
+"""
+Подсказки поиска (автодополнение) из памяти процесса.
+
+Города (вес - число опубликованных объявлений), типы жилья и популярные
+SearchKeyword (вес - count) лежат в массиве, отсортированном по
+нормализованному тексту. Префикс - это диапазон, найденный bisect;
+топ по весу для коротких префиксов (до PRECOMPUTED_PREFIX символов,
+где диапазоны большие) запоминается, длинные префиксы дают короткие
+диапазоны. Поиск - микросекунды, без обращений к БД.
+
+Индекс строится при старте веб-процесса (warm() в core/wsgi.py,
+core/asgi.py; если БД недоступна - при первом обращении) и
+перестраивается в фоне раз в SUGGEST_REFRESH_SECONDS; между
+перестройками веса ключевых слов увеличиваются при сбросе
+search_buffer (bump).
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+
+from apps.shared.constants import PROPERTY_TYPES
+
+
+logger = logging.getLogger(__name__)
+
+Suggestion = namedtuple('Suggestion', 'key text kind weight')
+
+KIND_PRIORITY = {'city': 0, 'type': 1, 'keyword': 2}
+CITY_WEIGHT = 10            # объявление в городе "весит" как 10 поисков
+TYPE_WEIGHT = 5
+KEYWORDS_LIMIT = 50_000
+PRECOMPUTED_PREFIX = 3
+MAX_LIMIT = 20
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def load_suggestions():
+    """Все подсказки тремя запросами"""
+    from apps.properties.models import RealEstateListing
+    from .models import SearchKeyword
+
+    suggestions = []
+    cities = (
+        RealEstateListing.objects.filter(is_active=True, is_approved=True)
+        .values_list('real_estate_object__address__city')
+        .annotate(listings=Count('id'))
+        .order_by()
+    )
+    for city, listings in cities:
+        if city and city.strip():
+            suggestions.append(Suggestion(normalize(city), city.strip(), 'city', listings * CITY_WEIGHT))
+
+    types = dict(
+        RealEstateListing.objects.filter(is_active=True, is_approved=True)
+        .values_list('real_estate_object__property_type')
+        .annotate(listings=Count('id'))
+        .order_by()
+    )
+    for value, label in PROPERTY_TYPES:
+        suggestions.append(Suggestion(normalize(label), label, 'type', TYPE_WEIGHT + types.get(value, 0)))
+
+    keywords = SearchKeyword.objects.order_by('-count').values_list('keyword', 'count')[:KEYWORDS_LIMIT]
+    for keyword, count in keywords:
+        suggestions.append(Suggestion(normalize(keyword), keyword, 'keyword', count))
+    return suggestions
+
+
+class SuggestIndex:
+    def __init__(self, suggestions=()):
+        # Одинаковый текст (город "berlin" и запрос "berlin") - одна подсказка
+        # более приоритетного вида с суммой весов
+        unique = {}
+        for item in sorted(suggestions, key=lambda item: KIND_PRIORITY[item.kind]):
+            if not item.key:
+                continue
+            known = unique.get(item.key)
+            unique[item.key] = known._replace(weight=known.weight + item.weight) if known else item
+        self._entries = sorted(unique.values())
+        self._keys = [item.key for item in self._entries]
+        self._top = {}              # префикс -> топ MAX_LIMIT
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _range(self, prefix):
+        start = bisect_left(self._keys, prefix)
+        return start, bisect_left(self._keys, prefix + '\uffff', start)
+
+    def _best(self, prefix, limit):
+        start, end = self._range(prefix)
+        return heapq.nlargest(limit, self._entries[start:end], key=lambda item: item.weight)
+
+    def lookup(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_LIMIT)
+        with self._lock:
+            if len(prefix) > PRECOMPUTED_PREFIX:
+                return self._best(prefix, limit)
+            top = self._top.get(prefix)
+            if top is None:
+                top = self._top[prefix] = self._best(prefix, MAX_LIMIT)
+            return top[:limit]
+
+    def bump(self, keyword_counts):
+        """Прибавляет поиски ({keyword: count}) к весам ключевых слов"""
+        with self._lock:
+            for keyword, count in keyword_counts.items():
+                key = normalize(keyword)
+                if not key:
+                    continue
+                position = bisect_left(self._keys, key)
+                if position < len(self._keys) and self._keys[position] == key:
+                    item = self._entries[position]
+                    self._entries[position] = item._replace(weight=item.weight + count)
+                else:
+                    self._keys.insert(position, key)
+                    self._entries.insert(position, Suggestion(key, keyword, 'keyword', count))
+                # Запомненные топы этих префиксов устарели
+                for length in range(1, min(len(key), PRECOMPUTED_PREFIX) + 1):
+                    self._top.pop(key[:length], None)
+
+
+class SuggestService:
+    """Индекс процесса с фоновой перестройкой"""
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def warm(self):
+        """Строит индекс до первого запроса"""
+        try:
+            self.index()
+        except Exception:
+            logger.exception('Suggest index was not built at startup, building on first lookup')
+        finally:
+            connections.close_all()
+
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._rebuild()
+        elif time.monotonic() - self._built_at > self.refresh_seconds and not self._rebuilding:
+            with self._lock:
+                if self._rebuilding:
+                    return self._index
+                self._rebuilding = True
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+        return self._index
+
+    def _rebuild(self):
+        self._index = SuggestIndex(load_suggestions())
+        self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self):
+        try:
+            self._rebuild()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            connections.close_all()     # соединения этого потока
+
+    def lookup(self, prefix, limit=8):
+        return self.index().lookup(prefix, limit)
+
+    def bump(self, keyword_counts):
+        # До первого обращения индекса нет - и обновлять нечего
+        if self._index is not None:
+            self._index.bump(keyword_counts)
+
+
+suggestions = SuggestService(settings.SUGGEST_REFRESH_SECONDS)
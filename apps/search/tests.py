@@ -1,3 +1,299 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.properties.factories import RealEstateListingFactory
+from apps.properties.models import RealEstateListing
+from apps.users.factories import UserFactory
+from .buffer import SearchBuffer
+from .coview import compute_coviews, load_views
+from .models import (
+    CoViewedListing, DailyKeywordSearches, DailyListingViews, RecentlyViewed, RollupCheckpoint, SearchHistory,
+    SearchKeyword, TrendingListing, ViewHistory
+)
+from .reports import daily_listing_views, top_keywords
+from .rollup import SOURCES, rollup
+from .suggest import SuggestIndex, SuggestService
+from .tracking import DailyBloomFilter, ViewTracker
+
+
+def keyword_counts():
+    return dict(SearchKeyword.objects.values_list('keyword', 'count'))
+
+
+class SearchBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = SearchBuffer(max_pending=5, flush_interval=3600)
+        patcher = mock.patch.object(self.buffer, '_ensure_flusher')     # без фонового потока
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = UserFactory()
+
+    def test_flush_writes_counts_and_history(self):
+        self.buffer.record('  Berlin  Mitte ', self.user)
+        self.buffer.record('berlin mitte')
+        self.buffer.record('hamburg')
+
+        self.assertEqual(self.buffer.flush(), 4)
+
+        self.assertEqual(keyword_counts(), {'berlin mitte': 2, 'hamburg': 1})
+        self.assertEqual(list(SearchHistory.objects.values_list('query', flat=True)), ['berlin mitte'])
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_full_buffer_wakes_flusher_instead_of_writing_in_caller(self):
+        for _ in range(5):
+            self.buffer.record('berlin')
+
+        self.assertEqual(keyword_counts(), {})
+        self.assertTrue(self.buffer._wakeup.is_set())
+        self.assertEqual(self.buffer.pending(), 5)
+
+    def test_bad_item_is_dropped_and_rest_is_written(self):
+        write = self.buffer._write
+
+        def failing_write(batch):
+            if 'broken' in batch[0]:
+                raise IntegrityError('broken')
+            write(batch)
+
+        self.buffer.record('berlin')
+        self.buffer.record('broken')
+        with mock.patch.object(self.buffer, '_write', failing_write), self.assertLogs('apps.shared.buffer', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 1)
+
+        self.assertEqual(keyword_counts(), {'berlin': 1})
+        self.assertEqual((self.buffer.stats['flushed'], self.buffer.stats['failed']), (1, 1))
+
+    def test_batch_is_requeued_while_database_is_unavailable(self):
+        self.buffer.record('berlin', self.user)
+        with mock.patch('apps.search.buffer.bulk_increment', side_effect=OperationalError('gone away')), \
+                self.assertLogs('apps.shared.buffer', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.buffer.record('berlin')
+
+        self.assertEqual(self.buffer.pending(), 3)
+        self.assertEqual(self.buffer.stats['requeued'], 2)
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(keyword_counts(), {'berlin': 2})
+        self.assertEqual(SearchHistory.objects.count(), 1)
+
+    def test_discard_drops_pending_without_writing(self):
+        self.buffer.record('berlin', self.user)
+
+        self.assertEqual(self.buffer.discard(), 2)
+
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(keyword_counts(), {})
+
+    def test_new_buffer_registers_no_exit_hook(self):
+        with mock.patch('atexit.register') as register:
+            SearchBuffer()
+
+        register.assert_not_called()
+
+    def test_requeue_is_bounded(self):
+        self.buffer.REQUEUE_LIMIT = 1
+        for _ in range(4):
+            self.buffer.record('berlin')
+        with mock.patch('apps.search.buffer.bulk_increment', side_effect=OperationalError('gone away')):
+            with self.assertLogs('apps.shared.buffer', 'ERROR'):
+                self.buffer.flush()
+            for _ in range(4):
+                self.buffer.record('hamburg')
+            with self.assertLogs('apps.shared.buffer', 'ERROR'):
+                self.buffer.flush()
+
+        self.assertEqual(self.buffer.pending(), 4)
+        self.assertEqual(self.buffer.stats['failed'], 4)
+
+
+class ViewTrackerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tracker = ViewTracker(max_pending=100, flush_interval=3600)
+        patcher = mock.patch.object(self.tracker, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.listing = RealEstateListingFactory(view_count=0)
+        self.user = UserFactory()
+
+    def test_repeated_view_on_same_day_is_counted_once(self):
+        self.assertTrue(self.tracker.record(self.listing, self.user))
+        self.assertFalse(self.tracker.record(self.listing, self.user))
+        self.assertTrue(self.tracker.record(self.listing, UserFactory()))
+
+        self.tracker.flush()
+
+        self.assertEqual(ViewHistory.objects.filter(listing=self.listing).count(), 2)
+        self.assertEqual(RealEstateListing.objects.get(pk=self.listing.pk).view_count, 2)
+        self.assertTrue(TrendingListing.objects.filter(listing=self.listing, score__gt=0).exists())
+        self.assertEqual(self.tracker.stats['duplicates'], 1)
+
+    def test_anonymous_and_host_views_are_ignored(self):
+        self.assertFalse(self.tracker.record(self.listing, AnonymousUser()))
+        self.assertFalse(self.tracker.record(self.listing, self.listing.real_estate_object.host))
+
+        self.assertEqual(self.tracker.pending(), 0)
+
+    def test_flush_persists_recently_viewed(self):
+        other = RealEstateListingFactory()
+        self.tracker.record(self.listing, self.user)
+        self.tracker.record(other, self.user)
+
+        self.tracker.flush()
+
+        self.assertEqual(RecentlyViewed.objects.get(user=self.user).listing_ids, [other.pk, self.listing.pk])
+
+    def test_stale_flush_does_not_roll_back_recently_viewed(self):
+        other = RealEstateListingFactory()
+        self.tracker.record(self.listing, self.user)
+        stale = ViewTracker(max_pending=100, flush_interval=3600)     # второй воркер, сброс позже
+        stale._recent = dict(self.tracker._recent)
+        self.tracker.record(other, self.user)
+        self.tracker.flush()
+
+        stale.flush()
+
+        self.assertEqual(RecentlyViewed.objects.get(user=self.user).listing_ids, [other.pk, self.listing.pk])
+
+    def test_bloom_filter_remembers_keys_per_day(self):
+        seen = DailyBloomFilter(capacity=1000)
+
+        self.assertTrue(seen.add('2026-10-19', (1, 2)))
+        self.assertFalse(seen.add('2026-10-19', (1, 2)))
+        self.assertTrue(seen.add('2026-10-19', (2, 1)))
+        self.assertTrue(seen.add('2026-10-20', (1, 2)))
+
+
+class SuggestServiceTests(TestCase):
+    def test_warm_builds_index_before_first_lookup(self):
+        RealEstateListingFactory(real_estate_object__address__city='Berlin')
+        service = SuggestService(refresh_seconds=600)
+
+        service.warm()
+
+        with mock.patch('apps.search.suggest.load_suggestions') as load:
+            self.assertEqual([item.text for item in service.lookup('ber')], ['Berlin'])
+        load.assert_not_called()
+
+    def test_stale_index_starts_one_background_rebuild(self):
+        service = SuggestService(refresh_seconds=0)
+        service._index = SuggestIndex()
+        with mock.patch('apps.search.suggest.threading.Thread') as thread:
+            service.index()
+            service.index()
+
+        thread.assert_called_once()
+        self.assertTrue(service._rebuilding)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.listing = RealEstateListingFactory()
+        self.user = UserFactory()
+        self.now = timezone.now()
+        # 3 + 2 старых просмотра в двух днях и 1 свежий
+        ViewHistory.objects.bulk_create(
+            [ViewHistory(listing=self.listing, user=self.user, viewed_at=self.days_ago(40))] * 3 +
+            [ViewHistory(listing=self.listing, user=self.user, viewed_at=self.days_ago(35))] * 2 +
+            [ViewHistory(listing=self.listing, user=self.user, viewed_at=self.days_ago(1))]
+        )
+        SearchHistory.objects.bulk_create(
+            [SearchHistory(user=self.user, query='berlin', created_at=self.days_ago(40))] * 2 +
+            [SearchHistory(user=self.user, query='berlin', created_at=self.days_ago(1))] +
+            [SearchHistory(user=self.user, query='hamburg', created_at=self.days_ago(1))]
+        )
+
+    def days_ago(self, days):
+        return self.now - timedelta(days=days)
+
+    def report(self):
+        end = timezone.localdate(self.now)
+        return (
+            daily_listing_views([self.listing.id], end - timedelta(days=60), end),
+            top_keywords(end - timedelta(days=60), end)
+        )
+
+    def test_old_rows_move_to_aggregates_without_changing_reports(self):
+        before = self.report()
+
+        list(rollup(SOURCES['views'], keep_days=30, now=self.now))
+        list(rollup(SOURCES['searches'], keep_days=30, now=self.now))
+
+        self.assertEqual(self.report(), before)
+        self.assertEqual(ViewHistory.objects.count(), 1)
+        self.assertEqual(sorted(DailyListingViews.objects.values_list('views', flat=True)), [2, 3])
+        self.assertEqual(list(DailyKeywordSearches.objects.values_list('keyword', 'searches')), [('berlin', 2)])
+        self.assertEqual(before[1], [('berlin', 3), ('hamburg', 1)])
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        before = self.report()
+        steps = rollup(SOURCES['views'], keep_days=30, chunk_size=2, now=self.now)
+        next(steps)     # процесс прерван после первого диапазона
+
+        checkpoint = RollupCheckpoint.objects.get(source='views')
+        self.assertTrue(checkpoint.in_progress)
+        deleted = sum(step[2] for step in rollup(SOURCES['views'], keep_days=30, chunk_size=2, now=self.now))
+
+        self.assertEqual(RollupCheckpoint.objects.get(source='views').rolled_up, 5)
+        self.assertEqual(deleted, 3)
+        self.assertEqual(self.report(), before)
+
+    def test_host_sees_daily_views_of_own_listing(self):
+        list(rollup(SOURCES['views'], keep_days=30, now=self.now))
+        client = APIClient()
+        client.force_authenticate(self.listing.real_estate_object.host)
+
+        response = client.get(f'/api/v1/host-listings/{self.listing.id}/views/', {'days': 60})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 6)
+        self.assertEqual([day['views'] for day in response.data['days']], [3, 2, 1])
+
+
+class CoViewTests(TestCase):
+    def setUp(self):
+        self.first, self.second, self.third = RealEstateListingFactory.create_batch(3)
+        users = UserFactory.create_batch(3)
+        now = timezone.now()
+        views = [(users[0], self.first), (users[0], self.second), (users[1], self.first),
+                 (users[1], self.second), (users[2], self.first), (users[2], self.third)]
+        ViewHistory.objects.bulk_create(
+            ViewHistory(user=user, listing=listing, viewed_at=now - timedelta(days=days))
+            for user, listing in views
+            for days in (1, 2)          # повтор в другой день
+        )
+
+    def test_load_views_drops_repeats_within_chunk(self):
+        user_ids, listing_ids = load_views(timezone.now() - timedelta(days=30), chunk_size=4)
+
+        self.assertEqual(len(set(zip(user_ids.tolist(), listing_ids.tolist()))), 6)
+        self.assertLess(len(user_ids), 12)
+
+    def test_listings_viewed_by_same_guests_are_related(self):
+        self.assertEqual(compute_coviews(days=30), (3, 2))
+
+        pairs = set(CoViewedListing.objects.values_list('listing_id', 'related_id'))
+        self.assertEqual(pairs, {(self.first.id, self.second.id), (self.second.id, self.first.id)})
+
+    def test_also_viewed_of_unknown_or_unpublished_listing_is_404(self):
+        compute_coviews(days=30)
+        client = APIClient()
+        self.assertEqual(
+            [card['id'] for card in client.get(f'/api/v1/listing/{self.first.id}/also-viewed/').json()],
+            [self.second.id]
+        )
+        self.assertEqual(client.get(f'/api/v1/listing/{self.third.id}/also-viewed/').json(), [])
+
+        RealEstateListing.objects.filter(pk=self.first.pk).update(is_approved=False)
 
-# Create your tests here.
+        self.assertEqual(client.get(f'/api/v1/listing/{self.first.id}/also-viewed/').status_code, 404)
+        self.assertEqual(client.get('/api/v1/listing/999999/also-viewed/').status_code, 404)
+        self.assertEqual(client.get('/api/v1/listing/abc/also-viewed/').status_code, 404)
@@ -0,0 +1,204 @@
+"""
+Учёт просмотров объявлений.
+
+Раньше каждый просмотр стоил четыре обращения к БД (загрузка хоста,
+exists() за сегодня, INSERT, UPDATE горячей строки view_count).
+Теперь повтор (user, listing, день) отсекается в памяти или в кэше,
+строки ViewHistory пишутся bulk_create, а view_count и счётчики
+"горячих" объявлений (trending) увеличиваются при сбросе суммарной
+дельтой по объявлению.
+"""
+import hashlib
+import math
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.shared.buffer import WriteBehindBuffer
+from . import recent, trending
+from .models import ViewHistory
+
+
+def seconds_until_tomorrow(now=None):
+    now = timezone.localtime(now)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+    return max(int((tomorrow - now).total_seconds()), 1)
+
+
+class DailySeenSet:
+    """Множество (user, listing) за текущий день в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day = None
+        self._seen = set()
+
+    def add(self, day, key):
+        """True, если ключ за этот день ещё не встречался"""
+        with self._lock:
+            if day != self._day:
+                self._day, self._seen = day, self._reset()
+            if self._contains(key):
+                return False
+            self._insert(key)
+            return True
+
+    def _reset(self):
+        return set()
+
+    def _contains(self, key):
+        return key in self._seen
+
+    def _insert(self, key):
+        self._seen.add(key)
+
+
+class DailyBloomFilter(DailySeenSet):
+    """
+    То же на Bloom-фильтре: фиксированная память (~1.2 МБ на 1 млн ключей
+    при 1% ошибок). Ложные срабатывания теряют часть просмотров,
+    но дублей не бывает.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.01):
+        super().__init__()
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self._seen = self._reset()
+
+    def _reset(self):
+        return bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def _contains(self, key):
+        return all(self._seen[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def _insert(self, key):
+        for pos in self._positions(key):
+            self._seen[pos >> 3] |= 1 << (pos & 7)
+
+
+class CacheSeenSet:
+    """Общее для всех процессов множество в кэше (cache.add атомарен)"""
+
+    def add(self, day, key):
+        user_id, listing_id = key
+        return cache.add(
+            f'viewed:{day:%Y%m%d}:{user_id}:{listing_id}',
+            1,
+            timeout=seconds_until_tomorrow()
+        )
+
+
+def make_seen_set(backend):
+    if backend == 'cache':
+        return CacheSeenSet()
+    if backend == 'bloom':
+        return DailyBloomFilter(capacity=settings.VIEW_DEDUP_BLOOM_CAPACITY)
+    return DailySeenSet()
+
+
+class ViewTracker(WriteBehindBuffer):
+    """
+    view_tracker.record(listing, request.user)
+
+    Анонимные просмотры и просмотры хоста не учитываются. Дедупликация
+    в памяти работает в пределах процесса; для нескольких воркеров
+    используйте VIEW_DEDUP=cache. Каждый просмотр (и повторный) обновляет
+    недавно просмотренные (recent), их копия пишется в БД при сбросе.
+    """
+
+    def __init__(self, seen=None, **kwargs):
+        super().__init__(**kwargs)
+        self.seen = seen or DailySeenSet()
+        self._rows = []
+        self._deltas = Counter()
+        self._recent = {}
+
+    def record(self, listing, user):
+        if not user.is_authenticated:
+            return False
+        if user.pk == listing.real_estate_object.host_id:
+            return False
+        recent_ids = recent.touch(user.pk, listing.pk)
+        now = timezone.now()
+        if self.seen.add(timezone.localdate(now), (user.pk, listing.pk)):
+            row = ViewHistory(user_id=user.pk, listing_id=listing.pk, viewed_at=now)
+        else:
+            self.stats['duplicates'] += 1
+            row = None
+        if row is not None or recent_ids is not None:
+            self.add(row, user.pk, recent_ids)
+        return row is not None
+
+    def _add(self, row, user_id, recent_ids):
+        if recent_ids is not None:
+            self._recent[user_id] = recent_ids
+        if row is None:
+            return 0
+        self._rows.append(row)
+        self._deltas[row.listing_id] += 1
+        return 1
+
+    def _pending(self):
+        return len(self._rows) + len(self._recent)
+
+    def _take(self):
+        batch = (self._rows, self._deltas, self._recent)
+        self._rows, self._deltas, self._recent = [], Counter(), {}
+        return batch
+
+    def _size(self, batch):
+        rows, _, recent_lists = batch
+        return len(rows) + len(recent_lists)
+
+    def _write(self, batch):
+        from apps.properties.models import RealEstateListing
+
+        rows, deltas, recent_lists = batch
+        # Один UPDATE на каждое различное значение дельты (обычно их единицы)
+        by_delta = defaultdict(list)
+        for listing_id, delta in deltas.items():
+            by_delta[delta].append(listing_id)
+
+        with transaction.atomic():
+            ViewHistory.objects.bulk_create(rows, batch_size=1000)
+            for delta, listing_ids in sorted(by_delta.items()):
+                RealEstateListing.objects.filter(id__in=sorted(listing_ids)).update(
+                    view_count=F('view_count') + delta
+                )
+            trending.record_views(rows)
+            if recent_lists:
+                recent.persist(recent_lists)
+
+    def _split(self, batch):
+        rows, _, recent_lists = batch
+        return (
+            [([row], Counter({row.listing_id: 1}), {}) for row in rows] +
+            [([], Counter(), {user_id: listing_ids}) for user_id, listing_ids in recent_lists.items()]
+        )
+
+    def _merge(self, batch):
+        rows, deltas, recent_lists = batch
+        self._rows.extend(rows)
+        self._deltas.update(deltas)
+        for user_id, listing_ids in recent_lists.items():
+            # Более свежий список, набранный после сбоя, не затираем
+            self._recent.setdefault(user_id, listing_ids)
+
+
+view_tracker = ViewTracker(
+    seen=make_seen_set(settings.VIEW_DEDUP),
+    max_pending=settings.VIEW_TRACKER_MAX_PENDING,
+    flush_interval=settings.VIEW_TRACKER_FLUSH_SECONDS
+)
@@ -0,0 +1,99 @@
+"""
+"Горячие" объявления: затухающие счётчики просмотров.
+
+Forward decay: просмотр в момент t добавляет к score вес
+    exp(λ (t - epoch)),   λ = ln 2 / TRENDING_HALF_LIFE_HOURS
+Текущая "горячесть" = score * exp(-λ (now - epoch)) - у всех объявлений
+один и тот же множитель, поэтому порядок по score не меняется со временем
+и топ города читается по индексу (city, score) без пересчётов и без
+ViewHistory. Веса растут экспоненциально, поэтому epoch периодически
+сдвигается (manage.py rebase_trending), а score умножается на
+exp(-λ (new_epoch - epoch)).
+"""
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.shared.db import bulk_increment
+from .models import TrendingClock, TrendingListing
+
+
+PRUNE_BELOW = 0.01      # после rebase: меньше ~1% одного свежего просмотра
+
+
+def decay_rate():
+    """λ в 1/сек"""
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def view_weight(viewed_at, epoch):
+    return math.exp(decay_rate() * (viewed_at - epoch).total_seconds())
+
+
+def current_score(score, epoch, now=None):
+    """score -> "горячесть" на момент now (в свежих просмотрах)"""
+    now = now or timezone.now()
+    return score * math.exp(-decay_rate() * (now - epoch).total_seconds())
+
+
+def record_views(rows):
+    """
+    Добавляет просмотры (ViewHistory без сохранения) к счётчикам.
+    Вызывается в транзакции сброса view_tracker.
+    """
+    from apps.properties.models import RealEstateListing
+
+    if not rows:
+        return
+    # Блокировка часов: rebase не сдвинет epoch между расчётом веса и записью
+    epoch = TrendingClock.current(lock=True).epoch
+    weights = defaultdict(float)
+    for row in rows:
+        weights[row.listing_id] += view_weight(row.viewed_at, epoch)
+
+    cities = dict(
+        RealEstateListing.objects.filter(id__in=list(weights))
+        .values_list('id', 'real_estate_object__address__city')
+    )
+    bulk_increment(
+        TrendingListing,
+        ['listing'],
+        ['score'],
+        {
+            (listing_id,): (weight, (cities[listing_id] or '').strip().lower())
+            for listing_id, weight in weights.items()
+            if listing_id in cities
+        },
+        set_fields=['city']
+    )
+
+
+def trending(city=None, limit=20):
+    """Топ опубликованных объявлений (по городу или везде), горячие первыми"""
+    queryset = TrendingListing.objects.filter(
+        listing__is_active=True,
+        listing__is_approved=True
+    )
+    if city:
+        queryset = queryset.filter(city=city.strip().lower())
+    return queryset.order_by('-score')[:limit]
+
+
+def rebase(now=None):
+    """
+    Сдвигает epoch на now и пересчитывает score одним UPDATE;
+    почти остывшие объявления удаляются. Возвращает (обновлено, удалено).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        clock = TrendingClock.current(lock=True)
+        factor = math.exp(-decay_rate() * (now - clock.epoch).total_seconds())
+        updated = TrendingListing.objects.update(score=F('score') * factor)
+        deleted, _ = TrendingListing.objects.filter(score__lt=PRUNE_BELOW).delete()
+        clock.epoch = now
+        clock.save(update_fields=['epoch'])
+    return updated, deleted
@@ -1,3 +1,22 @@
-from django.shortcuts import render
+from rest_framework import permissions, viewsets
+from rest_framework.response import Response
 
-# Create your views here.
+from .suggest import suggestions
+
+
+class SearchSuggestViewSet(viewsets.ViewSet):
+    """
+    Подсказки для строки поиска (города, типы жилья, популярные запросы)
+    GET /api/v1/search/suggest/?q=ber&limit=8
+
+    Отвечает из индекса в памяти процесса, без запросов к БД.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 8))
+        except ValueError:
+            limit = 8
+        items = suggestions.lookup(request.query_params.get('q', ''), max(limit, 1))
+        return Response([{'text': item.text, 'kind': item.kind} for item in items])
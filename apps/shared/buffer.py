@@ -0,0 +1,181 @@
+import atexit
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakSet()
+_exit_hook = threading.Lock()
+_exit_registered = False
+
+
+def flush_all():
+    return sum(buffer.flush() for buffer in list(_buffers))
+
+
+def discard_all():
+    """Очищает все буферы без записи в БД (тесты: см. apps/shared/testing.TestRunner)"""
+    return sum(buffer.discard() for buffer in list(_buffers))
+
+
+def flush_on_exit():
+    """
+    Сброс всех буферов при завершении процесса. Вызывается только
+    при старте веб-процесса (core/wsgi.py, core/asgi.py): команды,
+    воркеры и тесты не пишут в БД из atexit.
+    """
+    global _exit_registered
+    with _exit_hook:
+        if not _exit_registered:
+            atexit.register(flush_all)
+            _exit_registered = True
+
+
+class WriteBehindBuffer:
+    """
+    Буфер записи в памяти процесса: данные копятся и сбрасываются в БД
+    пачкой - при достижении max_pending или раз в flush_interval секунд
+    (фоновый поток), а также при завершении веб-процесса (flush_on_exit).
+
+    Полный буфер сбрасывает фоновый поток (запрос его не ждёт). Если
+    пачка не записалась, она пишется по одному элементу: элемент с
+    ошибкой данных отбрасывается, а при недоступной БД остаток
+    возвращается в буфер (не больше REQUEUE_LIMIT * max_pending).
+
+    При падении процесса теряется не больше pending() элементов.
+    Подклассы реализуют _add() (возвращает число добавленных элементов),
+    _pending(), _take(), _size(), _write(), _split() и _merge().
+    """
+    REQUEUE_LIMIT = 10
+
+    def __init__(self, max_pending=1000, flush_interval=5.0):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.stats = Counter()      # recorded / flushed / failed / requeued
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = None
+        _buffers.add(self)
+
+    def add(self, *args, **kwargs):
+        with self._lock:
+            self.stats['recorded'] += self._add(*args, **kwargs)
+            full = self._pending() >= self.max_pending
+        self._ensure_flusher()
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        """Сколько элементов сейчас только в памяти (потеряются при падении)"""
+        with self._lock:
+            return self._pending()
+
+    def discard(self):
+        """Выбрасывает накопленное без записи; возвращает число элементов"""
+        with self._lock:
+            return self._size(self._take())
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take()
+            size = self._size(batch)
+            if not size:
+                return 0
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception('%s: failed to flush %s items, retrying one by one', type(self).__name__, size)
+                return self._write_each(batch)
+            self.stats['flushed'] += size
+            return size
+
+    def _write_each(self, batch):
+        from django.db import DataError, IntegrityError
+
+        written = 0
+        parts = self._split(batch)
+        for index, part in enumerate(parts):
+            size = self._size(part)
+            try:
+                self._write(part)
+            except (DataError, IntegrityError):
+                # Повтор не поможет - элемент отбрасывается
+                self.stats['failed'] += size
+                logger.exception('%s: dropped %s items', type(self).__name__, size)
+            except Exception:
+                # БД недоступна: остаток ждёт следующего сброса
+                logger.exception('%s: database unavailable, requeueing', type(self).__name__)
+                self._requeue(parts[index:])
+                break
+            else:
+                self.stats['flushed'] += size
+                written += size
+        return written
+
+    def _requeue(self, parts):
+        with self._lock:
+            for part in parts:
+                size = self._size(part)
+                if self._pending() + size > self.max_pending * self.REQUEUE_LIMIT:
+                    self.stats['failed'] += size
+                else:
+                    self._merge(part)
+                    self.stats['requeued'] += size
+
+    def _ensure_flusher(self):
+        # Поток создаётся лениво - после fork() в каждом воркере свой
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run_flusher,
+                name=f'{type(self).__name__}-flusher',
+                daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self):
+        from django.db import close_old_connections
+
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            requeued = self.stats['requeued']
+            self.flush()
+            if self.stats['requeued'] != requeued:
+                # БД недоступна - не долбим её на каждом add()
+                time.sleep(self.flush_interval)
+
+    # --- реализуется в подклассах ---
+
+    def _add(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def _pending(self):
+        raise NotImplementedError
+
+    def _take(self):
+        raise NotImplementedError
+
+    def _size(self, batch):
+        raise NotImplementedError
+
+    def _write(self, batch):
+        raise NotImplementedError
+
+    def _split(self, batch):
+        """Пачка -> список пачек по одному элементу"""
+        raise NotImplementedError
+
+    def _merge(self, batch):
+        """Возвращает пачку в буфер (вызывается под _lock)"""
+        raise NotImplementedError
@@ -44,6 +44,13 @@ BOOKING_STATUS_CHOICES = [
     ('completed', 'Completed'),
 ]
 
+OUTBOX_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('processing', 'Processing'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+]
+
 # ============================================================================
 # CURRENCIES
 # ============================================================================
@@ -53,6 +60,14 @@ CURRENCY_CHOICES = [
     ('GBP', 'GBP'),
 ]
 
+# Приблизительные курсы для сравнения цен (признаки похожих объявлений),
+# не для расчётов с гостями
+EXCHANGE_RATES_TO_EUR = {
+    'EUR': 1.0,
+    'USD': 0.92,
+    'GBP': 1.17,
+}
+
 # ============================================================================
 # REVIEWS & RATINGS
 # ============================================================================
@@ -66,4 +81,10 @@ RATING_VALUES = [
     ('TOP', 'TOP'),
     ('OK', 'OK'),
     ('POOR', 'POOR'),
-]
\ No newline at end of file
+]
+
+RATING_SCORES = {
+    'TOP': 100,
+    'OK': 50,
+    'POOR': 0,
+}
@@ -0,0 +1,299 @@
+"""
+Синтетический каталог для бенчмарков и локальной разработки.
+
+Строки строятся фабриками (build, без сохранения) и пишутся
+bulk_create. Каталог состоит из блоков по BLOCK объявлений; в блоке
+хосты (по LISTINGS_PER_HOST объявлений), гости, объекты с адресами,
+доступность на год вперёд, завершённые брони с отзывами и оценками
+гостей и просмотры. Первичные ключи назначаются явно по номеру блока:
+MySQL не возвращает id из bulk_create, а связи нужны до вставки.
+Поэтому блоки независимы (их можно строить в любом порядке и в
+нескольких процессах), а каталог на 100k получается достройкой
+каталога на 1k.
+
+Перекос распределения - закон Ципфа с показателем skew (0 - равномерно):
+по нему выбираются города (из cities) и "горячие" объявления блока,
+которым достаётся больше броней и просмотров.
+"""
+import multiprocessing
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import partial
+from itertools import accumulate
+
+import django
+import factory.random
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from apps.bookings.factories import AvailabilityFactory
+from apps.bookings.models import Availability, Booking
+from apps.properties.factories import (
+    AddressFactory, PropertyStatsFactory,
+    RealEstateListingFactory, RealEstateObjectFactory
+)
+from apps.properties.models import Address, PropertyStats, RealEstateListing, RealEstateObject
+from apps.reviews.models import ListingReviewStats, PropertyReview, UserRating
+from apps.search.models import ViewHistory
+from apps.shared.constants import RATING_CATEGORIES, RATING_SCORES
+from apps.users.factories import ProfileFactory, UserFactory
+from apps.users.models import HostSummary, Profile, Role, User
+
+
+BLOCK = 1000
+LISTINGS_PER_HOST = 20
+GUESTS_PER_BLOCK = 100
+LISTINGS_PER_CITY = 200
+PAST_BOOKINGS_PER_BLOCK = 500
+PAST_BOOKINGS_FROM = date(2024, 1, 1)
+PAST_BOOKINGS_DAYS = 600   # завершённые брони - в этом окне, без пересечений по объявлению
+VIEWS_PER_BLOCK = 1000
+BATCH_SIZE = 2000  # строк на один INSERT
+
+HOSTS_PER_BLOCK = BLOCK // LISTINGS_PER_HOST
+USERS_PER_BLOCK = HOSTS_PER_BLOCK + GUESTS_PER_BLOCK
+REVIEWED_BOOKINGS_PER_BLOCK = PAST_BOOKINGS_PER_BLOCK // 2
+
+# Сколько строк каждой таблицы (с явным id) приходится на блок
+ROWS_PER_BLOCK = {
+    User: USERS_PER_BLOCK,
+    Profile: USERS_PER_BLOCK,
+    Address: BLOCK,
+    PropertyStats: BLOCK,
+    RealEstateObject: BLOCK,
+    RealEstateListing: BLOCK,
+    Availability: BLOCK,
+    Booking: PAST_BOOKINGS_PER_BLOCK,
+    PropertyReview: REVIEWED_BOOKINGS_PER_BLOCK,
+    # Хост оценивает гостя по всем категориям
+    UserRating: REVIEWED_BOOKINGS_PER_BLOCK * len(RATING_CATEGORIES),
+    ViewHistory: VIEWS_PER_BLOCK,
+}
+
+
+def id_bases():
+    """Первые свободные id таблиц: блок b использует base + b * ROWS_PER_BLOCK"""
+    return {
+        model: (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        for model in ROWS_PER_BLOCK
+    }
+
+
+def block_ids(bases, model, block):
+    start = bases[model] + block * ROWS_PER_BLOCK[model]
+    return range(start, start + ROWS_PER_BLOCK[model])
+
+
+def published_listings():
+    return RealEstateListing.objects.filter(is_active=True, is_approved=True).count()
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса рангов 1..count, вес ранга ~ 1 / rank^skew"""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def free_stay(rnd, taken, nights, attempts=20):
+    """
+    Случайный заезд (день окна), при котором nights ночей не пересекаются
+    с taken (занятые дни объявления); занимает их. None - не нашлось.
+    """
+    for _ in range(attempts):
+        start = rnd.randrange(PAST_BOOKINGS_DAYS - nights)
+        stay = range(start, start + nights)
+        if taken.isdisjoint(stay):
+            taken.update(stay)
+            return start
+    return None
+
+
+def build_block(block, bases, seed=42, skew=0.0, cities=0):
+    """
+    Строит и записывает один блок одной транзакцией.
+    cities=0 - города по порядку, по LISTINGS_PER_CITY объявлений;
+    иначе город выбирается из cities с перекосом skew.
+    """
+    # Блок воспроизводим: зерно зависит от его первого id
+    block_seed = seed * 1_000_003 + block_ids(bases, RealEstateListing, block).start
+    rnd = random.Random(block_seed)
+    factory.random.reseed_random(block_seed)
+    fake = Faker()
+    fake.seed_instance(block_seed)
+    today = timezone.now().date()
+    host_role = Role.objects.get_or_create(name='host')[0]
+
+    user_ids = block_ids(bases, User, block)
+    users = [
+        UserFactory.build(id=pk, username=f'user{pk}', email=f'user{pk}@example.com', password='!')
+        for pk in user_ids
+    ]
+    hosts, guests = users[:HOSTS_PER_BLOCK], users[HOSTS_PER_BLOCK:]
+    profiles = [
+        ProfileFactory.build(id=pk, user=user)
+        for pk, user in zip(block_ids(bases, Profile, block), users)
+    ]
+    guest_profiles = dict(zip(guests, profiles[HOSTS_PER_BLOCK:]))
+    city_weights = zipf_weights(cities, skew) if cities else None
+
+    addresses, stats, objects, listings, availabilities = [], [], [], [], []
+    rows = zip(
+        block_ids(bases, Address, block),
+        block_ids(bases, PropertyStats, block),
+        block_ids(bases, RealEstateObject, block),
+        block_ids(bases, RealEstateListing, block),
+        block_ids(bases, Availability, block)
+    )
+    for position, (address_id, stats_id, object_id, listing_id, availability_id) in enumerate(rows):
+        if city_weights:
+            city = f'City {rnd.choices(range(1, cities + 1), cum_weights=city_weights)[0]}'
+        else:
+            city = f'City {(listing_id - 1) // LISTINGS_PER_CITY + 1}'
+        address = AddressFactory.build(id=address_id, city=city)
+        stat = PropertyStatsFactory.build(id=stats_id)
+        obj = RealEstateObjectFactory.build(
+            id=object_id,
+            host=hosts[position // LISTINGS_PER_HOST],
+            address=address,
+            stats=stat
+        )
+        listing = RealEstateListingFactory.build(
+            id=listing_id,
+            real_estate_object=obj,
+            ranking_score=rnd.random()
+        )
+        addresses.append(address)
+        stats.append(stat)
+        objects.append(obj)
+        listings.append(listing)
+        availabilities.append(AvailabilityFactory.build(
+            id=availability_id,
+            listing=listing,
+            start_date=today + timedelta(days=1),
+            end_date=today + timedelta(days=365)
+        ))
+
+    # Популярность объявлений блока: случайный порядок рангов
+    hot_listings = rnd.sample(listings, len(listings))
+    hot_weights = zipf_weights(len(listings), skew)
+
+    bookings, reviews, ratings = [], [], []
+    review_ids = iter(block_ids(bases, PropertyReview, block))
+    rating_ids = iter(block_ids(bases, UserRating, block))
+    booked_days = {}
+    for position, booking_id in enumerate(block_ids(bases, Booking, block)):
+        start = None
+        while start is None:
+            # У занятого "горячего" объявления - другое объявление
+            listing = rnd.choices(hot_listings, cum_weights=hot_weights)[0]
+            nights = rnd.randint(1, 7)
+            start = free_stay(rnd, booked_days.setdefault(listing.id, set()), nights)
+        check_in = PAST_BOOKINGS_FROM + timedelta(days=start)
+        booking = Booking(
+            id=booking_id,
+            listing=listing,
+            guest=rnd.choice(guests),
+            check_in=check_in,
+            check_out=check_in + timedelta(days=nights),
+            price_per_night=listing.price_per_night,
+            currency=listing.currency,
+            total_price=listing.price_per_night * Decimal(nights),
+            cancellation_deadline=check_in - timedelta(days=listing.cancellation_days_before),
+            status='completed'
+        )
+        bookings.append(booking)
+        if position % 2 == 0:
+            reviews.append(PropertyReview(
+                id=next(review_ids),
+                booking=booking,
+                guest=booking.guest,
+                listing=listing,
+                rating=rnd.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 8, 12])[0],
+                comment=fake.sentence(),
+                is_approved=True,
+                moderated_at=timezone.now()
+            ))
+            profile = guest_profiles[booking.guest]
+            for category, _ in RATING_CATEGORIES:
+                rating = rnd.choices(['TOP', 'OK', 'POOR'], weights=[6, 3, 1])[0]
+                ratings.append(UserRating(
+                    id=next(rating_ids),
+                    booking=booking,
+                    rating_user=listing.real_estate_object.host,
+                    rated_user=booking.guest,
+                    category=category,
+                    rating=rating
+                ))
+                # Счётчики профиля сразу, как их ведёт Profile.apply_ratings
+                total_field, votes_field, value_field = Profile.rating_counter_fields(category, rating)
+                setattr(profile, total_field, getattr(profile, total_field) + RATING_SCORES[rating])
+                setattr(profile, votes_field, getattr(profile, votes_field) + 1)
+                setattr(profile, value_field, getattr(profile, value_field) + 1)
+
+    views = []
+    for view_id in block_ids(bases, ViewHistory, block):
+        viewed_on = today - timedelta(days=rnd.randrange(1, 30))
+        views.append(ViewHistory(
+            id=view_id,
+            user=rnd.choice(guests),
+            listing=rnd.choices(hot_listings, cum_weights=hot_weights)[0],
+            viewed_at=timezone.make_aware(datetime.combine(viewed_on, time(rnd.randrange(24))))
+        ))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        Profile.objects.bulk_create(profiles, batch_size=BATCH_SIZE)
+        Profile.roles.through.objects.bulk_create(
+            Profile.roles.through(profile_id=profile.id, role_id=host_role.id)
+            for profile in profiles[:HOSTS_PER_BLOCK]
+        )
+        Address.objects.bulk_create(addresses, batch_size=BATCH_SIZE)
+        PropertyStats.objects.bulk_create(stats, batch_size=BATCH_SIZE)
+        RealEstateObject.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        RealEstateListing.objects.bulk_create(listings, batch_size=BATCH_SIZE)
+        Availability.objects.bulk_create(availabilities, batch_size=BATCH_SIZE)
+        Booking.objects.bulk_create(bookings, batch_size=BATCH_SIZE)
+        PropertyReview.objects.bulk_create(reviews, batch_size=BATCH_SIZE)
+        UserRating.objects.bulk_create(ratings, batch_size=BATCH_SIZE)
+        ViewHistory.objects.bulk_create(views, batch_size=BATCH_SIZE)
+        ListingReviewStats.rebuild([listing.id for listing in listings])
+        HostSummary.rebuild([host.id for host in hosts])
+    return len(listings)
+
+
+def init_worker():
+    """Процесс пула: при spawn Django ещё не загружен"""
+    if not apps.ready:
+        django.setup()
+
+
+def grow(size, seed=42, progress=None, skew=0.0, cities=0, workers=1):
+    """
+    Дополняет каталог блоками до size опубликованных объявлений.
+    workers > 1 - блоки строятся в пуле процессов, каждый со своим
+    подключением к БД (на SQLite - последовательно).
+    """
+    existing = published_listings()
+    blocks = -(-max(size - existing, 0) // BLOCK)
+    bases = id_bases()
+    Role.objects.get_or_create(name='host')
+    build = partial(build_block, bases=bases, seed=seed, skew=skew, cities=cities)
+
+    # SQLite допускает одного писателя: параллельные транзакции упираются в блокировку
+    if workers > 1 and blocks > 1 and connections['default'].vendor != 'sqlite':
+        # Дочерние процессы не должны унаследовать открытые подключения родителя
+        connections.close_all()
+        with multiprocessing.Pool(min(workers, blocks), initializer=init_worker) as pool:
+            built = pool.imap_unordered(build, range(blocks))
+            for done, _ in enumerate(built, 1):
+                if progress:
+                    progress(existing + done * BLOCK)
+    else:
+        for block in range(blocks):
+            build(block)
+            if progress:
+                progress(existing + (block + 1) * BLOCK)
+    return published_listings()
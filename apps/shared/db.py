@@ -0,0 +1,78 @@
+from django.db import connections
+
+
+def bulk_increment(model, key_fields, count_fields, rows, using='default', batch_size=500,
+                   set_fields=()):
+    """
+    Пакетный upsert с прибавлением счётчиков (а не перезаписью):
+
+    MySQL:            INSERT ... ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+    SQLite/Postgres:  INSERT ... ON CONFLICT (key) DO UPDATE SET count = t.count + excluded.count
+
+    rows - {key_tuple: counts_tuple}. Операция аддитивна, поэтому несколько
+    процессов могут сбрасывать свои буферы одновременно без потери приращений.
+    Ключи сортируются, чтобы процессы блокировали строки в одном порядке
+    (меньше взаимоблокировок).
+
+    set_fields - поля, которые просто перезаписываются; их значения идут
+    в rows после счётчиков: {key_tuple: counts_tuple + values_tuple}.
+    """
+    if not rows:
+        return
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+    table = qn(opts.db_table)
+    key_columns = [qn(opts.get_field(name).column) for name in key_fields]
+    count_columns = [qn(opts.get_field(name).column) for name in count_fields]
+    set_columns = [qn(opts.get_field(name).column) for name in set_fields]
+    columns = ', '.join(key_columns + count_columns + set_columns)
+    row_placeholder = '(%s)' % ', '.join(
+        ['%s'] * (len(key_columns) + len(count_columns) + len(set_columns))
+    )
+
+    if connection.vendor == 'mysql':
+        conflict = 'ON DUPLICATE KEY UPDATE ' + ', '.join(
+            [f'{column} = {column} + VALUES({column})' for column in count_columns] +
+            [f'{column} = VALUES({column})' for column in set_columns]
+        )
+    else:
+        conflict = 'ON CONFLICT (%s) DO UPDATE SET %s' % (
+            ', '.join(key_columns),
+            ', '.join(
+                [f'{column} = {table}.{column} + excluded.{column}' for column in count_columns] +
+                [f'{column} = excluded.{column}' for column in set_columns]
+            )
+        )
+
+    items = sorted(rows.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            params = []
+            for key, counts in batch:
+                params.extend(key)
+                params.extend(counts)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES '
+                f'{", ".join([row_placeholder] * len(batch))} {conflict}',
+                params
+            )
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=1000):
+    """
+    bulk_create(update_conflicts=True) для всех бэкендов: MySQL не принимает
+    unique_fields (ON DUPLICATE KEY срабатывает по любому уникальному ключу).
+    """
+    manager = model._default_manager
+    if not connections[manager.db].features.supports_update_conflicts_with_target:
+        unique_fields = None
+    return manager.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields
+    )
@@ -0,0 +1,244 @@
+"""
+Метрики запросов в текстовом формате Prometheus (GET /metrics).
+
+RequestMetricsMiddleware измеряет для каждого запроса время ответа,
+число SQL-запросов и их суммарное время (connection.execute_wrapper
+на всех подключениях) и складывает их в гистограммы по маршруту.
+Если один и тот же SQL (Django передаёт значения параметрами, поэтому
+текст запроса и есть его "форма") повторился больше
+METRICS_N_PLUS_ONE_THRESHOLD раз, запрос считается вероятным N+1:
+счётчик по маршруту и предупреждение в лог (один раз на маршрут и SQL).
+
+Накладные расходы - сложение и счётчик на SQL-запрос и несколько
+сложений под блокировкой на HTTP-запрос. Метрики живут в памяти
+процесса: при нескольких воркерах каждый отдаёт свои, и для точных
+сумм Prometheus должен опрашивать воркеры по отдельности.
+Запросы к БД во время отдачи StreamingHttpResponse не учитываются.
+Под ASGI middleware работает асинхронно: обёртки ставятся на подключения
+потока, в котором асинхронный ORM выполняет запросы этого HTTP-запроса;
+запросы из отдельных потоков (apps/properties/async_views.py) не учитываются.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+MAX_REPORTED_SHAPES = 1000
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(labels, value) for labels, value in series)
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class CounterMetric(Metric):
+    kind = 'counter'
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def _render_series(self, labels, value):
+        return f'{self.name}{format_labels(labels)} {format_value(value)}'
+
+
+class HistogramMetric(Metric):
+    """Счётчики по корзинам хранятся без накопления, суммируются при выводе"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def _render_series(self, labels, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            le = bound if bound == '+Inf' else format_value(float(bound))
+            lines.append(f'{self.name}_bucket{format_labels(labels + (("le", le),))} {cumulative}')
+        lines.append(f'{self.name}_sum{format_labels(labels)} {format_value(total)}')
+        lines.append(f'{self.name}_count{format_labels(labels)} {cumulative}')
+        return '\n'.join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self.request_duration = HistogramMetric(
+            'http_request_duration_seconds',
+            'Time to build the response, by route.',
+            LATENCY_BUCKETS
+        )
+        self.query_count = HistogramMetric(
+            'db_queries_per_request',
+            'SQL queries executed per request, by route.',
+            QUERY_COUNT_BUCKETS
+        )
+        self.query_duration = HistogramMetric(
+            'db_query_duration_seconds_per_request',
+            'Total SQL time per request, by route.',
+            LATENCY_BUCKETS
+        )
+        self.n_plus_one = CounterMetric(
+            'db_n_plus_one_requests_total',
+            'Requests where one SQL statement repeated more than the N+1 threshold.'
+        )
+        self.metrics = [self.request_duration, self.query_count, self.query_duration, self.n_plus_one]
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+
+class QueryRecorder:
+    """execute_wrapper: число, время и повторы SQL в пределах одного HTTP-запроса"""
+    __slots__ = ('count', 'duration', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+
+def wrap_connections(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+def route_of(request):
+    """Имя маршрута (ограниченный набор значений), а не путь с id"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.METRICS_N_PLUS_ONE_THRESHOLD
+        self._reported = set()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            wrap_connections(stack, recorder)
+            response = self.get_response(request)
+        self.observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(wrap_connections)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, recorder, elapsed):
+        labels = (('method', request.method), ('route', route_of(request)))
+        registry.request_duration.observe(labels + (('status', f'{response.status_code // 100}xx'),), elapsed)
+        registry.query_count.observe(labels, recorder.count)
+        registry.query_duration.observe(labels, recorder.duration)
+
+        if recorder.count > self.threshold:
+            sql, repeats = recorder.statements.most_common(1)[0]
+            if repeats > self.threshold:
+                registry.n_plus_one.inc(labels)
+                self.report(labels, sql, repeats)
+
+    def report(self, labels, sql, repeats):
+        key = (labels, sql)
+        if key in self._reported or len(self._reported) >= MAX_REPORTED_SHAPES:
+            return
+        self._reported.add(key)
+        logger.warning('Possible N+1 in %s %s: %d x %s', labels[0][1], labels[1][1], repeats, sql[:500])
+
+
+def metrics_view(request):
+    """GET /metrics для Prometheus (доступ - METRICS_ALLOWED_IPS)"""
+    allowed = settings.METRICS_ALLOWED_IPS
+    if '*' not in allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,149 @@
+"""
+Очередь модерации (отзывы, объявления).
+
+Модератор "забирает" пачку элементов (claimed_by / claimed_at) и затем
+одобряет или отклоняет её одной транзакцией. Пачка забирается через
+SELECT ... FOR UPDATE SKIP LOCKED, поэтому модераторы, работающие
+одновременно, получают разные элементы и не ждут друг друга.
+"""
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import permissions, serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .permissions import IsModerator
+
+
+CLAIM_TTL = timedelta(minutes=15)     # после этого незавершённая пачка снова в очереди
+DEFAULT_BATCH_SIZE = 20
+
+
+def claimable(queryset, moderator, now):
+    """Элементы без решения, свободные или с просроченной (или своей) блокировкой"""
+    return queryset.filter(moderated_at__isnull=True).filter(
+        Q(claimed_by__isnull=True) |
+        Q(claimed_at__lt=now - CLAIM_TTL) |
+        Q(claimed_by=moderator)
+    )
+
+
+def claim_batch(queryset, moderator, size):
+    """Забирает до size элементов и возвращает их id"""
+    now = timezone.now()
+    model = queryset.model
+    # Без JOIN-ов, чтобы FOR UPDATE блокировал только строки очереди
+    candidates = claimable(queryset.select_related(None), moderator, now).order_by('id')
+
+    with transaction.atomic(using=queryset.db):
+        if connections[queryset.db].features.has_select_for_update_skip_locked:
+            ids = list(
+                candidates.select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:size]
+            )
+            model.objects.filter(id__in=ids).update(claimed_by=moderator, claimed_at=now)
+            return ids
+
+        # SQLite: SKIP LOCKED нет (и запись всё равно сериализована) -
+        # условный UPDATE, свои остаются только строки, которые мы обновили
+        ids = list(candidates.values_list('id', flat=True)[:size])
+        claimable(model.objects.filter(id__in=ids), moderator, now).update(
+            claimed_by=moderator,
+            claimed_at=now
+        )
+        return list(
+            model.objects.filter(id__in=ids, claimed_by=moderator, claimed_at=now)
+            .order_by('id').values_list('id', flat=True)
+        )
+
+
+def resolve_batch(model, moderator, approve_ids, reject_ids, extra_reject_fields=None):
+    """
+    Одобряет/отклоняет элементы, забранные этим модератором, одной транзакцией.
+    Возвращает (approved_ids, rejected_ids) - реально изменённые элементы.
+    """
+    now = timezone.now()
+    mine = model.objects.filter(moderated_at__isnull=True, claimed_by=moderator)
+    released = {'moderated_at': now, 'claimed_by': None, 'claimed_at': None}
+
+    with transaction.atomic():
+        approved = list(
+            mine.filter(id__in=approve_ids).order_by('id')
+            .select_for_update().values_list('id', flat=True)
+        )
+        rejected = list(
+            mine.filter(id__in=reject_ids).exclude(id__in=approved).order_by('id')
+            .select_for_update().values_list('id', flat=True)
+        )
+        if approved:
+            model.objects.filter(id__in=approved).update(is_approved=True, **released)
+        if rejected:
+            model.objects.filter(id__in=rejected).update(
+                is_approved=False,
+                **released,
+                **(extra_reject_fields or {})
+            )
+    return approved, rejected
+
+
+class ModerationDecisionSerializer(serializers.Serializer):
+    approve = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    reject = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class ModerationQueueViewSet(viewsets.GenericViewSet):
+    """
+    Базовая очередь модерации:
+    GET  .../          - моя текущая пачка
+    POST .../claim/    - забрать пачку (?size=20)
+    POST .../decide/   - {"approve": [...], "reject": [...], "notes": "..."}
+    """
+    permission_classes = [permissions.IsAuthenticated, IsModerator]
+    queue_model = None
+
+    def get_queue(self):
+        return self.queue_model.objects.all()
+
+    def get_queryset(self):
+        return self.get_queue().filter(
+            moderated_at__isnull=True,
+            claimed_by=self.request.user,
+            claimed_at__gte=timezone.now() - CLAIM_TTL
+        ).order_by('id')
+
+    def list(self, request):
+        return Response(self.get_serializer(self.get_queryset(), many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        try:
+            size = min(max(int(request.query_params.get('size', DEFAULT_BATCH_SIZE)), 1), 100)
+        except ValueError:
+            size = DEFAULT_BATCH_SIZE
+        ids = claim_batch(self.get_queue(), request.user, size)
+        items = self.get_queryset().filter(id__in=ids)
+        return Response(self.get_serializer(items, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def decide(self, request):
+        decision = ModerationDecisionSerializer(data=request.data)
+        decision.is_valid(raise_exception=True)
+        approved, rejected = resolve_batch(
+            self.queue_model,
+            request.user,
+            decision.validated_data['approve'],
+            decision.validated_data['reject'],
+            self.get_reject_fields(decision.validated_data)
+        )
+        self.on_resolved(approved, rejected)
+        return Response({'approved': approved, 'rejected': rejected})
+
+    def get_reject_fields(self, data):
+        return {}
+
+    def on_resolved(self, approved_ids, rejected_ids):
+        """Пакетные побочные эффекты после решения (переопределяется)"""
@@ -1,13 +1,36 @@
 from rest_framework import permissions
 
 
+def has_role(user, name):
+    """
+    Роли берутся из user.role_names, если их уже загрузила аутентификация
+    (ApiTokenAuthentication), иначе - запросом к профилю.
+    """
+    role_names = getattr(user, 'role_names', None)
+    if role_names is not None:
+        return name in role_names
+
+    # Проверяем наличие профиля
+    if not hasattr(user, 'profile'):
+        return False
+
+    return user.profile.roles.filter(name=name).exists()
+
+
 class IsHost(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
 
-        # Проверяем наличие профиля
-        if not hasattr(request.user, 'profile'):
+        return has_role(request.user, 'host')
+
+
+class IsModerator(permissions.BasePermission):
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
             return False
 
-        return request.user.profile.roles.filter(name='host').exists()
+        if request.user.is_staff:
+            return True
+
+        return has_role(request.user, 'moderator')
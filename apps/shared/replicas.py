@@ -0,0 +1,173 @@
+"""
+Чтение с реплик БД (DATABASE_REPLICAS) с прилипанием к основной базе.
+
+С реплик читают только GET/HEAD-запросы к представлениям с атрибутом
+read_from_replica (ViewSet - через ReplicaReadMixin: публичные
+объявления, детальная страница; асинхронные представления).
+Всё остальное - записи, бронирования (Booking.confirm), кабинет хоста,
+модерация, команды и воркеры вне запроса - работает с основной базой.
+
+Реплика отстаёт, поэтому:
+- после записи в запросе его чтения до конца тоже идут в основную базу;
+- после успешного POST/PUT/PATCH/DELETE пользователь REPLICA_PIN_SECONDS
+  читает только с основной базы (видит свои изменения). Пин хранится
+  в кэше по id пользователя (кэш должен быть общим, CACHE_URL) и
+  проверяется после аутентификации, поэтому работает и для клиентов
+  с токеном без cookie. Анонимные клиенты и клиенты с cookie получают
+  ещё и cookie PIN_COOKIE;
+- чтение внутри транзакции идёт в основную базу;
+- связанные объекты загружаются из той же базы, что и исходный объект.
+
+Локально реплику заменяет второй файл SQLite:
+    DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+PIN_COOKIE = 'primary_pin'
+
+
+@dataclass
+class RoutingState:
+    """Маршрутизация одного HTTP-запроса (общая для потоков sync_to_async)"""
+    replica_reads: bool = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def request_routing():
+    state = RoutingState()
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def read_from_replica(view):
+    """Декоратор функции-представления (для ViewSet - ReplicaReadMixin)"""
+    view.read_from_replica = True
+    return view
+
+
+def pin_key(user_id):
+    return f'primary_pin:{user_id}'
+
+
+def apply_user_pin(user):
+    """После аутентификации: недавно писавший пользователь читает с основной базы"""
+    state = _state.get()
+    if state is None or not state.replica_reads or not user.is_authenticated:
+        return
+    if cache.get(pin_key(user.pk)):
+        state.replica_reads = False
+
+
+class ReplicaReadMixin:
+    """ViewSet, читающий с реплик; пин пользователя проверяется сразу после аутентификации"""
+    read_from_replica = True
+
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+        apply_user_pin(request.user)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+
+        state = _state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            state is None or not state.replica_reads or not replicas or
+            connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.replica_reads = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика - копия основной базы
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приходит на реплики репликацией
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_routing():
+            response = self.get_response(request)
+        if self.is_write(request, response):
+            self.pin_user(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with request_routing():
+            response = await self.get_response(request)
+        if self.is_write(request, response):
+            # request.user может оказаться ленивым пользователем сессии (запрос к БД)
+            await sync_to_async(self.pin_user)(request)
+        return self.pin(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        view = getattr(view_func, 'cls', view_func)     # ViewSet.as_view() хранит класс в cls
+        state.replica_reads = (
+            getattr(view, 'read_from_replica', False) and
+            request.method in SAFE_METHODS and
+            PIN_COOKIE not in request.COOKIES
+        )
+
+    def is_write(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
+
+    def pin_user(self, request):
+        # DRF записывает пользователя (в том числе по токену) в request.user
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), 1, settings.REPLICA_PIN_SECONDS)
+
+    def pin(self, request, response):
+        if self.is_write(request, response):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
@@ -0,0 +1,104 @@
+"""
+Бюджеты SQL для тестов API.
+
+Budget - максимум запросов и суммарного времени SQL на один HTTP-запрос
+при каждом из размеров ответа sizes: одинаковый бюджет для 1 и 10
+элементов означает, что число запросов не растёт со страницей (нет N+1).
+QueryBudgetMixin.assertQueryBudget записывает SQL на всех подключениях
+и при превышении падает со списком запросов, чтобы лишний был виден
+сразу. Время умножается на QUERY_BUDGET_TIME_FACTOR (медленный CI).
+
+TestRunner (settings.TEST_RUNNER) после каждого теста очищает буферы
+записи (apps/shared/buffer.py): то, что тест накопил и не сбросил,
+не попадёт ни в следующий тест, ни в БД. Проверить запись - явным
+buffer.flush() в тесте.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import iter_test_cases
+
+from .buffer import discard_all
+
+
+DEFAULT_SQL_MS = 50.0
+
+
+@dataclass(frozen=True)
+class Budget:
+    queries: int
+    sql_ms: float = DEFAULT_SQL_MS
+    sizes: tuple = (1,)     # число элементов в ответе, при котором проверяется бюджет
+
+
+class QueryLog:
+    """execute_wrapper: SQL, параметры и время каждого запроса"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, (time.perf_counter() - start) * 1000))
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(ms for _, _, ms in self.queries)
+
+    def format(self):
+        return '\n'.join(
+            f'{number:3}. {ms:7.2f} ms  {sql}  {params}'
+            for number, (sql, params, ms) in enumerate(self.queries, 1)
+        )
+
+
+@contextmanager
+def capture_sql():
+    log = QueryLog()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
+
+
+def router_routes(router):
+    """(имя маршрута, HTTP-метод) всех записей роутера; HEAD повторяет GET"""
+    routes = set()
+    for url in router.urls:
+        actions = getattr(url.callback, 'actions', None) or {}
+        routes.update((url.name, method) for method in actions if method != 'head')
+    return routes
+
+
+class QueryBudgetMixin:
+    @contextmanager
+    def assertQueryBudget(self, budget, label=''):
+        with capture_sql() as log:
+            yield log
+
+        sql_ms = budget.sql_ms * settings.QUERY_BUDGET_TIME_FACTOR
+        problems = []
+        if len(log) > budget.queries:
+            problems.append(f'{len(log)} queries > budget {budget.queries}')
+        if log.total_ms > sql_ms:
+            problems.append(f'{log.total_ms:.1f} ms of SQL > budget {sql_ms:.1f} ms')
+        if problems:
+            self.fail(f"{label}: {', '.join(problems)}\n{log.format()}")
+
+
+class TestRunner(DiscoverRunner):
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        for test in iter_test_cases(suite):
+            test.addCleanup(discard_all)
+        return suite
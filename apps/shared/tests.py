@@ -0,0 +1,517 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bookings.factories import AvailabilityFactory, BookingFactory
+from apps.bookings.models import Booking
+from apps.properties.factories import AmenityFactory, RealEstateListingFactory, RealEstateObjectFactory
+from apps.properties.models import RealEstateListing
+from apps.reviews.factories import CompletedBookingFactory, PropertyReviewFactory
+from apps.search.factories import CoViewedListingFactory, RecentlyViewedFactory, TrendingListingFactory
+from apps.users.authentication import token_cache
+from apps.users.factories import ApiTokenFactory, HostFactory, UserFactory
+from apps.users.models import ApiToken
+from apps.search.suggest import suggestions
+from routers import router
+from . import dataset
+from .moderation import CLAIM_TTL, claim_batch, resolve_batch
+from .replicas import PIN_COOKIE, pin_key, request_routing
+from .testing import Budget, QueryBudgetMixin, router_routes
+
+
+LIST = (1, 10)      # списки: бюджет не зависит от числа элементов
+BATCH = (2, 10)     # решения модератора: одобрение и отклонение в одной пачке
+
+# Бюджет SQL каждого маршрута API (routers.py) на один запрос.
+# Пользователь уже аутентифицирован (force_authenticate), кэш пуст.
+BUDGETS = {
+    ('real-estate-object-list', 'get'): Budget(1, sizes=LIST),
+    ('real-estate-object-list', 'post'): Budget(10),
+    ('real-estate-object-detail', 'get'): Budget(3),
+    ('real-estate-object-detail', 'put'): Budget(10),
+    ('real-estate-object-detail', 'patch'): Budget(4),
+    ('real-estate-object-detail', 'delete'): Budget(5),
+    ('public-listings-list', 'get'): Budget(1, sizes=LIST),
+    ('public-listings-recently-viewed', 'get'): Budget(3, sizes=LIST),
+    ('public-listings-trending', 'get'): Budget(1, sizes=LIST),
+    ('public-listings-detail', 'get'): Budget(1),
+    ('listing-detail-list', 'get'): Budget(4, sizes=LIST),
+    ('listing-detail-detail', 'get'): Budget(4),
+    ('listing-detail-also-viewed', 'get'): Budget(1, sizes=LIST),
+    ('listing-detail-ical', 'get'): Budget(2),
+    ('listing-detail-similar', 'get'): Budget(1),
+    ('host-listings-list', 'get'): Budget(2, sizes=LIST),
+    ('host-listings-list', 'post'): Budget(7),
+    ('host-listings-detail', 'get'): Budget(5),
+    ('host-listings-detail', 'put'): Budget(8),
+    ('host-listings-detail', 'patch'): Budget(7),
+    ('host-listings-detail', 'delete'): Budget(16),
+    ('host-listings-views', 'get'): Budget(4),
+    ('listing-reviews-list', 'get'): Budget(2, sizes=LIST),
+    ('moderation-listings-list', 'get'): Budget(1, sizes=LIST),
+    ('moderation-listings-claim', 'post'): Budget(6, sizes=LIST),
+    ('moderation-listings-decide', 'post'): Budget(11, sizes=BATCH),
+    ('moderation-reviews-list', 'get'): Budget(1, sizes=LIST),
+    ('moderation-reviews-claim', 'post'): Budget(6, sizes=LIST),
+    ('moderation-reviews-decide', 'post'): Budget(14, sizes=BATCH),
+    ('search-suggest-list', 'get'): Budget(0),
+    ('api-tokens-list', 'get'): Budget(1, sizes=LIST),
+    ('api-tokens-list', 'post'): Budget(1),
+    ('api-tokens-detail', 'delete'): Budget(2),
+}
+
+
+class ApiQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Каждый маршрут выполняется при каждом размере из бюджета.
+    scenario_<маршрут>_<метод>(size) готовит данные и возвращает запрос.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = HostFactory()
+        cls.guest = UserFactory()
+        cls.moderator = UserFactory(is_staff=True)
+        cls.amenity = AmenityFactory()
+        cls.listing = RealEstateListingFactory(real_estate_object__host=cls.host)
+
+    def test_every_route_has_budget(self):
+        self.assertEqual(router_routes(router), set(BUDGETS))
+
+    def test_routes_within_budget(self):
+        for (route, method), budget in sorted(BUDGETS.items()):
+            scenario = getattr(self, f"scenario_{route.replace('-', '_')}_{method}")
+            for size in budget.sizes:
+                with self.subTest(route=route, method=method, size=size):
+                    self.run_scenario(scenario, budget, f'{method.upper()} {route} x{size}', size)
+
+    def run_scenario(self, scenario, budget, label, size):
+        savepoint = transaction.savepoint()
+        try:
+            send = scenario(size)
+            cache.clear()
+            with self.assertQueryBudget(budget, label):
+                response = send()
+            self.assertLess(response.status_code, 400, f'{label}: {getattr(response, "data", "")}')
+        finally:
+            transaction.savepoint_rollback(savepoint)
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def listings(self, size, **kwargs):
+        return RealEstateListingFactory.create_batch(size, real_estate_object__host=self.host, **kwargs)
+
+    # ---------- Объекты недвижимости ----------
+    def object_payload(self):
+        return {
+            'title': 'Loft',
+            'description': 'Near the park',
+            'property_type': 'apartment',
+            'address': {'country': 'Germany', 'city': 'Berlin', 'street': 'Main', 'house_number': '1'},
+            'stats': {'rooms': 2, 'bathrooms': 1, 'max_guests': 4},
+            'amenities': [self.amenity.id],
+        }
+
+    def scenario_real_estate_object_list_get(self, size):
+        RealEstateObjectFactory.create_batch(size - 1, host=self.host)
+        return lambda: self.client_for(self.host).get('/api/v1/objects/')
+
+    def scenario_real_estate_object_list_post(self, size):
+        return lambda: self.client_for(self.host).post('/api/v1/objects/', self.object_payload(), format='json')
+
+    def scenario_real_estate_object_detail_get(self, size):
+        url = f'/api/v1/objects/{self.listing.real_estate_object_id}/'
+        return lambda: self.client_for(self.host).get(url)
+
+    def scenario_real_estate_object_detail_put(self, size):
+        url = f'/api/v1/objects/{self.listing.real_estate_object_id}/'
+        return lambda: self.client_for(self.host).put(url, self.object_payload(), format='json')
+
+    def scenario_real_estate_object_detail_patch(self, size):
+        url = f'/api/v1/objects/{self.listing.real_estate_object_id}/'
+        return lambda: self.client_for(self.host).patch(url, {'title': 'Renamed'}, format='json')
+
+    def scenario_real_estate_object_detail_delete(self, size):
+        obj = RealEstateObjectFactory(host=self.host)
+        return lambda: self.client_for(self.host).delete(f'/api/v1/objects/{obj.id}/')
+
+    # ---------- Публичные объявления ----------
+    def scenario_public_listings_list_get(self, size):
+        listings = self.listings(size, real_estate_object__address__city='Budgetville')
+        listings[0].real_estate_object.amenities.set([self.amenity])
+        return lambda: self.client_for().get(
+            '/api/v1/listings/', {'real_estate_object__address__city': 'Budgetville'}
+        )
+
+    def scenario_public_listings_recently_viewed_get(self, size):
+        listings = self.listings(size)
+        RecentlyViewedFactory(user=self.guest, listing_ids=[listing.id for listing in listings])
+        return lambda: self.client_for(self.guest).get('/api/v1/listings/recently-viewed/')
+
+    def scenario_public_listings_trending_get(self, size):
+        for listing in self.listings(size, real_estate_object__address__city='Budgetville'):
+            TrendingListingFactory(listing=listing)
+        return lambda: self.client_for().get('/api/v1/listings/trending/', {'city': 'Budgetville'})
+
+    def scenario_public_listings_detail_get(self, size):
+        return lambda: self.client_for().get(f'/api/v1/listings/{self.listing.id}/')
+
+    # ---------- Детальная страница объявления ----------
+    def scenario_listing_detail_list_get(self, size):
+        for listing in self.listings(size - 1):
+            PropertyReviewFactory(booking=CompletedBookingFactory(listing=listing, guest=self.guest))
+        return lambda: self.client_for().get('/api/v1/listing/')
+
+    def scenario_listing_detail_detail_get(self, size):
+        PropertyReviewFactory(booking=CompletedBookingFactory(listing=self.listing, guest=self.guest))
+        return lambda: self.client_for().get(f'/api/v1/listing/{self.listing.id}/')
+
+    def scenario_listing_detail_also_viewed_get(self, size):
+        for listing in self.listings(size):
+            CoViewedListingFactory(listing=self.listing, related=listing)
+        return lambda: self.client_for().get(f'/api/v1/listing/{self.listing.id}/also-viewed/')
+
+    def scenario_listing_detail_ical_get(self, size):
+        AvailabilityFactory(listing=self.listing)
+        return lambda: self.client_for().get(f'/api/v1/listing/{self.listing.id}/ical/')
+
+    def scenario_listing_detail_similar_get(self, size):
+        return lambda: self.client_for().get(f'/api/v1/listing/{self.listing.id}/similar/')
+
+    # ---------- Объявления хоста ----------
+    def scenario_host_listings_list_get(self, size):
+        self.listings(size - 1)
+        return lambda: self.client_for(self.host).get('/api/v1/host-listings/')
+
+    def listing_payload(self, real_estate_object_id):
+        return {
+            'real_estate_object': real_estate_object_id,
+            'price_per_night': '120.00',
+            'currency': 'EUR',
+            'minimum_stay': 2,
+            'is_active': True,
+        }
+
+    def scenario_host_listings_list_post(self, size):
+        obj = RealEstateObjectFactory(host=self.host)
+        payload = self.listing_payload(obj.id)
+        return lambda: self.client_for(self.host).post('/api/v1/host-listings/', payload, format='json')
+
+    def scenario_host_listings_detail_get(self, size):
+        return lambda: self.client_for(self.host).get(f'/api/v1/host-listings/{self.listing.id}/')
+
+    def scenario_host_listings_detail_put(self, size):
+        payload = self.listing_payload(self.listing.real_estate_object_id)
+        url = f'/api/v1/host-listings/{self.listing.id}/'
+        return lambda: self.client_for(self.host).put(url, payload, format='json')
+
+    def scenario_host_listings_detail_patch(self, size):
+        url = f'/api/v1/host-listings/{self.listing.id}/'
+        return lambda: self.client_for(self.host).patch(url, {'promo_title': 'Sale'}, format='json')
+
+    def scenario_host_listings_detail_delete(self, size):
+        listing = self.listings(1)[0]
+        return lambda: self.client_for(self.host).delete(f'/api/v1/host-listings/{listing.id}/')
+
+    def scenario_host_listings_views_get(self, size):
+        return lambda: self.client_for(self.host).get(f'/api/v1/host-listings/{self.listing.id}/views/')
+
+    # ---------- Отзывы ----------
+    def scenario_listing_reviews_list_get(self, size):
+        for _ in range(size):
+            PropertyReviewFactory(booking=CompletedBookingFactory(listing=self.listing, guest=self.guest))
+        return lambda: self.client_for().get(f'/api/v1/listing/{self.listing.id}/reviews/')
+
+    # ---------- Модерация ----------
+    def pending_listings(self, size, **kwargs):
+        return self.listings(size, is_approved=False, **kwargs)
+
+    def pending_reviews(self, size, **kwargs):
+        return [
+            PropertyReviewFactory(
+                booking=CompletedBookingFactory(listing=self.listing, guest=self.guest),
+                is_approved=False,
+                **kwargs
+            )
+            for _ in range(size)
+        ]
+
+    def scenario_moderation_listings_list_get(self, size):
+        self.pending_listings(size, claimed_by=self.moderator, claimed_at=timezone.now())
+        return lambda: self.client_for(self.moderator).get('/api/v1/moderation/listings/')
+
+    def scenario_moderation_listings_claim_post(self, size):
+        self.pending_listings(size)
+        return lambda: self.client_for(self.moderator).post('/api/v1/moderation/listings/claim/')
+
+    def scenario_moderation_listings_decide_post(self, size):
+        ids = [
+            listing.id for listing in
+            self.pending_listings(size, claimed_by=self.moderator, claimed_at=timezone.now())
+        ]
+        decision = {'approve': ids[::2], 'reject': ids[1::2], 'notes': 'Blurry photos'}
+        return lambda: self.client_for(self.moderator).post(
+            '/api/v1/moderation/listings/decide/', decision, format='json'
+        )
+
+    def scenario_moderation_reviews_list_get(self, size):
+        self.pending_reviews(size, claimed_by=self.moderator, claimed_at=timezone.now())
+        return lambda: self.client_for(self.moderator).get('/api/v1/moderation/reviews/')
+
+    def scenario_moderation_reviews_claim_post(self, size):
+        self.pending_reviews(size)
+        return lambda: self.client_for(self.moderator).post('/api/v1/moderation/reviews/claim/')
+
+    def scenario_moderation_reviews_decide_post(self, size):
+        ids = [
+            review.id for review in
+            self.pending_reviews(size, claimed_by=self.moderator, claimed_at=timezone.now())
+        ]
+        decision = {'approve': ids[::2], 'reject': ids[1::2]}
+        return lambda: self.client_for(self.moderator).post(
+            '/api/v1/moderation/reviews/decide/', decision, format='json'
+        )
+
+    # ---------- Поиск и токены ----------
+    def scenario_search_suggest_list_get(self, size):
+        suggestions.lookup('')     # индекс строится при первом обращении к процессу
+        return lambda: self.client_for().get('/api/v1/search/suggest/', {'q': 'ber'})
+
+    def scenario_api_tokens_list_get(self, size):
+        ApiTokenFactory.create_batch(size, user=self.guest)
+        return lambda: self.client_for(self.guest).get('/api/v1/auth/tokens/')
+
+    def scenario_api_tokens_list_post(self, size):
+        return lambda: self.client_for(self.guest).post(
+            '/api/v1/auth/tokens/', {'name': 'CI', 'expires_in_days': 30}, format='json'
+        )
+
+    def scenario_api_tokens_detail_delete(self, size):
+        token = ApiTokenFactory(user=self.guest, expires_at=timezone.now() + timedelta(days=1))
+        return lambda: self.client_for(self.guest).delete(f'/api/v1/auth/tokens/{token.id}/')
+
+
+
+def pending_listings(count, **kwargs):
+    return RealEstateListingFactory.create_batch(count, is_approved=False, **kwargs)
+
+
+class ModerationQueueTests(TestCase):
+    def setUp(self):
+        self.first, self.second = UserFactory(is_staff=True), UserFactory(is_staff=True)
+        self.queue = RealEstateListing.objects.all()
+
+    def test_moderators_claim_disjoint_batches(self):
+        listings = pending_listings(5)
+
+        first = claim_batch(self.queue, self.first, 3)
+        second = claim_batch(self.queue, self.second, 3)
+
+        self.assertEqual(first, [listing.id for listing in listings[:3]])
+        self.assertEqual(second, [listing.id for listing in listings[3:]])
+
+    def test_own_claim_is_returned_again(self):
+        pending_listings(2)
+        first = claim_batch(self.queue, self.first, 2)
+
+        self.assertEqual(claim_batch(self.queue, self.first, 2), first)
+        self.assertEqual(claim_batch(self.queue, self.second, 2), [])
+
+    def test_expired_claim_returns_to_queue(self):
+        [listing] = pending_listings(1, claimed_by=self.first, claimed_at=timezone.now() - CLAIM_TTL * 2)
+
+        self.assertEqual(claim_batch(self.queue, self.second, 5), [listing.id])
+
+    def test_only_own_claimed_items_are_resolved(self):
+        mine = pending_listings(2)
+        claim_batch(self.queue, self.first, 2)
+        other = pending_listings(1)
+        claim_batch(self.queue, self.second, 1)
+
+        approved, rejected = resolve_batch(
+            RealEstateListing, self.first, [mine[0].id, other[0].id], [mine[1].id]
+        )
+
+        self.assertEqual((approved, rejected), ([mine[0].id], [mine[1].id]))
+        self.assertTrue(RealEstateListing.objects.get(pk=mine[0].pk).is_approved)
+        self.assertIsNone(RealEstateListing.objects.get(pk=other[0].pk).moderated_at)
+        self.assertEqual(claim_batch(self.queue, self.first, 5), [])
+
+
+class ConcurrentModerationClaimTests(TransactionTestCase):
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_concurrent_claims_do_not_overlap(self):
+        listings = pending_listings(40)
+        moderators = [UserFactory(is_staff=True) for _ in range(4)]
+        barrier = threading.Barrier(len(moderators))
+        claimed = {}
+
+        def claim(moderator):
+            try:
+                barrier.wait()
+                claimed[moderator.id] = claim_batch(RealEstateListing.objects.all(), moderator, 10)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim, args=(moderator,)) for moderator in moderators]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        ids = [pk for batch in claimed.values() for pk in batch]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {listing.id for listing in listings})
+
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Основная база - тестовая default, реплика - отдельный файл SQLite"""
+    databases = {DEFAULT_DB_ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика подключается здесь: тестовые базы и проверки раннера её не касаются
+        descriptor, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        connections.settings[REPLICA] = {
+            **connections.settings[DEFAULT_DB_ALIAS],
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+            'OPTIONS': {},
+        }
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        os.remove(cls.replica_path)
+        cls.databases = {DEFAULT_DB_ALIAS}
+
+    def setUp(self):
+        # Миграции на реплику не идут (ReplicaRouter.allow_migrate) - схема вручную
+        with connections[REPLICA].schema_editor() as editor:
+            for model in self.models():
+                editor.create_model(model)
+        self.addCleanup(self.drop_replica_schema)
+
+    def drop_replica_schema(self):
+        with connections[REPLICA].schema_editor() as editor:
+            for model in self.models():
+                editor.delete_model(model)
+
+    @staticmethod
+    def models():
+        return [model for model in apps.get_models() if model._meta.managed and not model._meta.proxy]
+
+    def replicate(self):
+        """Реплика догнала основную базу"""
+        with transaction.atomic(using=REPLICA):
+            for model in apps.get_models(include_auto_created=True):
+                if model._meta.managed and not model._meta.proxy:
+                    model._base_manager.using(REPLICA).bulk_create(model._base_manager.all())
+
+    def promo_titles(self, response):
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        results = data['results'] if isinstance(data, dict) and 'results' in data else data
+        if isinstance(results, dict):
+            results = [results]
+        return [item['promo_title'] for item in results]
+
+    def test_public_reads_use_replica_until_client_writes(self):
+        listing = RealEstateListingFactory(promo_title='Replicated')
+        self.replicate()
+        RealEstateListing.objects.filter(pk=listing.pk).update(promo_title='Primary only')
+
+        guest = APIClient()
+        self.assertEqual(self.promo_titles(guest.get('/api/v1/listings/')), ['Replicated'])
+        self.assertEqual(self.promo_titles(guest.get(f'/api/v1/listing/{listing.id}/')), ['Replicated'])
+        self.assertEqual(self.promo_titles(guest.get('/api/v1/async/listings/')), ['Replicated'])
+
+        # Кабинет хоста - всегда основная база; после записи хост видит свои изменения
+        host = APIClient()
+        host.force_authenticate(listing.real_estate_object.host)
+        url = f'/api/v1/host-listings/{listing.id}/'
+        self.assertEqual(self.promo_titles(host.get(url)), ['Primary only'])
+        response = host.patch(url, {'promo_title': 'Sale'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.promo_titles(host.get('/api/v1/listings/')), ['Sale'])
+
+        # Срок пина истёк - снова реплика
+        del host.cookies[PIN_COOKIE]
+        cache.delete(pin_key(listing.real_estate_object.host_id))
+        self.assertEqual(self.promo_titles(host.get('/api/v1/listings/')), ['Replicated'])
+
+    def test_token_client_without_cookies_is_pinned_by_user(self):
+        listing = RealEstateListingFactory(promo_title='Replicated')
+        _, key = ApiToken.issue(listing.real_estate_object.host)
+        self.replicate()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        cache.clear()
+
+        def client():
+            # Новый клиент на каждый запрос: cookie не сохраняются
+            api = APIClient()
+            api.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+            return api
+
+        self.assertEqual(self.promo_titles(client().get('/api/v1/listings/')), ['Replicated'])
+        response = client().patch(f'/api/v1/host-listings/{listing.id}/', {'promo_title': 'Sale'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.promo_titles(client().get('/api/v1/listings/')), ['Sale'])
+        self.assertEqual(self.promo_titles(client().get(f'/api/v1/listing/{listing.id}/')), ['Sale'])
+        self.assertEqual(self.promo_titles(client().get('/api/v1/async/listings/')), ['Sale'])
+        # Анонимный клиент по-прежнему читает реплику
+        self.assertEqual(self.promo_titles(APIClient().get('/api/v1/listings/')), ['Replicated'])
+
+    def test_booking_confirm_uses_primary(self):
+        listing = RealEstateListingFactory()
+        self.replicate()
+        AvailabilityFactory(listing=listing)
+        booking = BookingFactory(listing=listing)
+
+        with request_routing() as state:
+            state.replica_reads = True
+            self.assertFalse(Booking.objects.filter(pk=booking.pk).exists())
+
+            confirmed, message = booking.confirm()
+            self.assertTrue(confirmed, message)
+            self.assertFalse(state.replica_reads)
+        self.assertEqual(Booking.objects.get(pk=booking.pk).status, 'confirmed')
+
+
+class DatasetTests(TestCase):
+    def test_completed_bookings_of_listing_do_not_overlap(self):
+        # Сильный перекос: "горячим" объявлениям достаётся большая часть броней
+        self.assertEqual(dataset.grow(dataset.BLOCK, skew=1.5), dataset.BLOCK)
+
+        bookings = Booking.objects.order_by('listing_id', 'check_in').values_list('listing_id', 'check_in', 'check_out')
+        self.assertEqual(len(bookings), dataset.PAST_BOOKINGS_PER_BLOCK)
+        previous_listing, previous_check_out = None, None
+        for listing_id, check_in, check_out in bookings:
+            if listing_id == previous_listing:
+                self.assertGreaterEqual(check_in, previous_check_out)
+            previous_listing, previous_check_out = listing_id, check_out
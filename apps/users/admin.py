@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Profile, Role
+from .models import User, Profile, Role, ApiToken, HostSummary, AccountPurge
 
 
 @admin.register(User)
@@ -14,6 +14,28 @@ class ProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'phone', 'created_at']
 
 
+@admin.register(HostSummary)
+class HostSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'listings_count', 'reviews_count', 'booking_requests', 'bookings_answered', 'updated_at']
+    search_fields = ['user__email', 'user__username']
+    raw_id_fields = ['user']
+
+
 @admin.register(Role)
 class RoleAdmin(admin.ModelAdmin):
     list_display = ['name', 'description']
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ['user', 'name', 'key_prefix', 'created_at', 'expires_at', 'revoked_at']
+    search_fields = ['user__email', 'user__username', 'key_prefix']
+    readonly_fields = ['key_prefix', 'key_hash', 'created_at']
+    raw_id_fields = ['user']
+
+
+@admin.register(AccountPurge)
+class AccountPurgeAdmin(admin.ModelAdmin):
+    list_display = ['user_id', 'mode', 'step', 'last_id', 'processed', 'started_at', 'finished_at']
+    list_filter = ['mode']
+    search_fields = ['user_id']
@@ -0,0 +1,143 @@
+"""
+Аутентификация по API-токену: "Authorization: Token <key>".
+
+Проверенные токены кэшируются в памяти процесса на API_TOKEN_CACHE_SECONDS:
+hash ключа -> (значения полей пользователя и профиля, роли, срок).
+Повторные запросы не ходят в БД вовсе; каждый получает новый объект
+пользователя, поэтому изменения одного запроса не видны другим.
+Отозванный токен перестаёт работать в этом процессе сразу, в остальных -
+не позже, чем через API_TOKEN_CACHE_SECONDS.
+"""
+import copy
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import ApiToken, Profile, User
+
+
+class TokenCache:
+    def __init__(self, max_size=10_000):
+        self.max_size = max_size
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key_hash):
+        item = self._items.get(key_hash)
+        if item is None:
+            return None
+        value, valid_until = item
+        if valid_until < time.monotonic():
+            self.discard(key_hash)
+            return None
+        return value
+
+    def set(self, key_hash, value, ttl):
+        with self._lock:
+            if len(self._items) >= self.max_size:
+                self._items.clear()     # редкий случай; проще, чем LRU
+            self._items[key_hash] = (value, time.monotonic() + ttl)
+
+    def discard(self, key_hash):
+        with self._lock:
+            self._items.pop(key_hash, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+token_cache = TokenCache()
+
+
+def field_values(instance):
+    return copy.deepcopy(tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields))
+
+
+def from_values(model, values):
+    # deepcopy: изменяемые значения полей тоже не общие между запросами
+    return model.from_db(
+        DEFAULT_DB_ALIAS,
+        [field.attname for field in model._meta.concrete_fields],
+        copy.deepcopy(values)
+    )
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    user: tuple
+    profile: tuple | None
+    role_names: frozenset
+
+    @classmethod
+    def of(cls, user):
+        profile = getattr(user, 'profile', None)
+        return cls(
+            field_values(user),
+            field_values(profile) if profile is not None else None,
+            user.role_names
+        )
+
+    def build(self):
+        user = from_values(User, self.user)
+        if self.profile is not None:
+            user.profile = from_values(Profile, self.profile)
+        user.role_names = self.role_names
+        return user
+
+
+class ApiTokenAuthentication(BaseAuthentication):
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        return self.authenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        key_hash = ApiToken.hash_key(key)
+        cached = token_cache.get(key_hash)
+        if cached is None:
+            user, expires_in = self.load_user(key_hash)
+            token_cache.set(key_hash, CachedUser.of(user), min(settings.API_TOKEN_CACHE_SECONDS, expires_in))
+            return user, key_hash
+        return cached.build(), key_hash
+
+    def load_user(self, key_hash):
+        """
+        Токен + пользователь + профиль одним запросом, роли - вторым.
+        Возвращает (user, сколько секунд токен ещё действует).
+        """
+        now = timezone.now()
+        token = ApiToken.objects.select_related('user__profile').filter(
+            key_hash=key_hash,
+            revoked_at__isnull=True
+        ).first()
+        if token is None or (token.expires_at is not None and token.expires_at <= now):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        user = token.user
+        if not user.is_active or user.deleted:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        # Роли для IsHost / IsModerator без запросов (см. apps/shared/permissions.py)
+        user.role_names = frozenset(
+            user.profile.roles.values_list('name', flat=True)
+        ) if hasattr(user, 'profile') else frozenset()
+        expires_in = (token.expires_at - now).total_seconds() if token.expires_at else float('inf')
+        return user, expires_in
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,87 @@
+"""
+Фабрики factory_boy для тестов и бенчмарков.
+
+Пароль по умолчанию непригодный: хэширование PBKDF2 на каждого
+пользователя сделало бы большие наборы данных очень медленными.
+Нужен вход по паролю - UserFactory(password='...').
+"""
+import hashlib
+import secrets
+
+import factory
+from factory.django import DjangoModelFactory
+
+from .models import AccountPurge, ApiToken, HostSummary, Profile, Role, User
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = User
+        skip_postgeneration_save = True
+
+    username = factory.Sequence(lambda n: f'user{n}')
+    email = factory.LazyAttribute(lambda o: f'{o.username}@example.com')
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+
+    @classmethod
+    def _create(cls, model_class, *args, password=None, **kwargs):
+        user = model_class(*args, **kwargs)
+        user.set_password(password)     # None - непригодный пароль
+        user.save()
+        return user
+
+
+class RoleFactory(DjangoModelFactory):
+    class Meta:
+        model = Role
+        django_get_or_create = ['name']
+
+    name = 'host'
+    description = factory.Faker('sentence')
+
+
+class ProfileFactory(DjangoModelFactory):
+    class Meta:
+        model = Profile
+        skip_postgeneration_save = True
+
+    user = factory.SubFactory(UserFactory)
+    bio = factory.Faker('paragraph')
+
+    @factory.post_generation
+    def roles(self, create, extracted, **kwargs):
+        """ProfileFactory(roles=['host'])"""
+        if create and extracted:
+            self.roles.add(*(RoleFactory(name=name) for name in extracted))
+
+
+class HostFactory(UserFactory):
+    """Пользователь с профилем и ролью host"""
+    profile = factory.RelatedFactory(ProfileFactory, factory_related_name='user', roles=['host'])
+
+
+class HostSummaryFactory(DjangoModelFactory):
+    class Meta:
+        model = HostSummary
+
+    user = factory.SubFactory(UserFactory)
+
+
+class ApiTokenFactory(DjangoModelFactory):
+    """Токен со случайным ключом; если ключ нужен для запросов - ApiToken.issue()"""
+    class Meta:
+        model = ApiToken
+
+    user = factory.SubFactory(UserFactory)
+    name = factory.Faker('word')
+    key_prefix = factory.LazyFunction(lambda: secrets.token_urlsafe(6)[:8])
+    key_hash = factory.LazyFunction(lambda: hashlib.sha256(secrets.token_bytes(32)).hexdigest())
+
+
+class AccountPurgeFactory(DjangoModelFactory):
+    class Meta:
+        model = AccountPurge
+
+    user_id = factory.Sequence(lambda n: 1_000_000 + n)
+    mode = 'delete'
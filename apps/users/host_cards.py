@@ -0,0 +1,76 @@
+"""
+Публичная карточка хоста (объявление, объект недвижимости).
+
+Карточка собирается из User, Profile и HostSummary одним запросом
+и хранится в кэше HOST_CARD_CACHE_SECONDS, поэтому сериализаторы
+не загружают хоста и профиль и не форматируют даты на каждый ответ.
+Кэш сбрасывается при пересчёте HostSummary (refresh_hosts) и при
+изменении оценок профиля. Сброс часто идёт из воркера outbox, поэтому
+с несколькими процессами кэш должен быть общим (CACHE_URL); с кэшем
+в памяти процесса веб-воркеры видят старую карточку до истечения
+HOST_CARD_CACHE_SECONDS.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import HostSummary, User
+
+
+def cache_key(host_id):
+    return f'host_card:{host_id}'
+
+
+def build_card(host):
+    profile = getattr(host, 'profile', None)
+    summary = getattr(host, 'host_summary', None)
+    return {
+        'id': host.id,
+        'username': host.username,
+        'name': f"{host.first_name or ''} {host.last_name or ''}".strip() or None,
+        'member_since': host.date_joined.strftime('%B %Y'),
+        # Средние баллы 0-100 из счётчиков профиля (None - оценок ещё нет)
+        'ratings': {
+            'satisfaction': profile.rating_average('satisfaction'),
+            'friendliness': profile.rating_average('friendliness'),
+            'reliability': profile.rating_average('reliability'),
+        } if profile else None,
+        'listings_count': summary.listings_count if summary else 0,
+        'reviews_count': summary.reviews_count if summary else 0,
+        'rating_avg': summary.rating_avg if summary else None,
+        'response_rate': summary.response_rate if summary else None,
+        'acceptance_rate': summary.acceptance_rate if summary else None,
+    }
+
+
+def get_host_cards(host_ids):
+    """{host_id: карточка}; промахи кэша - одним запросом"""
+    host_ids = set(host_ids)
+    cached = cache.get_many([cache_key(host_id) for host_id in host_ids])
+    cards = {card['id']: card for card in cached.values()}
+
+    missing = host_ids - cards.keys()
+    if missing:
+        hosts = User.objects.filter(id__in=missing).select_related('profile', 'host_summary')
+        built = {host.id: build_card(host) for host in hosts}
+        cache.set_many(
+            {cache_key(host_id): card for host_id, card in built.items()},
+            settings.HOST_CARD_CACHE_SECONDS
+        )
+        cards.update(built)
+    return cards
+
+
+def get_host_card(host_id):
+    return get_host_cards([host_id]).get(host_id)
+
+
+def invalidate_host_cards(host_ids):
+    cache.delete_many([cache_key(host_id) for host_id in host_ids])
+
+
+def refresh_hosts(host_ids):
+    """Пересчитывает HostSummary хостов и сбрасывает их карточки"""
+    host_ids = sorted(set(host_ids))
+    if host_ids:
+        HostSummary.rebuild(host_ids)
+        invalidate_host_cards(host_ids)
@@ -0,0 +1,76 @@
+import base64
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import permissions
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from apps.users.authentication import ApiTokenAuthentication, token_cache
+from apps.users.models import ApiToken, User
+
+
+class PingView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({'ok': True})
+
+
+class Command(BaseCommand):
+    """
+    Запросов в секунду на одно ядро (один поток) для маленького эндпоинта
+    при Basic-аутентификации (PBKDF2 на каждый запрос) и по API-токену
+    (без кэша и с кэшем). Временный пользователь создаётся в транзакции,
+    которая откатывается.
+
+    python manage.py bench_auth --seconds 3
+    """
+    help = 'Benchmark requests per core: Basic auth vs API token auth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email='bench-auth@example.com',
+                username='bench-auth',
+                password='bench-password'
+            )
+            _, key = ApiToken.issue(user, name='bench')
+            basic = 'Basic ' + base64.b64encode(b'bench-auth@example.com:bench-password').decode()
+
+            runs = [
+                ('basic', [BasicAuthentication], basic, None),
+                ('token, no cache', [ApiTokenAuthentication], f'Token {key}', token_cache.clear),
+                ('token, cached', [ApiTokenAuthentication], f'Token {key}', None),
+            ]
+            results = {}
+            for name, classes, header, before_each in runs:
+                view = PingView.as_view(authentication_classes=classes)
+                results[name] = self.measure(
+                    view, factory, header, before_each, options['seconds']
+                )
+                self.stdout.write(f'{name:16} {results[name]:10.1f} req/s per core')
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"token (cached) vs basic: x{results['token, cached'] / results['basic']:.0f}"
+        ))
+
+    def measure(self, view, factory, header, before_each, seconds):
+        requests = 0
+        deadline = time.perf_counter() + seconds
+        started = time.perf_counter()
+        while time.perf_counter() < deadline:
+            if before_each:
+                before_each()
+            response = view(factory.get('/ping/', HTTP_AUTHORIZATION=header))
+            assert response.status_code == 200, response.status_code
+            requests += 1
+        return requests / (time.perf_counter() - started)
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.models import AccountPurge, User
+from apps.users.purge import STEPS, purge
+
+
+class Command(BaseCommand):
+    """
+    Удаляет (или анонимизирует) аккаунт пачками по первичному ключу,
+    короткими транзакциями. Прерванный запуск продолжается с сохранённой
+    позиции (AccountPurge).
+
+    python manage.py purge_user 42 --chunk 1000 --pause 0.05
+    python manage.py purge_user 42 --anonymize
+    """
+    help = 'Delete or anonymize a user account in small primary-key ordered chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_id', type=int)
+        parser.add_argument('--anonymize', action='store_true',
+                            help='Keep bookings and reviews, erase personal data')
+        parser.add_argument('--chunk', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between chunks')
+
+    def handle(self, *args, **options):
+        user_id = options['user_id']
+        mode = 'anonymize' if options['anonymize'] else 'delete'
+        resuming = AccountPurge.objects.filter(user_id=user_id, finished_at__isnull=True).exists()
+        if not resuming and not User.objects.filter(id=user_id).exists():
+            raise CommandError(f'User {user_id} does not exist')
+
+        totals = dict.fromkeys((step.name for step in STEPS[mode]), 0)
+        try:
+            for step, count in purge(user_id, mode, options['chunk']):
+                totals[step] += count
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{step}: {totals[step]}')
+                if options['pause']:
+                    time.sleep(options['pause'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        summary = ', '.join(f'{step} {count}' for step, count in totals.items() if count)
+        self.stdout.write(self.style.SUCCESS(f'User {user_id} {mode}d: {summary or "nothing to do"}'))
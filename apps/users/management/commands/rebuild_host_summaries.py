@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.users.host_cards import invalidate_host_cards
+from apps.users.models import HostSummary
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает агрегаты всех хостов (HostSummary) и сбрасывает их карточки.
+    Нужен после первого деплоя и для сверки (например, раз в сутки по cron):
+    новые запросы бронирования (pending) событий outbox не создают.
+
+    python manage.py rebuild_host_summaries
+    """
+    help = 'Rebuild host aggregates shown on public host cards'
+
+    def handle(self, *args, **options):
+        count = HostSummary.rebuild()
+        invalidate_host_cards(HostSummary.objects.values_list('user_id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f'Hosts rebuilt: {count}'))
@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from apps.reviews.models import UserRating
+from apps.shared.constants import RATING_CATEGORIES, RATING_SCORES
+from apps.users.models import Profile
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает счётчики рейтингов всех профилей с нуля.
+
+    Один GROUP BY по UserRating (rated_user, category, rating),
+    затем bulk_update профилей пачками.
+
+    python manage.py reconcile_profile_ratings --chunk 1000
+    """
+    help = 'Recompute Profile rating counters from UserRating'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        counter_fields = [
+            field
+            for category, _ in RATING_CATEGORIES
+            for field in (
+                f'{category}_total_score',
+                f'{category}_votes_count',
+                f'{category}_top_count',
+                f'{category}_ok_count',
+                f'{category}_poor_count',
+            )
+        ]
+
+        totals = defaultdict(lambda: dict.fromkeys(counter_fields, 0))
+        rows = (
+            UserRating.objects
+            .values('rated_user', 'category', 'rating')
+            .annotate(votes=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            total_field, votes_field, value_field = Profile.rating_counter_fields(
+                row['category'], row['rating']
+            )
+            counters = totals[row['rated_user']]
+            counters[total_field] += RATING_SCORES[row['rating']] * row['votes']
+            counters[votes_field] += row['votes']
+            counters[value_field] += row['votes']
+
+        empty = dict.fromkeys(counter_fields, 0)
+        changed = 0
+        last_pk = 0
+        while True:
+            profiles = list(
+                Profile.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'user_id', *counter_fields)[:options['chunk']]
+            )
+            if not profiles:
+                break
+            last_pk = profiles[-1].pk
+
+            to_update = []
+            for profile in profiles:
+                expected = totals.get(profile.user_id, empty)
+                if any(getattr(profile, field) != value for field, value in expected.items()):
+                    for field, value in expected.items():
+                        setattr(profile, field, value)
+                    to_update.append(profile)
+
+            if to_update:
+                Profile.objects.bulk_update(to_update, counter_fields)
+                changed += len(to_update)
+
+        self.stdout.write(self.style.SUCCESS(f'Profiles updated: {changed}'))
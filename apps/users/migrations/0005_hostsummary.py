@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 02:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_apitoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='host_summary', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+                ('listings_count', models.PositiveIntegerField(default=0, help_text='Active approved listings', verbose_name='Listings count')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Reviews count')),
+                ('rating_sum', models.PositiveIntegerField(default=0, verbose_name='Rating sum')),
+                ('booking_requests', models.PositiveIntegerField(default=0, verbose_name='Booking requests')),
+                ('bookings_answered', models.PositiveIntegerField(default=0, verbose_name='Bookings answered')),
+                ('bookings_accepted', models.PositiveIntegerField(default=0, verbose_name='Bookings accepted')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+            ],
+            options={
+                'verbose_name': 'Host Summary',
+                'verbose_name_plural': 'Host Summaries',
+            },
+        ),
+    ]
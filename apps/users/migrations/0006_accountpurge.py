@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_hostsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPurge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(unique=True, verbose_name='User ID')),
+                ('mode', models.CharField(choices=[('delete', 'Delete'), ('anonymize', 'Anonymize')], max_length=20, verbose_name='Mode')),
+                ('step', models.CharField(blank=True, max_length=50, verbose_name='Step')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Last ID')),
+                ('processed', models.PositiveBigIntegerField(default=0, verbose_name='Rows processed')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Started at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished at')),
+            ],
+            options={
+                'verbose_name': 'Account Purge',
+                'verbose_name_plural': 'Account Purges',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -1,8 +1,15 @@
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin, UserManager
 from django.core.validators import MinLengthValidator, RegexValidator
-from django.db import models
+import hashlib
+import secrets
+from collections import Counter
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from apps.shared.constants import RATING_SCORES
+from apps.shared.db import bulk_upsert
 
 
 
@@ -135,6 +142,7 @@ class Profile(models.Model):
     )
 
     # Рейтинги пользователя  (TOP/OK/POOR)    обновляются автоматически при добавлении новой оценки в UserRating
+    # (Profile.apply_ratings; пересчёт с нуля - manage.py reconcile_profile_ratings)
     satisfaction_total_score = models.FloatField(
         _("Satisfaction total score"),
         default=0.0,
@@ -227,7 +235,262 @@ class Profile(models.Model):
     def __str__(self):
         return f"Profile of {self.user.username}"
 
+    def rating_average(self, category):
+        """Средний балл по категории (0-100) или None, если оценок нет"""
+        votes = getattr(self, f'{category}_votes_count')
+        if not votes:
+            return None
+        return round(getattr(self, f'{category}_total_score') / votes, 1)
+
+    @staticmethod
+    def rating_counter_fields(category, rating):
+        """Счётчики, которые меняет одна оценка (category, TOP/OK/POOR)"""
+        return (
+            f'{category}_total_score',
+            f'{category}_votes_count',
+            f'{category}_{rating.lower()}_count',
+        )
+
+    @classmethod
+    def apply_ratings(cls, user_id, ratings, sign=1):
+        """
+        Обновляет счётчики одним UPDATE с F()-выражениями.
+        ratings - пары (category, rating), например все три категории сразу.
+        """
+        deltas = Counter()
+        for category, rating in ratings:
+            total_field, votes_field, value_field = cls.rating_counter_fields(category, rating)
+            deltas[total_field] += sign * RATING_SCORES[rating]
+            deltas[votes_field] += sign
+            deltas[value_field] += sign
+        if not deltas:
+            return
+
+        updates = {field: F(field) + delta for field, delta in deltas.items()}
+        if not cls.objects.filter(user_id=user_id).update(**updates, updated_at=timezone.now()):
+            # Профиля ещё нет - создаём и повторяем
+            cls.objects.get_or_create(user_id=user_id)
+            cls.objects.filter(user_id=user_id).update(**updates, updated_at=timezone.now())
+
+        # Баллы входят в карточку хоста (apps/users/host_cards.py)
+        from .host_cards import invalidate_host_cards
+        transaction.on_commit(lambda: invalidate_host_cards([user_id]))
+
     class Meta:
         verbose_name = _("Profile")
         verbose_name_plural = _("Profiles")
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+
+class HostSummary(models.Model):
+    """
+    Агрегаты хоста для публичной карточки: объявления, отзывы, ответы
+    на запросы бронирования. Пересчитывается целиком (rebuild) по хостам,
+    которых коснулось изменение, - поэтому повторный пересчёт безопасен.
+    Пересчёт всех хостов - manage.py rebuild_host_summaries.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='host_summary',
+        verbose_name=_("User")
+    )
+
+    listings_count = models.PositiveIntegerField(
+        _("Listings count"),
+        default=0,
+        help_text=_("Active approved listings")
+    )
+    reviews_count = models.PositiveIntegerField(_("Reviews count"), default=0)
+    rating_sum = models.PositiveIntegerField(_("Rating sum"), default=0)
+
+    # Ответом считается любой выход брони из pending (подтверждение или отмена)
+    booking_requests = models.PositiveIntegerField(_("Booking requests"), default=0)
+    bookings_answered = models.PositiveIntegerField(_("Bookings answered"), default=0)
+    bookings_accepted = models.PositiveIntegerField(_("Bookings accepted"), default=0)
+
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Host Summary")
+        verbose_name_plural = _("Host Summaries")
+
+    def __str__(self):
+        return f"Host summary of user #{self.user_id}"
+
+    @property
+    def rating_avg(self):
+        if not self.reviews_count:
+            return None
+        return round(self.rating_sum / self.reviews_count, 2)
+
+    @property
+    def response_rate(self):
+        """Доля ответов на запросы, % (None - запросов не было)"""
+        if not self.booking_requests:
+            return None
+        return round(100 * self.bookings_answered / self.booking_requests)
+
+    @property
+    def acceptance_rate(self):
+        if not self.bookings_answered:
+            return None
+        return round(100 * self.bookings_accepted / self.bookings_answered)
+
+    @classmethod
+    def rebuild(cls, host_ids=None):
+        """
+        Три GROUP BY по хосту (объявления, гистограммы отзывов, брони)
+        и один upsert. host_ids=None - все хосты с объектами.
+        """
+        from apps.bookings.models import Booking
+        from apps.properties.models import RealEstateListing, RealEstateObject
+        from apps.reviews.models import ListingReviewStats
+
+        def by_host(queryset, host_field, **aggregates):
+            if host_ids is not None:
+                queryset = queryset.filter(**{f'{host_field}__in': host_ids})
+            return queryset.values(host_field).annotate(**aggregates).order_by()
+
+        if host_ids is None:
+            host_ids = list(
+                RealEstateObject.objects.order_by().values_list('host_id', flat=True).distinct()
+            )
+        summaries = {host_id: cls(user_id=host_id) for host_id in host_ids}
+        if not summaries:
+            return 0
+
+        host = 'real_estate_object__host_id'
+        listings = by_host(
+            RealEstateListing.objects.filter(is_active=True, is_approved=True),
+            host,
+            listings=models.Count('id')
+        )
+        for row in listings:
+            summaries[row[host]].listings_count = row['listings']
+
+        host = 'listing__real_estate_object__host_id'
+        reviews = by_host(
+            ListingReviewStats.objects.all(),
+            host,
+            reviews=models.Sum('reviews_count'),
+            ratings=models.Sum('rating_sum')
+        )
+        for row in reviews:
+            summaries[row[host]].reviews_count = row['reviews'] or 0
+            summaries[row[host]].rating_sum = row['ratings'] or 0
+
+        bookings = by_host(
+            Booking.objects.all(),
+            host,
+            requests=models.Count('id'),
+            answered=models.Count('id', filter=~models.Q(status='pending')),
+            accepted=models.Count('id', filter=models.Q(status__in=['confirmed', 'completed']))
+        )
+        for row in bookings:
+            summary = summaries[row[host]]
+            summary.booking_requests = row['requests']
+            summary.bookings_answered = row['answered']
+            summary.bookings_accepted = row['accepted']
+
+        bulk_upsert(
+            cls,
+            summaries.values(),
+            unique_fields=['user'],
+            update_fields=[
+                'listings_count', 'reviews_count', 'rating_sum',
+                'booking_requests', 'bookings_answered', 'bookings_accepted',
+                'updated_at',
+            ]
+        )
+        return len(summaries)
+
+
+class ApiToken(models.Model):
+    """
+    API-токен для мобильных клиентов (заголовок "Authorization: Token <key>").
+
+    Хранится только sha256 ключа: ключ случайный (256 бит), поэтому
+    медленный хэш (PBKDF2, как у паролей) не нужен - проверка стоит
+    один индексный запрос, а с кэшем (apps/users/authentication.py) ноль.
+    """
+    KEY_BYTES = 32
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_tokens',
+        verbose_name=_("User")
+    )
+    name = models.CharField(_("Name"), max_length=100, blank=True, help_text=_("Device or client name"))
+    key_prefix = models.CharField(_("Key prefix"), max_length=8, help_text=_("First characters of the key, for display"))
+    key_hash = models.CharField(_("Key hash"), max_length=64, unique=True)
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    expires_at = models.DateTimeField(_("Expires at"), null=True, blank=True)
+    revoked_at = models.DateTimeField(_("Revoked at"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("API Token")
+        verbose_name_plural = _("API Tokens")
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user} {self.key_prefix}..."
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, name='', expires_at=None):
+        """Создаёт токен; возвращает (token, key) - ключ виден только здесь"""
+        key = secrets.token_urlsafe(cls.KEY_BYTES)
+        token = cls.objects.create(
+            user=user,
+            name=name,
+            key_prefix=key[:8],
+            key_hash=cls.hash_key(key),
+            expires_at=expires_at
+        )
+        return token, key
+
+    def revoke(self):
+        self.revoked_at = timezone.now()
+        self.save(update_fields=['revoked_at'])
+
+    @property
+    def is_valid(self):
+        now = timezone.now()
+        return self.revoked_at is None and (self.expires_at is None or self.expires_at > now)
+
+
+PURGE_MODES = [
+    ('delete', _('Delete')),
+    ('anonymize', _('Anonymize')),
+]
+
+
+class AccountPurge(models.Model):
+    """
+    Прогресс удаления/анонимизации аккаунта (apps/users/purge.py):
+    текущий шаг и последний обработанный id. Прерванное задание
+    продолжается с этого места. Ссылки на User нет - при удалении
+    пользователь удаляется последним, а запись остаётся.
+    """
+    user_id = models.BigIntegerField(_("User ID"), unique=True)
+    mode = models.CharField(_("Mode"), max_length=20, choices=PURGE_MODES)
+    step = models.CharField(_("Step"), max_length=50, blank=True)
+    last_id = models.BigIntegerField(_("Last ID"), default=0)
+    processed = models.PositiveBigIntegerField(_("Rows processed"), default=0)
+    started_at = models.DateTimeField(_("Started at"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
+    finished_at = models.DateTimeField(_("Finished at"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Account Purge")
+        verbose_name_plural = _("Account Purges")
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.mode} user #{self.user_id}: {self.step or 'start'}/{self.last_id}"
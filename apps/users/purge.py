@@ -0,0 +1,258 @@
+"""
+Удаление и анонимизация аккаунтов частями.
+
+CASCADE при удалении крупного хоста загружает в память все объекты,
+объявления, брони, отзывы, оценки и просмотры (ради сигналов) и держит
+блокировки всё время удаления. Здесь граф зависимостей обходится явно,
+от листьев к пользователю: шаг обрабатывает свои строки пачками по
+возрастанию первичного ключа, пачка - одна короткая транзакция, после
+которой сдвигается AccountPurge. Память ограничена размером пачки,
+прерванное задание продолжается с места остановки.
+
+delete    - аккаунт удаляется вместе с объектами, бронями и историей;
+            данные других пользователей (гистограммы отзывов, рейтинги
+            профилей, карточки хостов) пересчитываются.
+anonymize - объявления снимаются с публикации, история и токены
+            удаляются, персональные данные стираются; брони, отзывы
+            и оценки остаются (без текста) для другой стороны.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.bookings.models import Availability, Booking
+from apps.properties.models import PropertyStats, RealEstateListing, RealEstateObject
+from apps.reviews.models import ListingReviewStats, PropertyReview, UserRating
+from apps.search.models import (
+    CoViewedListing, DailyListingViews, RecentlyViewed,
+    SearchHistory, TrendingListing, ViewHistory
+)
+from .authentication import token_cache
+from .host_cards import invalidate_host_cards, refresh_hosts
+from .models import AccountPurge, ApiToken, HostSummary, Profile, User
+
+
+@dataclass(frozen=True)
+class PurgeStep:
+    name: str
+    rows: Callable              # user_id -> QuerySet строк шага
+    update: dict = None         # None - строки удаляются, иначе UPDATE этими полями
+    before: Callable = None     # (user_id, ids) -> функция после изменения пачки или None
+
+
+def hosted(user_id, prefix='listing__'):
+    """Строки, относящиеся к объявлениям хоста"""
+    return Q(**{f'{prefix}real_estate_object__host_id': user_id})
+
+
+def forget_tokens(user_id, ids):
+    """
+    Удалённые токены убираются из кэша аутентификации этого процесса;
+    в остальных процессах они живут не дольше API_TOKEN_CACHE_SECONDS
+    (как и отозванные).
+    """
+    key_hashes = list(ApiToken.objects.filter(id__in=ids).values_list('key_hash', flat=True))
+
+    def after():
+        for key_hash in key_hashes:
+            token_cache.discard(key_hash)
+    return after
+
+
+def revert_ratings(user_id, ids):
+    """Оценки, выставленные другим, вычитаются из их профилей"""
+    ratings = defaultdict(list)
+    rows = UserRating.objects.filter(id__in=ids).exclude(rated_user_id=user_id).values_list(
+        'rated_user_id', 'category', 'rating'
+    )
+    for rated_user_id, category, rating in rows:
+        ratings[rated_user_id].append((category, rating))
+
+    def after():
+        for rated_user_id, pairs in ratings.items():
+            Profile.apply_ratings(rated_user_id, pairs, sign=-1)
+    return after
+
+
+def refresh_reviewed_listings(user_id, ids):
+    """Отзывы на чужие объявления: гистограммы и карточки их хостов пересчитываются"""
+    rows = set(
+        PropertyReview.objects.filter(id__in=ids).exclude(hosted(user_id)).values_list(
+            'listing_id', 'listing__real_estate_object__host_id'
+        )
+    )
+
+    def after():
+        if rows:
+            ListingReviewStats.rebuild({listing_id for listing_id, _ in rows})
+            refresh_hosts(host_id for _, host_id in rows)
+    return after
+
+
+def refresh_booked_hosts(user_id, ids):
+    """Брони гостя у других хостов: доля ответов в их карточках"""
+    host_ids = set(
+        Booking.objects.filter(id__in=ids).exclude(hosted(user_id)).values_list(
+            'listing__real_estate_object__host_id', flat=True
+        )
+    )
+    return lambda: refresh_hosts(host_ids)
+
+
+def delete_object_stats(user_id, ids):
+    """PropertyStats (FK со стороны объекта) удаляются вслед за объектами"""
+    stats_ids = list(RealEstateObject.objects.filter(id__in=ids).values_list('stats_id', flat=True))
+    return lambda: PropertyStats.objects.filter(id__in=stats_ids).delete()
+
+
+RELEASE_CLAIM = {'claimed_by': None, 'claimed_at': None}
+
+COMMON_STEPS = [
+    PurgeStep('api_tokens', lambda u: ApiToken.objects.filter(user_id=u), before=forget_tokens),
+    PurgeStep('search_history', lambda u: SearchHistory.objects.filter(user_id=u)),
+    PurgeStep('recently_viewed', lambda u: RecentlyViewed.objects.filter(user_id=u)),
+    # Модератор: забранные, но не решённые элементы возвращаются в очередь
+    PurgeStep('claimed_reviews', lambda u: PropertyReview.objects.filter(claimed_by_id=u), RELEASE_CLAIM),
+    PurgeStep('claimed_listings', lambda u: RealEstateListing.objects.filter(claimed_by_id=u), RELEASE_CLAIM),
+]
+
+STEPS = {
+    'delete': COMMON_STEPS + [
+        PurgeStep('view_history', lambda u: ViewHistory.objects.filter(Q(user_id=u) | hosted(u))),
+        PurgeStep('coviewed', lambda u: CoViewedListing.objects.filter(hosted(u) | hosted(u, 'related__'))),
+        PurgeStep('trending', lambda u: TrendingListing.objects.filter(hosted(u))),
+        PurgeStep('daily_views', lambda u: DailyListingViews.objects.filter(hosted(u))),
+        PurgeStep(
+            'user_ratings',
+            lambda u: UserRating.objects.filter(
+                Q(rating_user_id=u) | Q(rated_user_id=u) |
+                Q(booking__guest_id=u) | hosted(u, 'booking__listing__')
+            ),
+            before=revert_ratings
+        ),
+        PurgeStep(
+            'reviews',
+            lambda u: PropertyReview.objects.filter(Q(guest_id=u) | hosted(u)),
+            before=refresh_reviewed_listings
+        ),
+        PurgeStep('review_stats', lambda u: ListingReviewStats.objects.filter(hosted(u))),
+        PurgeStep(
+            'bookings',
+            lambda u: Booking.objects.filter(Q(guest_id=u) | hosted(u)),
+            before=refresh_booked_hosts
+        ),
+        PurgeStep('availability', lambda u: Availability.objects.filter(hosted(u))),
+        PurgeStep('listings', lambda u: RealEstateListing.objects.filter(hosted(u, ''))),
+        PurgeStep('objects', lambda u: RealEstateObject.objects.filter(host_id=u), before=delete_object_stats),
+        PurgeStep('host_summary', lambda u: HostSummary.objects.filter(user_id=u)),
+        PurgeStep('profile', lambda u: Profile.objects.filter(user_id=u)),
+        PurgeStep('user', lambda u: User.objects.filter(id=u)),
+    ],
+    'anonymize': COMMON_STEPS + [
+        PurgeStep('view_history', lambda u: ViewHistory.objects.filter(user_id=u)),
+        PurgeStep(
+            'review_comments',
+            lambda u: PropertyReview.objects.filter(guest_id=u).exclude(comment=''),
+            {'comment': ''}
+        ),
+        PurgeStep(
+            'rating_comments',
+            lambda u: UserRating.objects.filter(rating_user_id=u).exclude(comment=''),
+            {'comment': ''}
+        ),
+        PurgeStep(
+            'listings',
+            lambda u: RealEstateListing.objects.filter(hosted(u, ''), is_active=True),
+            {'is_active': False}
+        ),
+    ],
+}
+
+
+def start(user_id, mode):
+    """Задание пользователя; новый запуск сразу блокирует вход"""
+    job, _ = AccountPurge.objects.get_or_create(user_id=user_id, defaults={'mode': mode})
+    if job.finished_at is None and job.mode != mode:
+        raise ValueError(f'User {user_id} already has an unfinished {job.mode} job')
+    if job.finished_at is not None:
+        job.mode, job.step, job.last_id, job.finished_at = mode, '', 0, None
+        job.save()
+
+    now = timezone.now()
+    User.objects.filter(id=user_id).update(is_active=False, deleted=True, updated_at=now)
+    User.objects.filter(id=user_id, deleted_at__isnull=True).update(deleted_at=now)
+    return job
+
+
+def process_chunk(step, job, chunk_size):
+    """Удаляет (или обновляет) одну пачку строк шага. Возвращает их число."""
+    with transaction.atomic():
+        rows = step.rows(job.user_id)
+        ids = list(
+            rows.filter(pk__gt=job.last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0
+        after = step.before(job.user_id, ids) if step.before else None
+        chunk = rows.model._base_manager.filter(pk__in=ids)
+        if step.update is None:
+            chunk.delete()
+        else:
+            chunk.update(**step.update)
+        if after:
+            after()
+
+        job.last_id = ids[-1]
+        job.processed += len(ids)
+        job.save(update_fields=['last_id', 'processed', 'updated_at'])
+    return len(ids)
+
+
+def scrub(user_id):
+    """Стирает персональные данные пользователя и профиля"""
+    User.objects.filter(id=user_id).update(
+        username=f'deleted-{user_id}',
+        email=f'deleted-{user_id}@deleted.invalid',
+        first_name=None,
+        last_name=None,
+        password=make_password(None),
+        is_staff=False,
+        is_superuser=False
+    )
+    profile = Profile.objects.filter(user_id=user_id).first()
+    if profile is not None:
+        if profile.avatar:
+            profile.avatar.delete(save=False)
+        profile.phone = profile.bio = ''
+        profile.save(update_fields=['phone', 'bio', 'avatar', 'updated_at'])
+
+
+def finish(job):
+    if job.mode == 'anonymize':
+        scrub(job.user_id)
+        refresh_hosts([job.user_id])
+    else:
+        invalidate_host_cards([job.user_id])
+    job.finished_at = timezone.now()
+    job.save(update_fields=['finished_at', 'updated_at'])
+
+
+def purge(user_id, mode='delete', chunk_size=1000):
+    """Генератор: (шаг, строк в пачке) после каждой пачки"""
+    job = start(user_id, mode)
+    steps = STEPS[mode]
+    names = [step.name for step in steps]
+    position = names.index(job.step) if job.step in names else 0
+
+    for step in steps[position:]:
+        if job.step != step.name:
+            job.step, job.last_id = step.name, 0
+            job.save(update_fields=['step', 'last_id', 'updated_at'])
+        while count := process_chunk(step, job, chunk_size):
+            yield step.name, count
+    finish(job)
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from .models import ApiToken
+
+
+class ApiTokenSerializer(serializers.ModelSerializer):
+    """Токен без ключа (ключ показывается один раз при выпуске)"""
+
+    class Meta:
+        model = ApiToken
+        fields = ['id', 'name', 'key_prefix', 'created_at', 'expires_at', 'revoked_at']
+        read_only_fields = ['key_prefix', 'created_at', 'revoked_at']
+
+
+class ApiTokenIssueSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    expires_in_days = serializers.IntegerField(min_value=1, max_value=365, required=False)
@@ -1,3 +1,145 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.bookings.models import Booking
+from apps.properties.factories import RealEstateListingFactory, RealEstateObjectFactory
+from apps.properties.models import RealEstateListing, RealEstateObject
+from apps.reviews.factories import CompletedBookingFactory, PropertyReviewFactory
+from apps.reviews.models import PropertyReview
+from apps.search.factories import SearchHistoryFactory
+from apps.search.models import SearchHistory
+from .authentication import ApiTokenAuthentication, token_cache
+from .factories import HostFactory, UserFactory
+from .host_cards import get_host_card
+from .models import AccountPurge, ApiToken, HostSummary, User
+from .purge import purge
+
+
+class ApiTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.host = HostFactory()
+        self.token, self.key = ApiToken.issue(self.host, 'CI')
+        self.auth = ApiTokenAuthentication()
+
+    def test_cached_token_needs_no_queries_and_keeps_roles(self):
+        self.auth.authenticate_credentials(self.key)
+
+        with CaptureQueriesContext(connection) as queries:
+            user, _ = self.auth.authenticate_credentials(self.key)
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user.pk, self.host.pk)
+        self.assertEqual(user.profile.pk, self.host.profile.pk)
+        self.assertEqual(user.role_names, frozenset({'host'}))
+
+    def test_each_request_gets_its_own_user_and_profile(self):
+        self.auth.authenticate_credentials(self.key)
+        first, _ = self.auth.authenticate_credentials(self.key)
+        first.first_name = 'Changed'
+        first.profile.bio = 'Changed'
+        first.cached_in_request = True
+
+        second, _ = self.auth.authenticate_credentials(self.key)
+
+        self.assertIsNot(second.profile, first.profile)
+        self.assertEqual(second.first_name, self.host.first_name)
+        self.assertEqual(second.profile.bio, self.host.profile.bio)
+        self.assertFalse(hasattr(second, 'cached_in_request'))
+        self.assertIs(second.profile.user, second)
+
+
+class HostCardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = HostFactory()
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def test_card_is_rebuilt_after_listing_is_created(self):
+        get_host_card(self.host.id)     # карточка в кэше
+        obj = RealEstateObjectFactory(host=self.host)
+
+        response = self.client.post('/api/v1/host-listings/', {
+            'real_estate_object': obj.id,
+            'price_per_night': '120.00',
+            'currency': 'EUR',
+            'minimum_stay': 2,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(HostSummary.objects.filter(user=self.host).exists())
+        self.assertIsNone(cache.get(f'host_card:{self.host.id}'))
+
+    def test_card_counts_published_listings_after_update(self):
+        obj = RealEstateObjectFactory(host=self.host)
+        listing = obj.listings.create(price_per_night=100, is_approved=True, is_active=False)
+        self.assertEqual(get_host_card(self.host.id)['listings_count'], 0)
+
+        self.client.patch(f'/api/v1/host-listings/{listing.id}/', {'is_active': True}, format='json')
+
+        self.assertEqual(get_host_card(self.host.id)['listings_count'], 1)
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.host = HostFactory()
+        self.guest = UserFactory()
+        self.listing = RealEstateListingFactory(real_estate_object__host=self.host)
+        self.booking = CompletedBookingFactory(listing=self.listing, guest=self.guest)
+        self.review = PropertyReviewFactory(booking=self.booking)
+        SearchHistoryFactory.create_batch(3, user=self.guest)
+        _, self.key = ApiToken.issue(self.guest)
+
+    def test_delete_removes_host_with_listings_and_bookings(self):
+        list(purge(self.host.id, 'delete'))
+
+        self.assertFalse(User.objects.filter(id=self.host.id).exists())
+        self.assertFalse(RealEstateObject.objects.filter(host_id=self.host.id).exists())
+        self.assertFalse(Booking.objects.filter(id=self.booking.id).exists())
+        self.assertFalse(PropertyReview.objects.filter(id=self.review.id).exists())
+        self.assertTrue(User.objects.filter(id=self.guest.id).exists())
+        self.assertIsNotNone(AccountPurge.objects.get(user_id=self.host.id).finished_at)
+
+    def test_anonymize_keeps_bookings_and_reviews_without_personal_data(self):
+        list(purge(self.guest.id, 'anonymize'))
+
+        guest = User.objects.get(id=self.guest.id)
+        self.assertEqual((guest.username, guest.is_active), (f'deleted-{self.guest.id}', False))
+        self.assertTrue(Booking.objects.filter(id=self.booking.id).exists())
+        self.assertEqual(PropertyReview.objects.get(id=self.review.id).comment, '')
+        self.assertFalse(SearchHistory.objects.filter(user_id=self.guest.id).exists())
+        self.assertFalse(ApiToken.objects.filter(user_id=self.guest.id).exists())
+
+    def test_deleted_token_is_dropped_from_auth_cache(self):
+        ApiTokenAuthentication().authenticate_credentials(self.key)
+
+        list(purge(self.guest.id, 'anonymize'))
+
+        with self.assertRaises(AuthenticationFailed):
+            ApiTokenAuthentication().authenticate_credentials(self.key)
+
+    def test_interrupted_purge_resumes_after_last_chunk(self):
+        steps = purge(self.guest.id, 'delete', chunk_size=1)
+        for step, _ in steps:
+            if step == 'search_history':
+                break       # процесс прерван после первой пачки шага
+        steps.close()
+        job = AccountPurge.objects.get(user_id=self.guest.id)
+        self.assertEqual(job.step, 'search_history')
+        self.assertEqual(SearchHistory.objects.filter(user_id=self.guest.id).count(), 2)
+
+        resumed = [step for step, _ in purge(self.guest.id, 'delete', chunk_size=1)]
+
+        self.assertEqual(resumed.count('search_history'), 2)
+        self.assertNotIn('api_tokens', resumed)
+        self.assertFalse(User.objects.filter(id=self.guest.id).exists())
+        self.assertTrue(RealEstateListing.objects.filter(id=self.listing.id).exists())
+        self.assertIsNotNone(AccountPurge.objects.get(user_id=self.guest.id).finished_at)
@@ -1,3 +1,41 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.utils import timezone
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.response import Response
+
+from .authentication import token_cache
+from .models import ApiToken
+from .serializers import ApiTokenSerializer, ApiTokenIssueSerializer
+
+
+class ApiTokenViewSet(mixins.ListModelMixin,
+                      mixins.DestroyModelMixin,
+                      viewsets.GenericViewSet):
+    """
+    API-токены текущего пользователя
+    GET    /api/v1/auth/tokens/        - список (без ключей)
+    POST   /api/v1/auth/tokens/        - выпустить {"name": "iPhone", "expires_in_days": 90}
+    DELETE /api/v1/auth/tokens/{id}/   - отозвать
+    """
+    serializer_class = ApiTokenSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ApiToken.objects.filter(user=self.request.user, revoked_at__isnull=True)
+
+    def create(self, request):
+        params = ApiTokenIssueSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        days = params.validated_data.get('expires_in_days')
+        token, key = ApiToken.issue(
+            request.user,
+            name=params.validated_data['name'],
+            expires_at=timezone.now() + timedelta(days=days) if days else None
+        )
+        # Ключ возвращается только в этом ответе
+        return Response({**self.get_serializer(token).data, 'key': key}, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        instance.revoke()
+        token_cache.discard(instance.key_hash)
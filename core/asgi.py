@@ -14,3 +14,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Модули приложений - после django.setup() (get_asgi_application)
+from apps.search.suggest import suggestions  # noqa: E402
+from apps.shared.buffer import flush_on_exit  # noqa: E402
+
+# Буферы записи (apps/shared/buffer.py) сбрасываются при остановке процесса
+flush_on_exit()
+# Подсказки поиска отвечают из памяти с первого запроса
+suggestions.warm()
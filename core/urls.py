@@ -16,6 +16,8 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+
+from apps.shared.metrics import metrics_view
 #from drf_yasg.views import get_schema_view
 #from drf_yasg import openapi
 #from rest_framework.permissions import IsAuthenticated
@@ -37,6 +39,7 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),      # http://127.0.0.1:8000/admin/
     path('api/v1/', include('routers')),  # http://127.0.0.1:8000/api/v1/
+    path('metrics', metrics_view),        # Prometheus
 
 #     # SWAGGER
 #     path(
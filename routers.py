@@ -1,12 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
+from apps.properties.async_views import listing_detail, listing_list
 from apps.properties.views import (
     RealEstateObjectViewSet,
     PublicListingViewSet,
     HostListingViewSet,
     ListingDetailViewSet,
+    ListingModerationViewSet,
 )
+from apps.reviews.views import ListingReviewViewSet, ReviewModerationViewSet
+from apps.search.views import SearchSuggestViewSet
+from apps.users.views import ApiTokenViewSet
 
 #from rest_framework.authtoken.views import obtain_auth_token
 #from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -19,6 +24,13 @@ router.register('listings', PublicListingViewSet, basename='public-listings')
 router.register('listing', ListingDetailViewSet, basename='listing-detail')         # /api/v1/listing/<pk>
 router.register('host-listings', HostListingViewSet, basename='host-listings')       # /api/v1/host-listings
                                                                                             #/api/v1/host-listings/<id>/
+router.register(r'listing/(?P<listing_pk>\d+)/reviews', ListingReviewViewSet,
+                basename='listing-reviews')                                          # /api/v1/listing/<pk>/reviews/
+router.register('moderation/listings', ListingModerationViewSet, basename='moderation-listings')
+router.register('moderation/reviews', ReviewModerationViewSet, basename='moderation-reviews')
+                                                                # /api/v1/moderation/<...>/claim/, decide/
+router.register('search/suggest', SearchSuggestViewSet, basename='search-suggest')    # /api/v1/search/suggest/?q=
+router.register('auth/tokens', ApiTokenViewSet, basename='api-tokens')                  # /api/v1/auth/tokens/
 
 
 
@@ -31,4 +43,8 @@ urlpatterns = [
     # path('auth/register/', RegisterUser.as_view()),
     # path('auth/login/', UserLoginAPIView.as_view()),
     # path('auth/logout/', LogOutUser.as_view()),
+
+    # Асинхронный путь чтения (ASGI), ответы как у listings/ и listing/<pk>/
+    path('async/listings/', listing_list, name='async-listings-list'),
+    path('async/listing/<int:pk>/', listing_detail, name='async-listing-detail'),
 ] + router.urls
\ No newline at end of file